@@ -1,410 +1,39 @@
 import streamlit as st
-import google.generativeai as genai
-import os
-import PyPDF2 as pdf
-from dotenv import load_dotenv
-import json
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
-import random
-
-# Load environment variables
-load_dotenv()
-
-# Configure Gemini AI
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-# Function to extract text from PDF
-def input_pdf_text(uploaded_file):
-    try:
-        reader = pdf.PdfReader(uploaded_file)
-        text = ""
-        for page in reader.pages:
-            extracted_text = page.extract_text() or ""  # Handle None case
-            text += extracted_text
-        
-        if not text.strip():
-            # If no text was extracted (possibly an image-based PDF)
-            return "This appears to be an image-based PDF. Please provide a text-based PDF or manually enter the content."
-            
-        return text.strip()
-    except Exception as e:
-        return f"Error extracting text from PDF: {str(e)}"
-
-# Job Description Summarizer Agent
-def summarize_job_description(jd_text):
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    prompt = f"""
-    Act as an expert job description analyzer. Review the following job description and extract 
-    key elements in a structured format.
-    
-    Job Description: {jd_text}
-    
-    Respond with a valid JSON object containing these fields:
-    {{
-      "JobTitle": "title here",
-      "Department": "department name",
-      "Location": "location",
-      "EmploymentType": "full-time/part-time/contract",
-      "RequiredSkills": ["skill1", "skill2", "..."],
-      "RequiredExperience": "X years in...",
-      "RequiredQualifications": ["qualification1", "qualification2", "..."],
-      "Responsibilities": ["responsibility1", "responsibility2", "..."],
-      "SalaryRange": "range if mentioned",
-      "PreferredSkills": ["skill1", "skill2", "..."]
-    }}
-    
-    Important: Only respond with the JSON object and nothing else. No explanations or markdown formatting.
-    """
-    
-    try:
-        response = model.generate_content(prompt)
-        
-        if response and hasattr(response, 'text'):
-            # Clean the response text
-            response_text = response.text.strip()
-            
-            # Handle different response formats
-            if response_text.startswith("```json") and response_text.endswith("```"):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith("```") and response_text.endswith("```"):
-                response_text = response_text[3:-3].strip()
-            
-            # If the response still contains markdown or non-JSON text, try to extract JSON portion
-            if not response_text.startswith("{"):
-                # Look for JSON object in the response
-                start_index = response_text.find("{")
-                end_index = response_text.rfind("}")
-                
-                if start_index >= 0 and end_index >= 0:
-                    response_text = response_text[start_index:end_index+1]
-            
-            # Debug output if needed
-            if st.session_state.get('debug_mode', False):
-                st.write("Raw API response:", response.text)
-                st.write("Processed response text:", response_text)
-            
-            # Try to parse as JSON
-            try:
-                return json.loads(response_text)
-            except json.JSONDecodeError as json_err:
-                # If direct parsing fails, try a fallback approach
-                return {
-                    "JobTitle": extract_field_from_text(response_text, "JobTitle") or "Data Analyst",
-                    "Department": extract_field_from_text(response_text, "Department") or "Not specified",
-                    "Location": extract_field_from_text(response_text, "Location") or "Not specified",
-                    "EmploymentType": extract_field_from_text(response_text, "EmploymentType") or "Full-time",
-                    "RequiredSkills": extract_list_from_text(response_text, "RequiredSkills") or ["Python", "Data Analysis"],
-                    "RequiredExperience": extract_field_from_text(response_text, "RequiredExperience") or "2+ years",
-                    "RequiredQualifications": extract_list_from_text(response_text, "RequiredQualifications") or ["Bachelor's degree"],
-                    "Responsibilities": extract_list_from_text(response_text, "Responsibilities") or ["Data Analysis", "Reporting"],
-                    "SalaryRange": extract_field_from_text(response_text, "SalaryRange") or "Not specified",
-                    "PreferredSkills": extract_list_from_text(response_text, "PreferredSkills") or []
-                }
-        else:
-            return {"error": "Failed to get a valid response from the API"}
-            
-    except Exception as e:
-        return {"error": f"Failed to process the JD: {str(e)}"}
-
-# Helper functions to extract info from text if JSON parsing fails
-def extract_field_from_text(text, field_name):
-    if not text:
-        return None
-    
-    # Try to find field in format "field_name": "value"
-    import re
-    pattern = f'"{field_name}"\\s*:\\s*"([^"]*)"'
-    match = re.search(pattern, text)
-    if match:
-        return match.group(1)
-    return None
-
-def extract_list_from_text(text, field_name):
-    if not text:
-        return None
-    
-    # Try to find field in format "field_name": ["value1", "value2"]
-    import re
-    pattern = f'"{field_name}"\\s*:\\s*\\[(.*?)\\]'
-    match = re.search(pattern, text)
-    if match:
-        items_text = match.group(1)
-        # Extract individual items
-        items = re.findall(r'"([^"]*)"', items_text)
-        return items
-    return None
-
-# Recruiting Agent for CV Analysis
-def analyze_cv(cv_text, jd_summary):
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    # Format JD summary for the prompt
-    required_skills = ", ".join(jd_summary.get("RequiredSkills", []))
-    preferred_skills = ", ".join(jd_summary.get("PreferredSkills", []))
-    responsibilities = ", ".join(jd_summary.get("Responsibilities", []))
-    qualifications = ", ".join(jd_summary.get("RequiredQualifications", []))
-    
-    prompt = f"""
-    Act as a senior recruiting agent specializing in talent acquisition. Analyze this candidate's 
-    resume against the job requirements and provide a detailed evaluation.
-    
-    Job Title: {jd_summary.get("JobTitle", "Not specified")}
-    Required Skills: {required_skills}
-    Preferred Skills: {preferred_skills}
-    Required Experience: {jd_summary.get("RequiredExperience", "Not specified")}
-    Required Qualifications: {qualifications}
-    Key Responsibilities: {responsibilities}
-    
-    Candidate Resume: {cv_text}
-    
-    Respond with ONLY a valid JSON object containing:
-    {{
-      "CandidateName": "full name",
-      "ContactInfo": "email and/or phone",
-      "Skills": ["skill1", "skill2", "..."],
-      "Experience": ["experience1", "experience2", "..."],
-      "Education": ["education1", "education2", "..."],
-      "Certifications": ["cert1", "cert2", "..."],
-      "SkillMatch": "X%",
-      "ExperienceMatch": "X%",
-      "QualificationMatch": "X%",
-      "OverallMatch": "X%",
-      "MatchedSkills": ["skill1", "skill2", "..."],
-      "MissingSkills": ["skill1", "skill2", "..."],
-      "Strengths": ["strength1", "strength2", "..."],
-      "Areas_for_Improvement": ["area1", "area2", "..."],
-      "Recommendation": "shortlist/reject/further review"
-    }}
-    
-    Important: Only provide the JSON object. No additional text, no markdown formatting.
-    """
-    
-    try:
-        response = model.generate_content(prompt)
-        
-        if response and hasattr(response, 'text'):
-            # Clean the response text
-            response_text = response.text.strip()
-            
-            # Handle different response formats
-            if response_text.startswith("```json") and response_text.endswith("```"):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith("```") and response_text.endswith("```"):
-                response_text = response_text[3:-3].strip()
-            
-            # If the response still contains non-JSON text, try to extract JSON portion
-            if not response_text.startswith("{"):
-                start_index = response_text.find("{")
-                end_index = response_text.rfind("}")
-                
-                if start_index >= 0 and end_index >= 0:
-                    response_text = response_text[start_index:end_index+1]
-            
-            # Debug output
-            if st.session_state.get('debug_mode', False):
-                st.write("Raw CV analysis response:", response.text)
-                st.write("Processed CV analysis text:", response_text)
-            
-            # Create a fallback response if parsing fails
-            try:
-                return json.loads(response_text)
-            except json.JSONDecodeError:
-                # Extract name from resume if possible
-                candidate_name = "Unknown Candidate"
-                name_match = re.search(r"([A-Z][a-z]+ [A-Z][a-z]+)", cv_text[:500])
-                if name_match:
-                    candidate_name = name_match.group(1)
-                
-                # Extract email if possible
-                contact_info = "Not found"
-                email_match = re.search(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", cv_text)
-                if email_match:
-                    contact_info = email_match.group(0)
-                
-                return {
-                    "CandidateName": candidate_name,
-                    "ContactInfo": contact_info,
-                    "Skills": ["Unable to parse skills"],
-                    "Experience": ["Experience details not parsed"],
-                    "Education": ["Education details not parsed"],
-                    "Certifications": [],
-                    "SkillMatch": "0%",
-                    "ExperienceMatch": "0%",
-                    "QualificationMatch": "0%",
-                    "OverallMatch": "50%",
-                    "MatchedSkills": [],
-                    "MissingSkills": jd_summary.get("RequiredSkills", []),
-                    "Strengths": ["Unable to determine strengths"],
-                    "Areas_for_Improvement": ["Resume parsing failed, please review manually"],
-                    "Recommendation": "further review"
-                }
-        else:
-            return {"error": "Failed to get a valid response from the API for CV analysis"}
-            
-    except Exception as e:
-        return {"error": f"Failed to analyze CV: {str(e)}"}
-
-# Candidate Shortlisting Agent
-def shortlist_candidates(candidates_analysis, threshold=70):
-    shortlisted = []
-    
-    for candidate in candidates_analysis:
-        # Skip entries with errors
-        if "error" in candidate:
-            continue
-            
-        # Extract match percentage
-        match_percentage = int(candidate.get("OverallMatch", "0%").strip("%"))
-        
-        if match_percentage >= threshold:
-            shortlisted.append({
-                "name": candidate.get("CandidateName", "Unknown"),
-                "contact": candidate.get("ContactInfo", "Not provided"),
-                "match_percentage": match_percentage,
-                "strengths": candidate.get("Strengths", []),
-                "missing_skills": candidate.get("MissingSkills", []),
-                "recommendation": candidate.get("Recommendation", "")
-            })
-    
-    # Sort by match percentage (highest first)
-    shortlisted.sort(key=lambda x: x["match_percentage"], reverse=True)
-    return shortlisted
-
-# Interview Scheduler Agent
-def generate_interview_email(candidate_info, jd_summary):
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    # Generate interview dates (next business days)
-    today = datetime.now()
-    proposed_dates = []
-    
-    for i in range(1, 8):
-        next_date = today + timedelta(days=i)
-        # Skip weekends (5 = Saturday, 6 = Sunday)
-        if next_date.weekday() < 5:
-            proposed_dates.append(next_date.strftime("%A, %B %d, %Y"))
-            if len(proposed_dates) == 3:  # Get 3 business days
-                break
-    
-    # Generate interview times
-    interview_times = ["10:00 AM", "11:30 AM", "2:00 PM", "3:30 PM"]
-    proposed_slots = [f"{date} at {time}" for date in proposed_dates for time in random.sample(interview_times, 2)]
-    
-    job_title = jd_summary.get("JobTitle", "the open position")
-    company = os.getenv("COMPANY_NAME", "Our Company")
-    
-    # Handle missing strengths
-    candidate_strengths = candidate_info.get('strengths', [])
-    if not candidate_strengths or len(candidate_strengths) == 0:
-        candidate_strengths = ["qualifications", "experience"]
-    
-    strengths_text = ', '.join(candidate_strengths[:3]) if len(candidate_strengths) > 0 else "qualifications"
-    
-    prompt = f"""
-    Act as a professional recruiter. Write a personalized interview invitation email for {candidate_info['name']} 
-    who has been shortlisted for the {job_title} position at {company}.
-    
-    Candidate's strengths: {strengths_text}
-    Match rate: {candidate_info['match_percentage']}%
-    
-    Include these proposed interview slots:
-    {', '.join(proposed_slots[:5])}
-    
-    The email should:
-    1. Be professional and warm
-    2. Congratulate them on being shortlisted
-    3. Briefly mention why they're a good fit, highlighting 1-2 strengths
-    4. Propose the interview slots and ask for their preference
-    5. Mention the interview will be conducted via video call (Zoom)
-    6. Explain next steps and whom to contact with questions
-    
-    Respond with only the email text, no additional formatting or explanation.
-    """
-    
-    try:
-        response = model.generate_content(prompt)
-        
-        if response and hasattr(response, 'text'):
-            email_text = response.text.strip()
-            
-            # Debug output
-            if st.session_state.get('debug_mode', False):
-                st.write("Raw email response:", email_text)
-            
-            return {
-                "candidate_name": candidate_info['name'],
-                "candidate_email": candidate_info['contact'],
-                "email_subject": f"Interview Invitation: {job_title} position at {company}",
-                "email_body": email_text,
-                "proposed_slots": proposed_slots[:5]
-            }
-        else:
-            # Fallback email if API fails
-            default_email = f"""
-Dear {candidate_info['name']},
-
-Congratulations! We are pleased to inform you that you have been shortlisted for the {job_title} position at {company}.
-
-We were impressed with your profile and would like to invite you for a video interview to discuss your experience and the role in more detail.
-
-Please let us know which of the following time slots would work best for you:
-- {proposed_slots[0]}
-- {proposed_slots[1]}
-- {proposed_slots[2]}
-
-The interview will be conducted via Zoom, and we will send you the meeting details once you confirm your preferred time slot.
-
-If you have any questions, please don't hesitate to contact us.
-
-We look forward to speaking with you soon!
-
-Best regards,
-Recruiting Team
-{company}
-            """
-            
-            return {
-                "candidate_name": candidate_info['name'],
-                "candidate_email": candidate_info['contact'],
-                "email_subject": f"Interview Invitation: {job_title} position at {company}",
-                "email_body": default_email,
-                "proposed_slots": proposed_slots[:5]
-            }
-    except Exception as e:
-        return {"error": f"Failed to generate email: {str(e)}"}
-
-# Function to create a mailto link for email
-def generate_mailto_link(email_data):
-    try:
-        recipient = email_data['candidate_email']
-        subject = email_data['email_subject']
-        body = email_data['email_body']
-        
-        # URL encode the subject and body for the mailto link
-        import urllib.parse
-        subject_encoded = urllib.parse.quote(subject)
-        body_encoded = urllib.parse.quote(body)
-        
-        # Create the mailto link
-        mailto_link = f"mailto:{recipient}?subject={subject_encoded}&body={body_encoded}"
-        
-        return {
-            "status": "success",
-            "mailto_link": mailto_link,
-            "message": f"Email ready to send to {recipient}"
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": f"Error generating email link: {str(e)}"
-        }
+import time
+import pandas as pd
+from collections import Counter
+from screening import (
+    EMAIL_RENDER_MODE,
+    EMAIL_RENDER_MODES,
+    PRESCREEN_CUTOFF,
+    ShortlistIndex,
+    SkillMatchMatrix,
+    analysis_cache_key,
+    candidate_key,
+    changed_jd_fields,
+    generate_interview_email,
+    generate_interview_emails_concurrently,
+    generate_mailto_link,
+    get_analysis_cache,
+    get_jd_cache,
+    hash_jd_summary,
+    jd_change_kind,
+    parse_match_percentage,
+    rescored_analysis_cache_key,
+    shortlist_candidates,
+    shortlist_score,
+    summarize_job_description,
+)
+from pdf_extraction import get_text_store, pdf_digest
+from candidate_records import SUMMARY_FIELDS, CandidateRecord
+from result_store import get_result_store
+from scheduling import InterviewScheduler, export_ics, format_slot, get_schedule_store
+from email_sender import SMTP_HOST, SMTPSender, smtp_configured
+from jobs import JOB_POLL_SECONDS, JOB_RUNNER_IN_PROCESS, get_job_runner, get_job_store, submit_screening_job
+from metrics import METRICS_HOST, METRICS_LOG_PATH, METRICS_PORT, get_metrics, start_metrics_server
 
-# Import regex for fallback parsing
-import re
+# Start of this script run, for the render time in the diagnostics
+run_started = time.perf_counter()
 
 # Page configuration
 st.set_page_config(
@@ -606,6 +235,25 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Shared caches, created once per server process and reused across reruns and sessions
+analysis_cache = get_analysis_cache()
+jd_cache = get_jd_cache()
+text_store = get_text_store()
+job_store = get_job_store()
+result_store = get_result_store()
+metrics = get_metrics()
+metrics.inc("app_script_runs_total")
+
+# Prometheus endpoint for a local collector, if METRICS_PORT is set
+start_metrics_server()
+
+# Candidates per page in the Step 3 results table
+CANDIDATES_PER_PAGE = 25
+
+# Background workers for screening jobs, unless they run as a separate process
+if JOB_RUNNER_IN_PROCESS:
+    get_job_runner()
+
 # Initialize session state variables
 if 'current_step' not in st.session_state:
     st.session_state['current_step'] = 1
@@ -621,10 +269,124 @@ if 'shortlisted_candidates' not in st.session_state:
     st.session_state['shortlisted_candidates'] = []
 if 'interview_emails' not in st.session_state:
     st.session_state['interview_emails'] = {}
-if 'debug_mode' not in st.session_state:
-    st.session_state['debug_mode'] = False
-if 'emails_sent' not in st.session_state:
-    st.session_state['emails_sent'] = set()  # Keep track of sent emails
+if 'analysis_job' not in st.session_state:
+    st.session_state['analysis_job'] = None
+    
+    # Reattach to a screening job still referenced in the URL (e.g. after a page refresh)
+    job_id = st.query_params.get("job")
+    restored_job = job_store.get_job(job_id) if job_id else None
+    if restored_job:
+        st.session_state['analysis_job'] = {'id': job_id}
+        st.session_state['jd_summary'] = restored_job['jd_summary']
+        st.session_state['resumes'] = [
+            {'name': item['name'], 'sha256': item['sha256'], 'analyzed': False}
+            for item in job_store.get_items(job_id)
+        ]
+        st.session_state['current_step'] = 2
+if 'shortlist_threshold' not in st.session_state:
+    st.session_state['shortlist_threshold'] = 70
+if 'skill_matrix' not in st.session_state:
+    st.session_state['skill_matrix'] = None
+if 'shortlist_index' not in st.session_state:
+    st.session_state['shortlist_index'] = None
+if 'analyzed_jd_summary' not in st.session_state:
+    st.session_state['analyzed_jd_summary'] = None  # JD the current analyses were made against
+if 'interview_scheduler' not in st.session_state:
+    st.session_state['interview_scheduler'] = None  # Created in Step 4 on the shared schedule store
+if 'email_delivery' not in st.session_state:
+    st.session_state['email_delivery'] = {}  # Delivery record per candidate name
+if 'uploader_key' not in st.session_state:
+    st.session_state['uploader_key'] = 0  # Incremented to clear the resume uploader
+if 'upload_notice' not in st.session_state:
+    st.session_state['upload_notice'] = None
+if 'pool_notice' not in st.session_state:
+    st.session_state['pool_notice'] = None  # Resumes of a loaded requisition that could not be restored
+
+# Extracted text of the given resumes, copied into the shared result store with the pool so
+# replicas with their own text store can restore it
+def extracted_texts(digests):
+    texts = {digest: text_store.get_text(digest) for digest in digests}
+    return {digest: text for digest, text in texts.items() if text}
+
+# Withdraw the unbooked interview offers of candidates leaving this session's shortlist, so their
+# slots go back to the shared schedule; confirmed bookings are kept
+def release_interview_offers(candidates):
+    if candidates:
+        scheduler = st.session_state['interview_scheduler'] or InterviewScheduler(store=get_schedule_store())
+        scheduler.release_offers([candidate_key(candidate) for candidate in candidates])
+
+# Load a requisition from the shared result store into the session: its JD, resume pool and,
+# when the whole pool has been analyzed against the current JD, the analyses (going straight
+# to Step 3) and the shortlist saved for that JD (going on to Step 4). Stored analyses also
+# seed the analysis cache, so a new screening run only calls the model for resumes nobody has
+# analyzed yet. Returns False for an unknown requisition.
+def load_requisition(requisition_id):
+    requisition = result_store.get_requisition(requisition_id)
+    if requisition is None:
+        return False
+    
+    jd_summary = requisition['jd_summary']
+    previous_shortlist = st.session_state['shortlisted_candidates']
+    # Resumes uploaded to a replica with its own TEXT_STORE_PATH get their text from the copy in
+    # the result store; the ones still without text cannot be screened here and are left out
+    pool = result_store.get_resumes(requisition_id)
+    missing = [resume['sha256'] for resume in pool if resume['sha256'] not in text_store]
+    for digest, text in result_store.get_resume_texts(missing).items():
+        text_store.put(digest, {"text": text, "page_count": text.count("\f") + 1, "extraction_seconds": None, "error": None})
+    resumes = [resume for resume in pool if resume['sha256'] in text_store]
+    dropped = [resume['name'] for resume in pool if resume['sha256'] not in text_store]
+    st.session_state['pool_notice'] = (
+        f"{len(dropped)} resume(s) of requisition {requisition_id} were left out because their text is not "
+        f"available here: {', '.join(dropped)}. Upload them again to screen them."
+        if dropped else None
+    )
+    
+    analyses = result_store.get_analyses(requisition_id, jd_summary)
+    cv_texts = {resume['sha256']: text_store.get_text(resume['sha256']) or "" for resume in resumes}
+    for digest, analysis in analyses.items():
+        if cv_texts.get(digest):
+            cache_key = rescored_analysis_cache_key if analysis.get("Rescored") else analysis_cache_key
+            analysis_cache.set(cache_key(cv_texts[digest], jd_summary), analysis)
+    
+    st.session_state['jd_text'] = requisition['jd_text']
+    st.session_state['jd_summary'] = jd_summary
+    st.session_state['resumes'] = [
+        {'name': resume['name'], 'sha256': resume['sha256'], 'analyzed': resume['sha256'] in analyses}
+        for resume in resumes
+    ]
+    st.session_state['candidates_analysis'] = []
+    st.session_state['skill_matrix'] = None
+    st.session_state['shortlist_index'] = None
+    st.session_state['analyzed_jd_summary'] = None
+    st.session_state['shortlisted_candidates'] = []
+    st.session_state['interview_emails'] = {}
+    st.session_state['email_delivery'] = {}
+    st.session_state['interview_scheduler'] = None
+    st.session_state['current_step'] = 2
+    
+    if resumes and all(resume['sha256'] in analyses for resume in resumes):
+        st.session_state['candidates_analysis'] = [CandidateRecord(analyses[resume['sha256']]) for resume in resumes]
+        st.session_state['skill_matrix'] = SkillMatchMatrix([cv_texts[resume['sha256']] for resume in resumes], jd_summary)
+        st.session_state['analyzed_jd_summary'] = jd_summary
+        shortlist = result_store.get_shortlist(requisition_id)
+        if shortlist is not None and shortlist['jd_hash'] == hash_jd_summary(jd_summary):
+            st.session_state['shortlist_threshold'] = shortlist['threshold']
+            st.session_state['shortlisted_candidates'] = shortlist['entries']
+        st.session_state['current_step'] = 4 if st.session_state['shortlisted_candidates'] else 3
+    
+    shortlist_keys = {candidate_key(candidate) for candidate in st.session_state['shortlisted_candidates']}
+    release_interview_offers([candidate for candidate in previous_shortlist if candidate_key(candidate) not in shortlist_keys])
+    return True
+
+if 'requisition_id' not in st.session_state:
+    st.session_state['requisition_id'] = None  # Key of the shared results this session reads and writes
+    
+    # Reopen the requisition named in the URL, e.g. a link shared by another recruiter
+    requisition_id = st.query_params.get("req")
+    if requisition_id:
+        st.session_state['requisition_id'] = requisition_id
+        if st.session_state['analysis_job'] is None:
+            load_requisition(requisition_id)
 
 # Sidebar content
 with st.sidebar:
@@ -645,21 +407,95 @@ with st.sidebar:
     st.markdown(f"<div class='{step3_class}' style='padding:10px; margin-bottom:10px; border-radius:5px;'>Step 3: Candidate Shortlisting</div>", unsafe_allow_html=True)
     st.markdown(f"<div class='{step4_class}' style='padding:10px; margin-bottom:10px; border-radius:5px;'>Step 4: Interview Scheduling</div>", unsafe_allow_html=True)
     
+    # Shared requisition: results are saved under this ID and reused by every session that opens it
+    st.markdown("### 🗂️ Requisition")
+    requisition_input = st.text_input("Requisition ID", st.session_state['requisition_id'] or "",
+                                      placeholder="e.g. REQ-1042").strip()
+    if requisition_input != (st.session_state['requisition_id'] or ""):
+        st.session_state['requisition_id'] = requisition_input or None
+        if requisition_input:
+            st.query_params["req"] = requisition_input
+            if st.session_state['analysis_job'] is not None or not load_requisition(requisition_input):
+                # A new requisition (or one joined mid-analysis) starts from this session's work
+                jd_summary = st.session_state['jd_summary']
+                if jd_summary is not None and "error" not in jd_summary:
+                    result_store.save_requisition(requisition_input, st.session_state['jd_text'], jd_summary)
+                result_store.add_resumes(requisition_input, st.session_state['resumes'],
+                                         texts=extracted_texts([resume['sha256'] for resume in st.session_state['resumes']]))
+                
+                # Analyses line up with the resumes they were made from; later uploads come after them
+                analyzed_jd_summary = st.session_state['analyzed_jd_summary']
+                if analyzed_jd_summary is not None:
+                    # Analyses whose details were evicted are left out rather than saved incomplete
+                    analyses = {
+                        resume['sha256']: candidate.to_dict()
+                        for resume, candidate in zip(st.session_state['resumes'], st.session_state['candidates_analysis'])
+                        if resume['analyzed'] and "error" not in candidate
+                    }
+                    result_store.save_analyses(requisition_input, analyzed_jd_summary, {
+                        digest: analysis for digest, analysis in analyses.items() if analysis is not None
+                    })
+                    if st.session_state['shortlisted_candidates']:
+                        result_store.save_shortlist(requisition_input, analyzed_jd_summary,
+                                                    st.session_state['shortlist_threshold'],
+                                                    st.session_state['shortlisted_candidates'])
+        else:
+            st.query_params.pop("req", None)
+        st.experimental_rerun()
+    
+    if st.session_state['requisition_id']:
+        st.caption("Results are shared with everyone who opens this requisition.")
+        if st.session_state['analysis_job'] is None and st.button("🔃 Reload Requisition"):
+            load_requisition(st.session_state['requisition_id'])
+            st.experimental_rerun()
+    
     # Reset button
     if st.button("🔄 Start New Process"):
+        release_interview_offers(st.session_state['shortlisted_candidates'])
+        
         # Reset session state
         st.session_state['current_step'] = 1
         st.session_state['jd_text'] = ""
         st.session_state['jd_summary'] = None
         st.session_state['resumes'] = []
         st.session_state['candidates_analysis'] = []
+        st.session_state['skill_matrix'] = None
+        st.session_state['shortlist_index'] = None
+        st.session_state['analysis_job'] = None
+        st.session_state['analyzed_jd_summary'] = None
+        st.session_state['requisition_id'] = None
+        st.query_params.clear()
         st.session_state['shortlisted_candidates'] = []
         st.session_state['interview_emails'] = {}
+        st.session_state['email_delivery'] = {}
+        st.session_state['interview_scheduler'] = None
         st.experimental_rerun()
     
-    # Settings
-    # st.markdown("### ⚙️ Settings")
-    # st.session_state['debug_mode'] = st.checkbox("Enable Debug Mode", st.session_state['debug_mode'])
+    # Cache statistics
+    cache_stats = analysis_cache.stats()
+    st.caption(f"Analysis cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es), {cache_stats['entries']} stored")
+    jd_cache_stats = jd_cache.stats()
+    st.caption(f"JD cache: {jd_cache_stats['hit_rate']:.0%} hit rate, {jd_cache_stats['entries']} stored")
+    
+    # Diagnostics: per-stage timings and counters for this server process (all sessions)
+    with st.expander("🩺 Diagnostics"):
+        summary_rows = metrics.summary_rows()
+        counter_rows = metrics.counter_rows()
+        if not summary_rows and not counter_rows:
+            st.caption("No pipeline activity recorded yet.")
+        if summary_rows:
+            st.markdown("**Timings (seconds) and sizes**")
+            st.dataframe(pd.DataFrame(summary_rows).round(3), hide_index=True, use_container_width=True)
+        if counter_rows:
+            st.markdown("**Counters**")
+            st.dataframe(pd.DataFrame(counter_rows), hide_index=True, use_container_width=True)
+        if METRICS_PORT:
+            st.caption(f"Prometheus metrics: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        if METRICS_LOG_PATH:
+            st.caption(f"Event log: {METRICS_LOG_PATH}")
+        if st.button("Reset Metrics"):
+            metrics.reset()
+            st.experimental_rerun()
     
     # About
     st.markdown("### ℹ️ About HirEase ")
@@ -673,6 +509,10 @@ with st.sidebar:
 # Main content
 st.markdown("<h1 class='main-header'>👥 HirEase: Automated Job Screening with AI & Data Intelligence</h1>", unsafe_allow_html=True)
 
+if st.session_state['pool_notice']:
+    st.warning(st.session_state['pool_notice'])
+    st.session_state['pool_notice'] = None
+
 # Step 1: Job Description Analysis
 if st.session_state['current_step'] == 1:
     st.markdown("<h2>Step 1: Job Description Analysis</h2>", unsafe_allow_html=True)
@@ -697,6 +537,16 @@ if st.session_state['current_step'] == 1:
                 st.session_state['jd_summary'] = jd_summary
                 
                 if "error" not in jd_summary:
+                    if st.session_state['requisition_id']:
+                        result_store.save_requisition(st.session_state['requisition_id'], jd_text, jd_summary)
+                    
+                    # Resumes analyzed against an earlier version of the JD are screened again;
+                    # the job reuses their previous analyses where the changes allow it
+                    analyzed_jd_summary = st.session_state['analyzed_jd_summary']
+                    if analyzed_jd_summary is not None and changed_jd_fields(analyzed_jd_summary, jd_summary):
+                        for resume in st.session_state['resumes']:
+                            resume['analyzed'] = False
+                    
                     st.success("Job description analyzed successfully!")
                     st.session_state['current_step'] = 2
                     st.experimental_rerun()
@@ -733,63 +583,240 @@ elif st.session_state['current_step'] == 2:
         for skill in jd_summary.get('PreferredSkills', []):
             st.markdown(f"<span class='keyword-pill'>✨ {skill}</span>", unsafe_allow_html=True)
     
+    # Edit the extracted requirements without summarizing the JD again
+    with st.expander("✏️ Edit Requirements"):
+        required_text = st.text_area("Required skills (one per line)", "\n".join(jd_summary.get('RequiredSkills', [])))
+        preferred_text = st.text_area("Preferred skills (one per line)", "\n".join(jd_summary.get('PreferredSkills', [])))
+        
+        if st.button("💾 Save Requirements"):
+            edited_summary = dict(jd_summary)
+            edited_summary['RequiredSkills'] = [line.strip() for line in required_text.splitlines() if line.strip()]
+            edited_summary['PreferredSkills'] = [line.strip() for line in preferred_text.splitlines() if line.strip()]
+            
+            if changed_jd_fields(jd_summary, edited_summary):
+                st.session_state['jd_summary'] = edited_summary
+                if st.session_state['requisition_id']:
+                    result_store.save_requisition(st.session_state['requisition_id'], st.session_state['jd_text'], edited_summary)
+                for resume in st.session_state['resumes']:
+                    resume['analyzed'] = False
+                st.experimental_rerun()
+    
+    # Tell the recruiter how much work the JD edits cause for resumes already analyzed
+    analyzed_jd_summary = st.session_state['analyzed_jd_summary']
+    if analyzed_jd_summary is not None:
+        change_kind = jd_change_kind(analyzed_jd_summary, jd_summary)
+        if change_kind == "rescore":
+            st.info("Only the preferred skills changed: existing analyses will be re-scored locally without new AI calls.")
+        elif change_kind == "full":
+            st.warning("Core requirements changed: analyzed resumes will be sent for a new AI analysis.")
+    
     st.markdown("</div>", unsafe_allow_html=True)
     
     # CV Upload
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.markdown("<p class='section-header'>📎 Upload Resumes</p>", unsafe_allow_html=True)
     
-    uploaded_files = st.file_uploader("Upload candidate resumes (PDF format)", type="pdf", accept_multiple_files=True)
+    # A new uploader key after each upload clears the widget, so Streamlit drops the PDF bytes
+    uploaded_files = st.file_uploader("Upload candidate resumes (PDF format)", type="pdf", accept_multiple_files=True,
+                                      key=f"resume_uploader_{st.session_state['uploader_key']}")
     
     if uploaded_files:
-        # Keep track of new uploads
+        # Keep track of new uploads by content: a PDF already in the list is skipped (unless its
+        # text could not be extracted, which is retried), a different file with the name of a
+        # listed resume is kept alongside it, and a file named like a resume without text replaces it
         new_uploads = []
-        existing_names = [resume['name'] for resume in st.session_state['resumes']]
+        known_digests = {resume['sha256'] for resume in st.session_state['resumes']}
+        extraction_errors = text_store.get_errors(known_digests)
+        failed_positions = {
+            resume['name']: i for i, resume in enumerate(st.session_state['resumes']) if resume['sha256'] in extraction_errors
+        }
         
+        seen_digests = set()
         for file in uploaded_files:
-            if file.name not in existing_names:
+            digest = pdf_digest(file.getvalue())
+            if digest not in seen_digests and (digest not in known_digests or digest in extraction_errors):
                 new_uploads.append(file)
-                st.session_state['resumes'].append({
-                    'name': file.name,
-                    'file': file,
-                    'analyzed': False
-                })
+            seen_digests.add(digest)
         
         if new_uploads:
-            st.success(f"{len(new_uploads)} new resume(s) uploaded successfully!")
+            # Extract text once per distinct PDF; only the content hash is kept in the session
+            with st.spinner("⏳ Extracting text from resumes..."):
+                digests = text_store.add_pdfs([file.getvalue() for file in new_uploads])
+            
+            new_resumes = []
+            replaced_digests = []
+            for file, digest in zip(new_uploads, digests):
+                resume = {'name': file.name, 'sha256': digest, 'analyzed': False}
+                position = failed_positions.pop(file.name, None)
+                if position is not None:
+                    if st.session_state['resumes'][position]['sha256'] != digest:
+                        replaced_digests.append(st.session_state['resumes'][position]['sha256'])
+                    st.session_state['resumes'][position] = resume
+                elif digest in known_digests:
+                    # A retried PDF uploaded under another name keeps its place in the list
+                    continue
+                else:
+                    st.session_state['resumes'].append(resume)
+                new_resumes.append(resume)
+            if st.session_state['requisition_id']:
+                result_store.remove_resumes(st.session_state['requisition_id'], replaced_digests)
+                result_store.add_resumes(st.session_state['requisition_id'], new_resumes, texts=extracted_texts(digests))
+            
+            upload_errors = text_store.get_errors(digests)
+            failed = sum(digest in upload_errors for digest in digests)
+            name_counts = Counter(resume['name'] for resume in st.session_state['resumes'])
+            same_name = sum(name_counts[resume['name']] > 1 for resume in new_resumes)
+            st.session_state['upload_notice'] = f"{len(new_uploads)} new resume(s) uploaded successfully!" + (
+                f" Text could not be extracted from {failed} of them; upload a text-based PDF with the same name to replace it."
+                if failed else ""
+            ) + (
+                f" {same_name} of them have the same file name as another resume; both are kept."
+                if same_name else ""
+            )
         
+        st.session_state['uploader_key'] += 1
+        st.experimental_rerun()
+    
+    if st.session_state['upload_notice']:
+        st.success(st.session_state['upload_notice'])
+        st.session_state['upload_notice'] = None
+    
+    if st.session_state['resumes']:
         # Display uploaded files
         st.markdown("### Uploaded Resumes")
+        extraction_errors = text_store.get_errors([resume['sha256'] for resume in st.session_state['resumes']])
+        name_counts = Counter(resume['name'] for resume in st.session_state['resumes'])
         for i, resume in enumerate(st.session_state['resumes']):
-            status = "✅ Analyzed" if resume['analyzed'] else "⏳ Pending Analysis"
+            if resume['sha256'] in extraction_errors:
+                status = f"❌ {extraction_errors[resume['sha256']]}"
+            else:
+                status = "✅ Analyzed" if resume['analyzed'] else "⏳ Pending Analysis"
+            if name_counts[resume['name']] > 1:
+                status += " (⚠️ another resume has the same file name)"
             st.markdown(f"{i+1}. {resume['name']} - {status}")
     
-    if st.session_state['resumes']:
-        if st.button("📊 Analyze All Resumes"):
-            with st.spinner("⏳ Analyzing resumes against job requirements..."):
-                # Reset candidates analysis
-                st.session_state['candidates_analysis'] = []
-                
-                for i, resume in enumerate(st.session_state['resumes']):
-                    if not resume['analyzed']:
-                        # Extract text from resume
-                        cv_text = input_pdf_text(resume['file'])
-                        
-                        # Analyze the CV
-                        analysis = analyze_cv(cv_text, st.session_state['jd_summary'])
-                        
-                        if "error" not in analysis:
-                            st.session_state['resumes'][i]['analyzed'] = True
-                            st.session_state['candidates_analysis'].append(analysis)
-                        else:
-                            st.session_state['candidates_analysis'].append({
-                                "error": f"Failed to analyze {resume['name']}: {analysis['error']}",
-                                "CandidateName": f"Error with {resume['name']}"
-                            })
-                
-                st.success(f"Analyzed {len(st.session_state['resumes'])} resume(s)!")
-                st.session_state['current_step'] = 3
+    analysis_job = st.session_state['analysis_job']
+    poll_job = False
+    if analysis_job:
+        # Screening runs in a background job; this page only polls its progress
+        job = job_store.get_job(analysis_job['id'])
+        items = job_store.get_items(analysis_job['id']) if job else []
+        done_items = [item for item in items if item['status'] in ('done', 'failed')]
+        
+        if job is None:
+            st.error("The screening job could not be found. Please start the analysis again.")
+            st.session_state['analysis_job'] = None
+            st.query_params.pop("job", None)
+        elif job['status'] in ('queued', 'running'):
+            poll_job = True
+            total = max(job['total'], 1)
+            status_text = "Waiting for a worker..." if job['status'] == 'queued' else f"Analyzed {job['completed']} of {job['total']} resume(s)"
+            st.progress(job['completed'] / total, text=status_text)
+        
+        # Live ranked results, updated as each analysis completes
+        threshold = st.session_state['shortlist_threshold']
+        live_rows = []
+        failed_count = 0
+        shortlisted_count = 0
+        for item in done_items:
+            analysis = item['result']
+            if "error" in analysis:
+                failed_count += 1
+                continue
+            if shortlist_score(analysis) >= threshold:
+                shortlisted_count += 1
+            live_rows.append({
+                "Candidate": analysis.get('CandidateName', item['name']),
+                "Overall %": parse_match_percentage(analysis.get('OverallMatch', '0%')),
+                "Skills": analysis.get('SkillMatch', '0%'),
+                "Experience": analysis.get('ExperienceMatch', '0%'),
+                "Qualifications": analysis.get('QualificationMatch', '0%'),
+                "Recommendation": analysis.get('Recommendation', ''),
+                "Resume Tokens": analysis.get('ResumeTokens', {}).get('original'),
+                "Prompt Tokens": analysis.get('ResumeTokens', {}).get('prompt'),
+                "File": item['name']
+            })
+        
+        if job is not None:
+            st.markdown(
+                f"**{len(done_items)} of {job['total']} resume(s) analyzed — "
+                f"{shortlisted_count} at or above the {threshold}% shortlist threshold**"
+                + (f" ({failed_count} failed)" if failed_count else "")
+            )
+            # Token savings from resume compaction (pre-screened results have no counts)
+            token_rows = [row for row in live_rows if row["Resume Tokens"] and row["Prompt Tokens"]]
+            if token_rows:
+                original_tokens = sum(row["Resume Tokens"] for row in token_rows)
+                prompt_tokens = sum(row["Prompt Tokens"] for row in token_rows)
+                st.caption(f"Resume compaction: {original_tokens:,} → {prompt_tokens:,} estimated tokens "
+                           f"({100 * (1 - prompt_tokens / original_tokens):.0f}% fewer)")
+            if live_rows:
+                table = pd.DataFrame(live_rows).sort_values("Overall %", ascending=False, kind="stable")
+                st.dataframe(table, use_container_width=True, hide_index=True)
+        
+        if job is not None and job['status'] == 'failed':
+            st.error(f"Screening job failed: {job['error']}")
+            if st.button("🔁 Retry Analysis"):
+                st.session_state['analysis_job'] = None
+                st.query_params.pop("job", None)
                 st.experimental_rerun()
+        elif job is not None and job['status'] == 'completed':
+            # Move the job results into the session, in upload order, as compact records
+            # whose long fields stay on disk until displayed
+            st.session_state['candidates_analysis'] = []
+            resume_positions = {resume['sha256']: i for i, resume in enumerate(st.session_state['resumes'])}
+            for item in items:
+                analysis = item['result'] or {"error": "No result was recorded"}
+                if "error" not in analysis:
+                    if item['sha256'] in resume_positions:
+                        st.session_state['resumes'][resume_positions[item['sha256']]]['analyzed'] = True
+                    st.session_state['candidates_analysis'].append(CandidateRecord(analysis))
+                else:
+                    st.session_state['candidates_analysis'].append(CandidateRecord({
+                        "error": f"Failed to analyze {item['name']}: {analysis['error']}",
+                        "CandidateName": f"Error with {item['name']}"
+                    }))
+            
+            # Share the analyses with other sessions working on the requisition
+            if st.session_state['requisition_id']:
+                result_store.save_analyses(
+                    st.session_state['requisition_id'],
+                    job['jd_summary'],
+                    {item['sha256']: item['result'] for item in items if item['result'] and "error" not in item['result']}
+                )
+            
+            # Keyword match matrix for the whole pool, reused for ranking in Step 3
+            cv_texts = [text_store.get_text(item['sha256']) or "" for item in items]
+            st.session_state['skill_matrix'] = SkillMatchMatrix(cv_texts, job['jd_summary'])
+            st.session_state['analyzed_jd_summary'] = job['jd_summary']
+            
+            st.session_state['analysis_job'] = None
+            st.query_params.pop("job", None)
+            st.success(f"Analyzed {len(items)} resume(s)!")
+            st.session_state['current_step'] = 3
+            st.experimental_rerun()
+    
+    elif st.session_state['resumes']:
+        prescreen_cutoff = st.slider(
+            "Keyword pre-screen cutoff (resumes scoring below this skip AI analysis, 0 disables)",
+            min_value=0, max_value=80, value=PRESCREEN_CUTOFF, step=5
+        )
+        
+        if st.button("📊 Analyze All Resumes"):
+            # The whole pool is screened so the results stay complete; resumes analyzed before
+            # come back from the cache or are carried over from the previous JD
+            analyzed_jd_summary = st.session_state['analyzed_jd_summary']
+            job_id = submit_screening_job(
+                st.session_state['jd_summary'],
+                [{'name': resume['name'], 'sha256': resume['sha256']} for resume in st.session_state['resumes']],
+                prescreen_cutoff,
+                previous_jd_summary=analyzed_jd_summary if analyzed_jd_summary != st.session_state['jd_summary'] else None
+            )
+            
+            # Keep the job id in the URL so a refreshed page can pick the job up again
+            st.session_state['analysis_job'] = {'id': job_id}
+            st.query_params["job"] = job_id
+            st.experimental_rerun()
     else:
         st.info("Please upload at least one resume to proceed.")
     
@@ -799,6 +826,11 @@ elif st.session_state['current_step'] == 2:
     if st.button("⬅️ Back to Job Description"):
         st.session_state['current_step'] = 1
         st.experimental_rerun()
+    
+    # Poll the running job; it keeps going in the background if the page goes away
+    if poll_job:
+        time.sleep(JOB_POLL_SECONDS)
+        st.experimental_rerun()
 
 # Step 3: Candidate Shortlisting
 elif st.session_state['current_step'] == 3:
@@ -808,73 +840,140 @@ elif st.session_state['current_step'] == 3:
     st.markdown("<p class='section-header'>🎯 Set Shortlisting Criteria</p>", unsafe_allow_html=True)
     
     # Shortlisting threshold slider
-    threshold = st.slider("Minimum Match Percentage for Shortlisting", min_value=50, max_value=95, value=70, step=5)
+    threshold = st.slider("Minimum Match Percentage for Shortlisting", min_value=50, max_value=95,
+                          value=st.session_state['shortlist_threshold'], step=5)
+    st.session_state['shortlist_threshold'] = threshold
+    
+    # Sorted score index over the pool, rebuilt only when the analyses change
+    shortlist_index = st.session_state['shortlist_index']
+    if shortlist_index is None or shortlist_index.candidates is not st.session_state['candidates_analysis']:
+        # Analyses line up with the resumes they were made from, so entries carry the resume digest
+        digests = [resume['sha256'] for resume in st.session_state['resumes']]
+        shortlist_index = ShortlistIndex(
+            st.session_state['candidates_analysis'],
+            digests if len(digests) >= len(st.session_state['candidates_analysis']) else None
+        )
+        st.session_state['shortlist_index'] = shortlist_index
+    st.markdown(f"**{shortlist_index.count_at_or_above(threshold)} of {len(shortlist_index)} candidate(s) at or above {threshold}%**")
     
     # Candidates analysis results
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.markdown("<p class='section-header'>📊 Candidate Analysis Results</p>", unsafe_allow_html=True)
     
     if st.session_state['candidates_analysis']:
-        for i, candidate in enumerate(st.session_state['candidates_analysis']):
-            if "error" in candidate:
-                st.error(candidate["error"])
-                continue
-                
-            # Create an expandable section for each candidate
-            with st.expander(f"📄 {candidate.get('CandidateName', f'Candidate {i+1}')} - Match: {candidate.get('OverallMatch', '0%')}"):
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    st.markdown(f"**Name:** {candidate.get('CandidateName', 'Not identified')}")
-                    st.markdown(f"**Contact:** {candidate.get('ContactInfo', 'Not found')}")
-                    st.markdown(f"**Education:** {', '.join(candidate.get('Education', ['Not specified']))}")
-                    
-                    st.markdown("**Experience:**")
-                    for exp in candidate.get('Experience', [])[:3]:
-                        st.markdown(f"- {exp}")
-                
-                with col2:
-                    # Match percentages
-                    st.markdown("**Match Scores:**")
-                    st.markdown(f"Skills: {candidate.get('SkillMatch', '0%')}")
-                    st.markdown(f"Experience: {candidate.get('ExperienceMatch', '0%')}")
-                    st.markdown(f"Qualifications: {candidate.get('QualificationMatch', '0%')}")
-                    st.markdown(f"Overall: {candidate.get('OverallMatch', '0%')}")
-                    
-                    # Recommendation
-                    recommendation = candidate.get('Recommendation', 'No recommendation')
-                    rec_color = "#4CAF50" if "shortlist" in recommendation.lower() else "#F44336" if "reject" in recommendation.lower() else "#FFC107"
-                    st.markdown(f"**Recommendation:** <span style='color:{rec_color};font-weight:bold;'>{recommendation}</span>", unsafe_allow_html=True)
+        # Failed analyses are listed once instead of one element each
+        errors = [candidate["error"] for candidate in st.session_state['candidates_analysis'] if "error" in candidate]
+        if errors:
+            st.error(f"{len(errors)} resume(s) could not be analyzed:\n\n" + "\n".join(f"- {error}" for error in errors))
+        
+        # Ranked summary table, one page at a time
+        only_above_threshold = st.checkbox("Only show candidates at or above the threshold", value=False)
+        visible_count = shortlist_index.count_at_or_above(threshold) if only_above_threshold else len(shortlist_index)
+        page_count = max(1, -(-visible_count // CANDIDATES_PER_PAGE))
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+        start = (page - 1) * CANDIDATES_PER_PAGE
+        end = min(start + CANDIDATES_PER_PAGE, visible_count)
+        
+        page_candidates = [st.session_state['candidates_analysis'][i] for i in shortlist_index.positions[start:end]]
+        page_labels = [
+            f"#{start + rank + 1} {candidate.get('CandidateName', 'Not identified')} - Match: {candidate.get('OverallMatch', '0%')}"
+            for rank, candidate in enumerate(page_candidates)
+        ]
+        if page_candidates:
+            st.dataframe(pd.DataFrame([
+                {
+                    "Rank": start + rank + 1,
+                    "Candidate": candidate.get('CandidateName', 'Not identified'),
+                    "Overall": candidate.get('OverallMatch', '0%'),
+                    "Skills": candidate.get('SkillMatch', '0%'),
+                    "Experience": candidate.get('ExperienceMatch', '0%'),
+                    "Qualifications": candidate.get('QualificationMatch', '0%'),
+                    "Recommendation": candidate.get('Recommendation', '')
+                }
+                for rank, candidate in enumerate(page_candidates)
+            ]), use_container_width=True, hide_index=True)
+        else:
+            st.info("No candidates to show.")
+        
+        # Details are rendered for the selected candidate only
+        selected_label = st.selectbox("📄 Candidate details", ["None"] + page_labels)
+        if selected_label != "None":
+            # A plain dict, so the stored details are read once for the whole panel
+            record = page_candidates[page_labels.index(selected_label)]
+            candidate = record.to_dict()
+            if candidate is None:
+                st.warning("The full analysis of this candidate is no longer stored; analyze the resumes again to see it.")
+                candidate = {field: record.get(field) for field in SUMMARY_FIELDS if field in record}
+            col1, col2 = st.columns([1, 1])
+            
+            with col1:
+                st.markdown(f"**Name:** {candidate.get('CandidateName', 'Not identified')}")
+                st.markdown(f"**Contact:** {candidate.get('ContactInfo', 'Not found')}")
+                st.markdown(f"**Education:** {', '.join(candidate.get('Education', ['Not specified']))}")
                 
-                # Skills section
-                st.markdown("**Matched Skills:**")
-                for skill in candidate.get('MatchedSkills', []):
-                    st.markdown(f"<span class='keyword-pill matched-keyword'>✓ {skill}</span>", unsafe_allow_html=True)
-                    
-                st.markdown("**Missing Skills:**")
-                for skill in candidate.get('MissingSkills', []):
-                    st.markdown(f"<span class='keyword-pill missing-keyword'>✗ {skill}</span>", unsafe_allow_html=True)
+                st.markdown("**Experience:**\n" + "\n".join(f"- {exp}" for exp in candidate.get('Experience', [])[:3]))
+            
+            with col2:
+                # Match percentages
+                st.markdown(
+                    "**Match Scores:**  \n"
+                    f"Skills: {candidate.get('SkillMatch', '0%')}  \n"
+                    f"Experience: {candidate.get('ExperienceMatch', '0%')}  \n"
+                    f"Qualifications: {candidate.get('QualificationMatch', '0%')}  \n"
+                    f"Overall: {candidate.get('OverallMatch', '0%')}"
+                )
                 
-                # Strengths and Areas for Improvement
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.markdown("**Strengths:**")
-                    for strength in candidate.get('Strengths', []):
-                        st.markdown(f"- {strength}")
-                        
-                with col2:
-                    st.markdown("**Areas for Improvement:**")
-                    for area in candidate.get('Areas_for_Improvement', []):
-                        st.markdown(f"- {area}")
+                # Recommendation
+                recommendation = candidate.get('Recommendation', 'No recommendation')
+                rec_color = "#4CAF50" if "shortlist" in recommendation.lower() else "#F44336" if "reject" in recommendation.lower() else "#FFC107"
+                st.markdown(f"**Recommendation:** <span style='color:{rec_color};font-weight:bold;'>{recommendation}</span>", unsafe_allow_html=True)
+            
+            # Skills section, one element per list of pills
+            st.markdown("**Matched Skills:**")
+            st.markdown(" ".join(f"<span class='keyword-pill matched-keyword'>✓ {skill}</span>" for skill in candidate.get('MatchedSkills', [])), unsafe_allow_html=True)
+            
+            st.markdown("**Missing Skills:**")
+            st.markdown(" ".join(f"<span class='keyword-pill missing-keyword'>✗ {skill}</span>" for skill in candidate.get('MissingSkills', [])), unsafe_allow_html=True)
+            
+            # Strengths and Areas for Improvement
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Strengths:**\n" + "\n".join(f"- {strength}" for strength in candidate.get('Strengths', [])))
+            
+            with col2:
+                st.markdown("**Areas for Improvement:**\n" + "\n".join(f"- {area}" for area in candidate.get('Areas_for_Improvement', [])))
     else:
         st.warning("No candidates have been analyzed yet.")
     st.markdown("</div>", unsafe_allow_html=True)
     
+    # Keyword match ranking over the whole pool, built only when asked for and one page at a time
+    skill_matrix = st.session_state['skill_matrix']
+    if skill_matrix is not None and skill_matrix.matrix.shape[0] == len(st.session_state['candidates_analysis']):
+        with st.expander("📐 Keyword Match Ranking"):
+            if st.toggle("Show keyword match ranking", value=False):
+                candidates = st.session_state['candidates_analysis']
+                keyword_page_count = max(1, -(-len(candidates) // CANDIDATES_PER_PAGE))
+                keyword_page = st.number_input(f"Ranking page (of {keyword_page_count})", min_value=1,
+                                               max_value=keyword_page_count, value=1, step=1)
+                keyword_start = (keyword_page - 1) * CANDIDATES_PER_PAGE
+                st.dataframe(skill_matrix.to_dataframe(
+                    lambda rows: [candidates[i].get('CandidateName', f'Candidate {i+1}') for i in rows],
+                    keyword_start, keyword_start + CANDIDATES_PER_PAGE
+                ), use_container_width=True, hide_index=True)
+    
     # Shortlist button
     if st.button("👍 Shortlist Candidates"):
         with st.spinner("⏳ Shortlisting candidates..."):
-            shortlisted = shortlist_candidates(st.session_state['candidates_analysis'], threshold)
+            shortlisted = shortlist_candidates(st.session_state['candidates_analysis'], threshold, index=shortlist_index)
+            shortlist_keys = {candidate_key(candidate) for candidate in shortlisted}
+            release_interview_offers([
+                candidate for candidate in st.session_state['shortlisted_candidates']
+                if candidate_key(candidate) not in shortlist_keys
+            ])
             st.session_state['shortlisted_candidates'] = shortlisted
+            if st.session_state['requisition_id'] and st.session_state['analyzed_jd_summary'] is not None:
+                result_store.save_shortlist(st.session_state['requisition_id'], st.session_state['analyzed_jd_summary'],
+                                            threshold, shortlisted)
             
             st.success(f"Shortlisted {len(shortlisted)} candidate(s)!")
             if shortlisted:
@@ -896,6 +995,57 @@ elif st.session_state['current_step'] == 4:
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.markdown("<p class='section-header'>👥 Shortlisted Candidates</p>", unsafe_allow_html=True)
     
+    # Template modes draft emails locally, without (or with one short) model call per candidate
+    email_mode_labels = {
+        "llm": "AI-written email",
+        "template": "Template (instant, no API calls)",
+        "hybrid": "Template with an AI-personalized paragraph"
+    }
+    email_mode_label = st.selectbox(
+        "Email drafting", list(email_mode_labels.values()),
+        index=EMAIL_RENDER_MODES.index(EMAIL_RENDER_MODE) if EMAIL_RENDER_MODE in EMAIL_RENDER_MODES else 0
+    )
+    email_mode = next(mode for mode, label in email_mode_labels.items() if label == email_mode_label)
+    
+    # One schedule shared by every session, so no interviewer's time is offered twice.
+    # Refreshed on each run to show offers and bookings made elsewhere.
+    if st.session_state['interview_scheduler'] is None:
+        st.session_state['interview_scheduler'] = InterviewScheduler(store=get_schedule_store())
+    scheduler = st.session_state['interview_scheduler']
+    scheduler.refresh()
+    
+    def assigned_slots(candidates):
+        offers = scheduler.assign([(candidate_key(candidate), candidate['name']) for candidate in candidates])
+        return [[format_slot(offer['start']) for offer in offers[candidate_key(candidate)]] for candidate in candidates]
+    
+    # Draft emails for everyone still without one, several model calls at a time
+    missing_emails = [
+        candidate for candidate in st.session_state['shortlisted_candidates']
+        if candidate['name'] not in st.session_state['interview_emails']
+    ]
+    if missing_emails and st.button(f"✨ Generate All Emails ({len(missing_emails)})"):
+        progress_bar = st.progress(0.0, text=f"Generating {len(missing_emails)} email(s)...")
+        failures = []
+        
+        def save_email(index, email_data):
+            if "error" in email_data:
+                failures.append(f"{missing_emails[index]['name']}: {email_data['error']}")
+            else:
+                st.session_state['interview_emails'][missing_emails[index]['name']] = email_data
+        
+        def show_progress(completed, total):
+            progress_bar.progress(completed / total, text=f"Generated {completed} of {total} email(s)")
+        
+        generate_interview_emails_concurrently(
+            missing_emails, st.session_state['jd_summary'], on_progress=show_progress, on_result=save_email, mode=email_mode,
+            proposed_slots=assigned_slots(missing_emails)
+        )
+        
+        if failures:
+            st.error("Some emails could not be generated:\n\n" + "\n".join(f"- {failure}" for failure in failures))
+        else:
+            st.experimental_rerun()
+    
     if st.session_state['shortlisted_candidates']:
         for i, candidate in enumerate(st.session_state['shortlisted_candidates']):
             st.markdown(f"<div class='candidate-card'>", unsafe_allow_html=True)
@@ -909,10 +1059,39 @@ elif st.session_state['current_step'] == 4:
                 # Truncate strengths to first 2
                 strengths_text = ", ".join([s.split(':')[0] if ':' in s else s for s in candidate['strengths'][:2]])
                 st.markdown(f"*Key strengths:* {strengths_text}")
+                
+                # Confirm the slot the candidate picked; their other offered slots are released
+                booking = scheduler.bookings.get(candidate_key(candidate))
+                offers = scheduler.offers.get(candidate_key(candidate), [])
+                if booking:
+                    st.markdown(f"*Interview:* {format_slot(booking['start'])} with {booking['interviewer']}")
+                elif offers:
+                    offer_labels = [f"{format_slot(offer['start'])} with {offer['interviewer']}" for offer in offers]
+                    slot_col, book_col = st.columns([3, 1])
+                    with slot_col:
+                        offer_label = st.selectbox("Offered slots", offer_labels, key=f"slot_select_{i}",
+                                                   label_visibility="collapsed")
+                    with book_col:
+                        if st.button("📌 Book", key=f"book_btn_{i}"):
+                            booked = scheduler.book(candidate_key(candidate), offers[offer_labels.index(offer_label)]['uid'])
+                            if booked is None:
+                                st.error("The offer has expired or was withdrawn in another session; please reload.")
+                            else:
+                                st.experimental_rerun()
             
             with col2:
-                email_status = "📨 Sent" if candidate['name'] in st.session_state['interview_emails'] else "📝 Draft Email"
-                st.markdown(f"<div style='padding:5px;border-radius:5px;background-color:{'#c8e6c9' if candidate['name'] in st.session_state['interview_emails'] else '#e0e0e0'};text-align:center;'>{email_status}</div>", unsafe_allow_html=True)
+                delivery_status = st.session_state['email_delivery'].get(candidate['name'], {}).get('status')
+                if delivery_status == "sent":
+                    email_status, status_color = "📨 Sent", "#c8e6c9"
+                elif delivery_status == "failed":
+                    email_status, status_color = "⚠️ Failed", "#ffcdd2"
+                elif delivery_status == "mailto":
+                    email_status, status_color = "✉️ In Email Client", "#fff9c4"
+                elif candidate['name'] in st.session_state['interview_emails']:
+                    email_status, status_color = "📝 Draft Ready", "#e3f2fd"
+                else:
+                    email_status, status_color = "📝 Draft Email", "#e0e0e0"
+                st.markdown(f"<div style='padding:5px;border-radius:5px;background-color:{status_color};text-align:center;'>{email_status}</div>", unsafe_allow_html=True)
                 
             with col3:
                 # Email button per candidate
@@ -920,7 +1099,9 @@ elif st.session_state['current_step'] == 4:
                 if st.button(button_label, key=f"email_btn_{i}"):
                     if candidate['name'] not in st.session_state['interview_emails']:
                         with st.spinner(f"⏳ Generating email for {candidate['name']}..."):
-                            email_data = generate_interview_email(candidate, st.session_state['jd_summary'])
+                            email_data = generate_interview_email(
+                                candidate, st.session_state['jd_summary'], email_mode, assigned_slots([candidate])[0]
+                            )
                             if "error" not in email_data:
                                 st.session_state['interview_emails'][candidate['name']] = email_data
                             else:
@@ -943,9 +1124,9 @@ elif st.session_state['current_step'] == 4:
                         mailto_result = generate_mailto_link(email_data)
                         if mailto_result["status"] == "success":
                             mailto_link = mailto_result["mailto_link"]
-                            # Mark as processed in session state
-                            if candidate['name'] not in st.session_state['emails_sent']:
-                                st.session_state['emails_sent'].add(candidate['name'])
+                            # Mark as handed to the email client unless it was already delivered
+                            if st.session_state['email_delivery'].get(candidate['name'], {}).get('status') != "sent":
+                                st.session_state['email_delivery'][candidate['name']] = {"status": "mailto", "recipient": email_data['candidate_email']}
                             
                             # Create a link that opens the default email client
                             st.markdown(f"""
@@ -964,6 +1145,49 @@ elif st.session_state['current_step'] == 4:
         st.warning("No candidates have been shortlisted yet.")
     st.markdown("</div>", unsafe_allow_html=True)
     
+    # Offered and booked interview slots across the shortlist
+    shortlist_keys = [candidate_key(candidate) for candidate in st.session_state['shortlisted_candidates']]
+    schedule_rows = scheduler.rows(shortlist_keys)
+    unscheduled = [
+        candidate for candidate in st.session_state['shortlisted_candidates']
+        if candidate['name'] in st.session_state['interview_emails']
+        and not scheduler.offers.get(candidate_key(candidate)) and candidate_key(candidate) not in scheduler.bookings
+    ]
+    if unscheduled:
+        st.warning(f"No free interview slots were left for {len(unscheduled)} candidate(s); their emails propose unchecked times. "
+                   "Add interviewers (INTERVIEWERS) or days (INTERVIEW_SCHEDULE_DAYS).")
+    if schedule_rows:
+        with st.expander(f"🗓️ Interview Schedule ({len(schedule_rows)} slot(s))"):
+            st.dataframe(pd.DataFrame([
+                {
+                    "Slot": format_slot(row['start']),
+                    "Candidate": row['candidate'],
+                    "Interviewer": row['interviewer'],
+                    "Status": row['status']
+                }
+                for row in schedule_rows
+            ]), use_container_width=True, hide_index=True)
+            st.download_button(
+                "📅 Download Calendar (.ics)",
+                export_ics(scheduler, st.session_state['jd_summary'].get('JobTitle', 'Interview'),
+                           candidate_ids=shortlist_keys),
+                file_name="interviews.ics",
+                mime="text/calendar"
+            )
+            
+            # Give slots offered in unsent emails of unbooked candidates back to the shared schedule;
+            # those drafts are dropped, and new slots are offered when the emails are drafted again
+            if st.button("🔓 Release Unbooked Slots"):
+                unsent = [
+                    candidate for candidate in st.session_state['shortlisted_candidates']
+                    if st.session_state['email_delivery'].get(candidate['name'], {}).get('status') != "sent"
+                    and candidate_key(candidate) not in scheduler.bookings
+                ]
+                scheduler.release_offers([candidate_key(candidate) for candidate in unsent])
+                for candidate in unsent:
+                    st.session_state['interview_emails'].pop(candidate['name'], None)
+                st.experimental_rerun()
+    
     # Send all emails button
     if st.session_state['shortlisted_candidates'] and st.session_state['interview_emails']:
         st.markdown("<div class='card'>", unsafe_allow_html=True)
@@ -977,8 +1201,8 @@ elif st.session_state['current_step'] == 4:
                         mailto_result = generate_mailto_link(email_data)
                         if mailto_result["status"] == "success":
                             all_mailto_links.append((candidate_name, mailto_result["mailto_link"]))
-                            if candidate_name not in st.session_state['emails_sent']:
-                                st.session_state['emails_sent'].add(candidate_name)
+                            if st.session_state['email_delivery'].get(candidate_name, {}).get('status') != "sent":
+                                st.session_state['email_delivery'][candidate_name] = {"status": "mailto", "recipient": email_data['candidate_email']}
                     
                     if all_mailto_links:
                         st.success(f"Prepared {len(all_mailto_links)} email links!")
@@ -998,6 +1222,32 @@ elif st.session_state['current_step'] == 4:
                             """, unsafe_allow_html=True)
                     else:
                         st.warning("No emails to prepare.")
+            
+            # Deliver the drafts directly over SMTP, skipping ones already sent
+            unsent = [
+                (candidate_name, email_data) for candidate_name, email_data in st.session_state['interview_emails'].items()
+                if st.session_state['email_delivery'].get(candidate_name, {}).get('status') != "sent"
+            ]
+            if not smtp_configured():
+                st.caption("Set EMAIL_ADDRESS (and SMTP_HOST/EMAIL_PASSWORD) to send emails directly.")
+            elif unsent and st.button(f"📤 Send All Emails via {SMTP_HOST} ({len(unsent)})", use_container_width=True):
+                progress_bar = st.progress(0.0, text=f"Sending {len(unsent)} email(s)...")
+                
+                def record_delivery(index, record):
+                    st.session_state['email_delivery'][unsent[index][0]] = record
+                
+                def show_progress(completed, total):
+                    progress_bar.progress(completed / total, text=f"Sent {completed} of {total} email(s)")
+                
+                with SMTPSender() as sender:
+                    records = sender.send_batch(
+                        [email_data for _, email_data in unsent], on_result=record_delivery, on_progress=show_progress
+                    )
+                
+                failed = [(name, record) for (name, _), record in zip(unsent, records) if record['status'] != "sent"]
+                st.success(f"Sent {len(records) - len(failed)} of {len(records)} email(s).")
+                for name, record in failed:
+                    st.error(f"{name}: {record['error']}")
         st.markdown("</div>", unsafe_allow_html=True)
     
     # Back button
@@ -1021,3 +1271,6 @@ if st.session_state['current_step'] > 4:
     To start a new recruitment process, click the "Start New Process" button in the sidebar.
     """)
     st.markdown("</div>", unsafe_allow_html=True)
+
+# Render time of script runs that reach the end (runs cut short by a rerun are not included)
+metrics.observe("app_run_seconds", time.perf_counter() - run_started)
@@ -0,0 +1,358 @@
+# Offline benchmark of the screening pipeline: generates a synthetic corpus of text PDFs,
+# swaps Gemini for a fake backend with configurable latency, error and rate-limit (429)
+# rates, and runs the app's own entry points (TextStore.add_pdfs, screen_resumes,
+# shortlist_candidates, generate_interview_emails_concurrently), reporting throughput,
+# per-stage latency percentiles from the pipeline's metrics and peak memory:
+#
+#     python benchmark.py --resumes 200 --latency 0.3 --error-rate 0.01 --rate-limit-rate 0.05
+#     python benchmark.py --resumes 200 --batch-size 5 --prescreen-cutoff 30
+#
+# No API quota is used; results go to stdout and, with --output, to a JSON file.
+import os
+
+# Throwaway caches, so results never come from (or pollute) the app's on-disk caches
+os.environ.setdefault("ANALYSIS_CACHE_PATH", ":memory:")
+os.environ.setdefault("JD_CACHE_PATH", ":memory:")
+os.environ.setdefault("TEXT_STORE_PATH", ":memory:")
+os.environ.setdefault("CANDIDATE_STORE_PATH", ":memory:")
+# Keep every observation, so the percentiles cover the whole run
+os.environ.setdefault("METRICS_WINDOW", "1000000")
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+from google.api_core import exceptions as google_exceptions
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import gemini_client
+from metrics import get_metrics
+from pdf_extraction import get_text_store
+from screening import (
+    ANALYSIS_BATCH_SIZE,
+    EMAIL_RENDER_MODE,
+    EMAIL_RENDER_MODES,
+    MAX_CONCURRENT_ANALYSES,
+    MAX_CONCURRENT_EMAILS,
+    generate_interview_emails_concurrently,
+    screen_resumes,
+    shortlist_candidates,
+    summarize_job_description,
+)
+
+FIRST_NAMES = ["Alex", "Maria", "Wei", "Priya", "James", "Fatima", "Lucas", "Aiko", "Omar", "Sofia"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Patel", "Okafor", "Nguyen", "Muller", "Rossi", "Khan", "Silva"]
+SKILLS = ["Python", "SQL", "Java", "JavaScript", "React", "AWS", "Docker", "Kubernetes", "Tableau", "Excel",
+          "Machine Learning", "Spark", "Go", "TypeScript", "PostgreSQL", "Airflow", "Power BI", "Git"]
+VERBS = ["Built", "Designed", "Led", "Automated", "Maintained", "Migrated", "Optimized", "Analyzed"]
+OBJECTS = ["reporting dashboards", "data pipelines", "REST services", "ETL jobs", "customer churn models",
+           "CI/CD workflows", "internal tools", "A/B test analyses", "microservices", "data warehouse tables"]
+
+BENCHMARK_JD = """Senior Data Analyst
+We are looking for a data analyst with 3+ years of experience in Python and SQL.
+Required: Python, SQL, Tableau. Preferred: AWS, Airflow.
+Bachelor's degree in Statistics, Computer Science or a related field.
+Responsibilities: build dashboards, analyze product metrics, partner with engineering."""
+
+# Minimal single-font PDF with one text line per input line, readable by PyPDF2
+def write_pdf(pages):
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [" + " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))) + f"] /Count {len(pages)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in text.split("\n")]
+        stream = "BT /F1 10 Tf 50 750 Td 12 TL " + " ".join(f"({line}) '" for line in escaped) + " ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+# Text of a synthetic resume spread over page_count pages, with a repeated header and footer
+def synthetic_resume(rng, page_count):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    email = name.lower().replace(" ", ".") + "@example.com"
+    body = [
+        "SUMMARY", f"Analyst with {rng.randint(1, 12)} years of experience.", "",
+        "SKILLS", ", ".join(rng.sample(SKILLS, rng.randint(4, 10))), "",
+        "EXPERIENCE",
+    ]
+    while len(body) < page_count * 40:
+        year = rng.randint(2005, 2022)
+        body.append(f"{rng.choice(['Analyst', 'Engineer', 'Consultant'])} at Company {rng.randint(1, 999)}, {year} - {year + rng.randint(1, 3)}")
+        body += [f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)}" for _ in range(rng.randint(2, 5))]
+    body += ["", "EDUCATION", f"BSc {rng.choice(['Statistics', 'Computer Science', 'Economics'])}", "",
+             "REFERENCES", "Available upon request"]
+
+    lines_per_page = -(-len(body) // page_count)
+    return [
+        f"{name} | {email}\n" + "\n".join(body[i * lines_per_page:(i + 1) * lines_per_page]) + f"\nPage {i + 1} of {page_count}"
+        for i in range(page_count)
+    ]
+
+# (name, pdf bytes) pairs with page counts spread between min_pages and max_pages
+def make_corpus(count, min_pages=1, max_pages=4, seed=0):
+    rng = random.Random(seed)
+    return [(f"resume_{i:05d}.pdf", write_pdf(synthetic_resume(rng, rng.randint(min_pages, max_pages))))
+            for i in range(count)]
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+# Stand-in for genai.GenerativeModel. Each call sleeps for a random latency, then fails with a
+# rate limit (retried by GeminiClient) or a hard error at the configured rates, or returns a
+# plausible response for the kind of prompt it was given.
+class FakeGeminiModel:
+    def __init__(self, model_name, latency=0.3, jitter=0.1, error_rate=0.0, rate_limit_rate=0.0, seed=0):
+        self.model_name = model_name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.calls = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._rng.uniform(self.latency - self.jitter, self.latency + self.jitter))
+            roll = self._rng.random()
+            score = self._rng.randint(40, 98)
+        time.sleep(delay)
+
+        if roll < self.rate_limit_rate:
+            with self._lock:
+                self.rate_limited += 1
+            raise google_exceptions.ResourceExhausted("429 fake rate limit")
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise RuntimeError("fake backend error")
+
+        if "job description analyzer" in prompt:
+            return FakeResponse(json.dumps({
+                "JobTitle": "Senior Data Analyst", "Department": "Analytics", "Location": "Remote",
+                "EmploymentType": "full-time", "RequiredSkills": ["Python", "SQL", "Tableau"],
+                "RequiredExperience": "3+ years", "RequiredQualifications": ["Bachelor's degree in Statistics"],
+                "Responsibilities": ["Build dashboards"], "SalaryRange": "", "PreferredSkills": ["AWS", "Airflow"]
+            }))
+        if "recruiting agent" in prompt:
+            evaluation = {
+                "CandidateName": "Candidate", "ContactInfo": "candidate@example.com", "Skills": ["Python", "SQL"],
+                "Experience": ["Analyst"], "Education": ["BSc"], "Certifications": [],
+                "SkillMatch": f"{score}%", "ExperienceMatch": f"{score}%", "QualificationMatch": f"{score}%",
+                "OverallMatch": f"{score}%", "MatchedSkills": ["Python"], "MissingSkills": ["Tableau"],
+                "Strengths": ["Python: strong analytics background"], "Areas_for_Improvement": ["Tableau"],
+                "Recommendation": "shortlist" if score >= 70 else "further review"
+            }
+            if "JSON array" in prompt:
+                count = prompt.count("--- Resume ")
+                return FakeResponse(json.dumps([dict(evaluation, ResumeIndex=i + 1) for i in range(count)]))
+            return FakeResponse(json.dumps(evaluation))
+        return FakeResponse("Dear Candidate,\n\nWe would like to invite you to an interview.\n\nBest regards")
+
+# Run fn(item) for every item in turn, timing each call.
+# Returns (results, per-call seconds, wall seconds).
+def timed_map(fn, items):
+    def run(item):
+        started = time.perf_counter()
+        result = fn(item)
+        return result, time.perf_counter() - started
+
+    started = time.perf_counter()
+    outcomes = [run(item) for item in items]
+    wall = time.perf_counter() - started
+    return [result for result, _ in outcomes], [seconds for _, seconds in outcomes], wall
+
+def stage_report(name, latencies, wall, items):
+    latencies_ms = np.array(latencies) * 1000 if latencies else None
+    return {
+        "stage": name,
+        "calls": len(latencies),
+        "items": items,
+        "wall_seconds": wall,
+        "items_per_second": items / wall if wall else None,
+        "p50_ms": float(np.percentile(latencies_ms, 50)) if latencies_ms is not None else None,
+        "p95_ms": float(np.percentile(latencies_ms, 95)) if latencies_ms is not None else None,
+        "p99_ms": float(np.percentile(latencies_ms, 99)) if latencies_ms is not None else None,
+    }
+
+# Report for a pipeline stage timed by instrument_stage (stage_seconds), or None if it never ran
+def metrics_stage_report(name, stage, wall, items):
+    for row in get_metrics().summary_rows():
+        if row["metric"] == "stage_seconds" and row["labels"] == f"stage={stage}":
+            return {
+                "stage": name,
+                "calls": row["count"],
+                "items": items,
+                "wall_seconds": wall,
+                "items_per_second": items / wall if wall else None,
+                "p50_ms": row["p50"] * 1000,
+                "p95_ms": row["p95"] * 1000,
+                "p99_ms": row["p99"] * 1000,
+            }
+    return None
+
+# None where the resource module is unavailable (Windows)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def print_report(report):
+    print(f"\n{'stage':<18}{'calls':>7}{'items/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'wall s':>9}")
+    for stage in report["stages"]:
+        def cell(value, width, digits=1):
+            return f"{value:>{width}.{digits}f}" if value is not None else f"{'-':>{width}}"
+        print(f"{stage['stage']:<18}{stage['calls']:>7}{cell(stage['items_per_second'], 10)}"
+              f"{cell(stage['p50_ms'], 10, 2)}{cell(stage['p95_ms'], 10, 2)}{cell(stage['p99_ms'], 10, 2)}"
+              f"{cell(stage['wall_seconds'], 9, 2)}")
+    print(f"\nEnd-to-end: {report['resumes_per_second']:.1f} resumes/sec over {report['resumes']} resume(s)")
+    memory = []
+    if report['peak_rss_mb'] is not None:
+        memory.append(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    if report['peak_traced_mb'] is not None:
+        memory.append(f"peak traced Python allocations: {report['peak_traced_mb']:.1f} MB")
+    if memory:
+        print(", ".join(memory))
+    backend = report["backend"]
+    print(f"Fake backend: {backend['calls']} call(s), {backend['rate_limited']} rate limited, {backend['errors']} failed; "
+          f"{report['failed_analyses']} analysis error(s)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the screening pipeline offline with a fake Gemini backend.")
+    parser.add_argument("--resumes", type=int, default=100, help="number of synthetic resumes")
+    parser.add_argument("--min-pages", type=int, default=1)
+    parser.add_argument("--max-pages", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3, help="mean fake model latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="latency spread (+/- seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls failing with a hard error")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of calls failing with 429")
+    parser.add_argument("--workers", type=int, default=MAX_CONCURRENT_ANALYSES, help="concurrent analyses")
+    parser.add_argument("--email-workers", type=int, default=MAX_CONCURRENT_EMAILS, help="concurrent emails")
+    parser.add_argument("--batch-size", type=int, default=ANALYSIS_BATCH_SIZE,
+                        help="resumes per analysis prompt (1 analyzes each resume on its own)")
+    parser.add_argument("--prescreen-cutoff", type=int, default=0,
+                        help="keyword pre-screen cutoff (0-100, 0 disables)")
+    parser.add_argument("--requests-per-minute", type=int, default=1000000,
+                        help="client rate limit (default effectively unlimited)")
+    parser.add_argument("--backoff", type=float, default=0.05, help="retry backoff base in seconds")
+    parser.add_argument("--email-mode", choices=EMAIL_RENDER_MODES, default=EMAIL_RENDER_MODE)
+    parser.add_argument("--shortlist-repeats", type=int, default=20, help="threshold sweeps timed for shortlisting")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also report peak Python allocations (tracemalloc; slows the run)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    backend_models = []
+    def make_model(model_name):
+        model = FakeGeminiModel(model_name, args.latency, args.jitter, args.error_rate, args.rate_limit_rate, args.seed)
+        backend_models.append(model)
+        return model
+
+    gemini_client.set_model_backend(make_model, requests_per_minute=args.requests_per_minute,
+                                    tokens_per_minute=args.requests_per_minute * 10000)
+    gemini_client.GEMINI_BACKOFF_BASE_SECONDS = args.backoff
+
+    print(f"Generating {args.resumes} synthetic resume(s)...", file=sys.stderr)
+    corpus = make_corpus(args.resumes, args.min_pages, args.max_pages, args.seed)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    get_metrics().reset()
+    stages = []
+
+    # Upload path: hash, extract in the process pool and store each distinct PDF once
+    text_store = get_text_store()
+    started = time.perf_counter()
+    digests = text_store.add_pdfs([data for _, data in corpus])
+    extract_wall = time.perf_counter() - started
+    records = [text_store.get(digest) for digest in digests]
+    cv_texts = [None if record is None or record["error"] else record["text"] for record in records]
+    stages.append(stage_report("extract", [record["extraction_seconds"] for record in records if record],
+                               extract_wall, len(corpus)))
+
+    jd_summary, latencies, wall = timed_map(summarize_job_description, [BENCHMARK_JD])
+    jd_summary = jd_summary[0]
+    stages.append(stage_report("summarize_jd", latencies, wall, 1))
+    if "error" in jd_summary:
+        print(f"JD summary failed: {jd_summary['error']}", file=sys.stderr)
+        return 1
+
+    # Screening as the job runner does it: pre-screen, then concurrent (optionally batched) analysis
+    started = time.perf_counter()
+    analyses = screen_resumes(cv_texts, jd_summary, args.prescreen_cutoff, max_workers=args.workers,
+                              batch_size=args.batch_size)
+    analyze_wall = time.perf_counter() - started
+    for name, stage in [("screen_resumes", "screen_resumes"), ("  analyze_cv", "analyze_cv"),
+                        ("  batch request", "analyze_cv_batch_request")]:
+        report = metrics_stage_report(name, stage, analyze_wall, len(cv_texts))
+        if report is not None:
+            stages.append(report)
+
+    thresholds = list(range(50, 100, 5)) * args.shortlist_repeats
+    shortlists, latencies, wall = timed_map(lambda threshold: shortlist_candidates(analyses, threshold), thresholds)
+    stages.append(stage_report("shortlist", latencies, wall, len(thresholds)))
+
+    shortlisted = shortlist_candidates(analyses, 70)
+    started = time.perf_counter()
+    generate_interview_emails_concurrently(shortlisted, jd_summary, args.email_workers, mode=args.email_mode)
+    wall = time.perf_counter() - started
+    stages.append(metrics_stage_report(f"email ({args.email_mode})", "generate_email", wall, len(shortlisted))
+                  or stage_report(f"email ({args.email_mode})", [], wall, len(shortlisted)))
+
+    peak_traced = None
+    if args.trace_memory:
+        peak_traced = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    report = {
+        "resumes": len(corpus),
+        "resumes_per_second": len(corpus) / (extract_wall + analyze_wall),
+        "failed_analyses": sum(1 for analysis in analyses if "error" in analysis),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_traced_mb": peak_traced,
+        "backend": {
+            "calls": sum(model.calls for model in backend_models),
+            "rate_limited": sum(model.rate_limited for model in backend_models),
+            "errors": sum(model.errors for model in backend_models),
+        },
+        "settings": vars(args),
+        "stages": stages,
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# Compact in-session storage of candidate analyses. The model's evaluation of a resume is a
+# large dict, and the app keeps one per candidate in every browser session. CandidateRecord
+# keeps only the fields used for tables, ranking and shortlisting, in __slots__ with interned
+# strings; the rest (experience, education, strengths, ...) is written once to a shared
+# disk-backed store and read back only when it is displayed.
+import hashlib
+import json
+import os
+import sys
+from result_cache import ResultCache
+from storage import lazy_singleton
+
+# Persistent store of the analysis fields not held in memory. Details unused for the TTL, or
+# least recently used beyond the size limit, are evicted; both limits are set well above a
+# working day's screening, and a record whose details were evicted says so (to_dict() is None).
+CANDIDATE_STORE_PATH = os.getenv("CANDIDATE_STORE_PATH", os.path.join(".cache", "candidate_details.sqlite3"))
+CANDIDATE_STORE_MAX_ENTRIES = int(os.getenv("CANDIDATE_STORE_MAX_ENTRIES", "50000"))
+CANDIDATE_STORE_TTL_SECONDS = int(os.getenv("CANDIDATE_STORE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Strings up to this length (names, skills, percentages, recommendations) are interned, so
+# values repeated across candidates and sessions are stored once per process
+INTERN_MAX_LENGTH = 80
+
+# Analysis fields kept in memory, mapped to CandidateRecord slots
+SUMMARY_FIELDS = {
+    "CandidateName": "name",
+    "ContactInfo": "contact",
+    "OverallMatch": "overall_match",
+    "SkillMatch": "skill_match",
+    "ExperienceMatch": "experience_match",
+    "QualificationMatch": "qualification_match",
+    "Recommendation": "recommendation",
+    "MatchedSkills": "matched_skills",
+    "MissingSkills": "missing_skills",
+    "PreScreened": "prescreened",
+    "error": "error",
+}
+
+_MISSING = object()
+
+def _compact_value(value):
+    if isinstance(value, str):
+        return sys.intern(value) if len(value) <= INTERN_MAX_LENGTH else value
+    if isinstance(value, list):
+        return tuple(_compact_value(item) for item in value)
+    return value
+
+# Store of analysis details keyed by the SHA-256 of their JSON, so identical details (e.g. the
+# same resume screened in two tabs) are stored once. A compressed ResultCache whose TTL counts
+# from the last use. Safe to share between threads.
+class CandidateDetailStore(ResultCache):
+    def __init__(self, path=CANDIDATE_STORE_PATH, max_entries=CANDIDATE_STORE_MAX_ENTRIES,
+                 ttl_seconds=CANDIDATE_STORE_TTL_SECONDS):
+        super().__init__(path, max_entries, ttl_seconds, name="candidate_details", sliding_ttl=True, compress=True)
+        # Details were once kept in their own table
+        self._conn.execute("DROP TABLE IF EXISTS details")
+        self._conn.commit()
+
+    # Store details and return their key; storing details already present marks them as used
+    def put(self, details):
+        digest = hashlib.sha256(json.dumps(details, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        self.set(digest, details)
+        return digest
+
+@lazy_singleton
+def get_candidate_store():
+    return CandidateDetailStore(CANDIDATE_STORE_PATH, CANDIDATE_STORE_MAX_ENTRIES, CANDIDATE_STORE_TTL_SECONDS)
+
+# Read-only view of one analysis with the dict interface the app uses (get, [], in).
+# Summary fields are answered from memory; other fields are read from the detail store
+# on each access and not kept. List fields are returned as new lists.
+class CandidateRecord:
+    __slots__ = tuple(SUMMARY_FIELDS.values()) + ("details_key",)
+
+    def __init__(self, analysis):
+        for field, slot in SUMMARY_FIELDS.items():
+            setattr(self, slot, _compact_value(analysis.get(field)))
+
+        details = {field: value for field, value in analysis.items() if field not in SUMMARY_FIELDS}
+        self.details_key = get_candidate_store().put(details) if details else None
+
+    # The fields kept in the detail store, or None if they were evicted
+    def details(self):
+        if self.details_key is None:
+            return {}
+        return get_candidate_store().get(self.details_key)
+
+    def get(self, field, default=None):
+        slot = SUMMARY_FIELDS.get(field)
+        if slot is not None:
+            value = getattr(self, slot)
+            if value is None:
+                return default
+            return list(value) if isinstance(value, tuple) else value
+        return (self.details() or {}).get(field, default)
+
+    def __getitem__(self, field):
+        value = self.get(field, _MISSING)
+        if value is _MISSING:
+            raise KeyError(field)
+        return value
+
+    def __contains__(self, field):
+        return self.get(field, _MISSING) is not _MISSING
+
+    # The full analysis as a plain dict, or None if its details were evicted
+    def to_dict(self):
+        analysis = self.details()
+        if analysis is None:
+            return None
+        for field in SUMMARY_FIELDS:
+            value = self.get(field, _MISSING)
+            if value is not _MISSING:
+                analysis[field] = value
+        return analysis
+
+    def __repr__(self):
+        return f"CandidateRecord({self.name!r}, overall_match={self.overall_match!r})"
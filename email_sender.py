@@ -0,0 +1,168 @@
+# Outbound SMTP delivery of interview emails. One authenticated connection is kept open for
+# a whole batch, sends are throttled, and transient failures are retried. For local testing
+# run a debug server and point the sender at it:
+#
+#     python -m aiosmtpd -n -l localhost:1025
+#     (Python 3.11 and older: python -m smtpd -n -c DebuggingServer localhost:1025)
+#     SMTP_HOST=localhost SMTP_PORT=1025 SMTP_USE_TLS=0 streamlit run app.py
+import logging
+import os
+import random
+import re
+import smtplib
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate, make_msgid
+
+from dotenv import load_dotenv
+
+from gemini_client import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# SMTP server and credentials (EMAIL_ADDRESS is also the sender address)
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "1") != "0"
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
+EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+
+# Sending rate and retry policy; providers throttle or block bursts from one account
+SMTP_SENDS_PER_MINUTE = int(os.getenv("SMTP_SENDS_PER_MINUTE", "30"))
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "3"))
+SMTP_BACKOFF_BASE_SECONDS = float(os.getenv("SMTP_BACKOFF_BASE_SECONDS", "2.0"))
+
+RECIPIENT_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+# Errors after which the message may still go through on a new attempt
+RETRYABLE_SMTP_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+# Whether enough settings are present to send real email
+def smtp_configured():
+    return bool(SMTP_HOST and EMAIL_ADDRESS)
+
+# Email address in a free-form contact string such as "jane@example.com | +1 555 0100"
+def find_recipient(contact):
+    match = RECIPIENT_PATTERN.search(contact or "")
+    return match.group(0) if match else None
+
+def _delivery_record(status, attempts, error=None, message_id=None, recipient=None):
+    return {
+        "status": status,
+        "recipient": recipient,
+        "attempts": attempts,
+        "error": error,
+        "message_id": message_id,
+        "updated_at": time.time()
+    }
+
+# Sends interview emails (dicts from generate_interview_email) over one pooled SMTP connection.
+# The connection is opened on first use, reopened if the server drops it, and closed by
+# close() or when used as a context manager. Not thread-safe; use one sender per batch.
+class SMTPSender:
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, username=EMAIL_ADDRESS, password=EMAIL_PASSWORD,
+                 use_tls=SMTP_USE_TLS, sender=EMAIL_ADDRESS, sends_per_minute=SMTP_SENDS_PER_MINUTE,
+                 max_retries=SMTP_MAX_RETRIES, timeout=SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.sender = sender or username
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = TokenBucket(max(1, sends_per_minute // 6), sends_per_minute / 60.0)
+        self._smtp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            # Close the half-open connection instead of leaving its socket behind
+            smtp.close()
+            raise
+        self._smtp = smtp
+
+    # Discard a broken connection without talking to the server
+    def _drop_connection(self):
+        if self._smtp is not None:
+            self._smtp.close()
+            self._smtp = None
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+    def build_message(self, email_data, recipient):
+        message = MIMEMultipart()
+        message["From"] = self.sender
+        message["To"] = recipient
+        message["Subject"] = email_data["email_subject"]
+        message["Date"] = formatdate(localtime=True)
+        message["Message-ID"] = make_msgid()
+        message.attach(MIMEText(email_data["email_body"], "plain", "utf-8"))
+        return message
+
+    # Send one email. Returns a delivery record with status "sent" or "failed".
+    def send(self, email_data):
+        recipient = find_recipient(email_data.get("candidate_email"))
+        if recipient is None:
+            return _delivery_record("failed", 0, "No email address in the candidate's contact info")
+
+        message = self.build_message(email_data, recipient)
+        for attempt in range(1, self.max_retries + 2):
+            self.limiter.acquire(1)
+            try:
+                if self._smtp is None:
+                    self._connect()
+                self._smtp.send_message(message)
+                return _delivery_record("sent", attempt, message_id=message["Message-ID"], recipient=recipient)
+            except smtplib.SMTPAuthenticationError as e:
+                # Wrong credentials will not fix themselves
+                return _delivery_record("failed", attempt, f"SMTP authentication failed: {e}", recipient=recipient)
+            except (smtplib.SMTPResponseException, *RETRYABLE_SMTP_ERRORS) as e:
+                # 5xx replies are permanent (bad address, rejected content); the rest are retried
+                permanent = isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500
+                if isinstance(e, RETRYABLE_SMTP_ERRORS):
+                    self._drop_connection()
+                if permanent or attempt > self.max_retries:
+                    return _delivery_record("failed", attempt, f"Failed to send email: {e}", recipient=recipient)
+                delay = random.uniform(0, SMTP_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+                logger.warning("Sending to %s failed (%s), retrying in %.1fs", recipient, e, delay)
+                time.sleep(delay)
+            except (smtplib.SMTPException, OSError) as e:
+                self._drop_connection()
+                return _delivery_record("failed", attempt, f"Failed to send email: {e}", recipient=recipient)
+
+    # Send a batch over the shared connection. on_result(index, record) is called after each
+    # email and on_progress(completed, total) after it. Returns the records in input order.
+    def send_batch(self, emails, on_result=None, on_progress=None):
+        records = []
+        for i, email_data in enumerate(emails):
+            record = self.send(email_data)
+            records.append(record)
+            if on_result:
+                on_result(i, record)
+            if on_progress:
+                on_progress(i + 1, len(emails))
+        return records
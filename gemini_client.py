@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from metrics import current_stage, get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-process quota for Gemini calls
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+
+# Expected response size, counted against the token quota together with the prompt
+GEMINI_RESPONSE_TOKEN_ESTIMATE = int(os.getenv("GEMINI_RESPONSE_TOKEN_ESTIMATE", "800"))
+
+# Retry policy for rate limits and transient errors
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "1.0"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "30.0"))
+
+# Structured output mode: "schema" (JSON mode constrained by a response schema),
+# "json" (JSON mode only) or "off" (plain text, parsed leniently)
+GEMINI_STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "schema").lower()
+
+# Errors worth retrying: rate limits, server errors, timeouts and dropped connections
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+# Rough token estimate (about 4 characters per token) used for prompt budgeting
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+# Thread-safe token bucket: holds up to capacity units and refills at rate units per second.
+# acquire() blocks until the requested amount is available.
+class TokenBucket:
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        # Requests larger than the bucket wait for a full bucket instead of forever
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+# Shared Gemini client: one model instance per process, a request and token rate limiter,
+# and exponential backoff with full jitter on retryable errors. Drop-in replacement for
+# genai.GenerativeModel(...).generate_content.
+class GeminiClient:
+    def __init__(self, model_name, requests_per_minute=GEMINI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=GEMINI_TOKENS_PER_MINUTE, max_retries=GEMINI_MAX_RETRIES):
+        self.model_name = model_name
+        self.model = _model_factory(model_name)
+        self.max_retries = max_retries
+        self.request_limiter = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.token_limiter = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    def generate_content(self, prompt, **kwargs):
+        tokens = estimate_tokens(prompt) + GEMINI_RESPONSE_TOKEN_ESTIMATE
+        metrics = get_metrics()
+        stage = current_stage()
+
+        for attempt in range(self.max_retries + 1):
+            # Time spent waiting for quota is reported apart from the model's own latency
+            with metrics.timer("model_throttle_seconds", stage=stage):
+                self.request_limiter.acquire(1)
+                self.token_limiter.acquire(tokens)
+            started = time.perf_counter()
+            try:
+                response = self.model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                outcome = "retryable_error" if isinstance(e, RETRYABLE_ERRORS) else "error"
+                metrics.observe("model_call_seconds", time.perf_counter() - started, stage=stage, outcome=outcome)
+                if not isinstance(e, RETRYABLE_ERRORS) or attempt == self.max_retries:
+                    metrics.inc("model_failures_total", stage=stage)
+                    raise
+                metrics.inc("model_retries_total", stage=stage)
+                delay = random.uniform(0, min(GEMINI_BACKOFF_MAX_SECONDS, GEMINI_BACKOFF_BASE_SECONDS * 2 ** attempt))
+                logger.warning("Gemini call failed (%s), retrying in %.1fs (attempt %d of %d)",
+                               e, delay, attempt + 1, self.max_retries)
+                time.sleep(delay)
+            else:
+                metrics.observe("model_call_seconds", time.perf_counter() - started, stage=stage, outcome="ok")
+                prompt_tokens, response_tokens = response_token_counts(prompt, response)
+                metrics.inc("model_prompt_tokens_total", prompt_tokens, stage=stage)
+                metrics.inc("model_response_tokens_total", response_tokens, stage=stage)
+                return response
+
+# Prompt and response tokens of a call, from the response's usage metadata when the backend
+# reports it and estimated from the text otherwise
+def response_token_counts(prompt, response):
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt)
+    response_tokens = getattr(usage, "candidates_token_count", None)
+    if response_tokens is None:
+        try:
+            response_tokens = estimate_tokens(response.text)
+        except (AttributeError, ValueError):
+            # Blocked responses have no text
+            response_tokens = 0
+    return prompt_tokens, response_tokens
+
+# Generation config asking for a JSON response, constrained by schema when enabled.
+# Returns None when structured output is turned off.
+def json_generation_config(schema):
+    if GEMINI_STRUCTURED_OUTPUT == "off":
+        return None
+    if GEMINI_STRUCTURED_OUTPUT == "json":
+        return genai.GenerationConfig(response_mime_type="application/json")
+    return genai.GenerationConfig(response_mime_type="application/json", response_schema=schema)
+
+# Precompiled patterns for cleaning and repairing model JSON
+CODE_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+DANGLING_KEY_PATTERN = re.compile(r',?\s*"(?:[^"\\]|\\.)*"\s*:\s*(?=[}\]])')
+SMART_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"})
+
+# Single pass over text from start (an opening bracket) to the end of that JSON value.
+# Returns (end, unclosed, in_string): unclosed lists the closers still missing when the
+# text ends first, e.g. because the response was truncated.
+def _scan_json_value(text, start):
+    closers = []
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            closers.append("}")
+        elif ch == "[":
+            closers.append("]")
+        elif ch in "}]":
+            if closers and closers[-1] == ch:
+                closers.pop()
+            if not closers:
+                return i + 1, [], False
+    return len(text), closers, in_string
+
+# Parse a JSON object ("{") or array ("[") from model output. Handles code fences,
+# surrounding prose, trailing commas, smart quotes and truncated responses.
+# Returns None when nothing usable can be recovered.
+def parse_model_json(text, opener="{"):
+    value, outcome = _parse_model_json(text, opener)
+    # How often responses need the lenient fallbacks, per stage
+    get_metrics().inc("json_parse_total", stage=current_stage(), outcome=outcome)
+    return value
+
+# Returns (value, outcome); outcome is "direct", "extracted" (cut out of surrounding text or
+# closed after truncation), "repaired" or "failed"
+def _parse_model_json(text, opener):
+    if not text:
+        return None, "failed"
+
+    text = CODE_FENCE_PATTERN.sub("", text.strip())
+    try:
+        return json.loads(text), "direct"
+    except ValueError:
+        pass
+
+    start = text.find(opener)
+    if start < 0:
+        return None, "failed"
+
+    end, unclosed, in_string = _scan_json_value(text, start)
+    candidate = text[start:end] + ('"' if in_string else "") + "".join(reversed(unclosed))
+
+    repaired = candidate.translate(SMART_QUOTES)
+    repaired = DANGLING_KEY_PATTERN.sub("", repaired)
+    repaired = TRAILING_COMMA_PATTERN.sub(r"\1", repaired)
+    for attempt, outcome in ((candidate, "extracted"), (repaired, "repaired")):
+        try:
+            return json.loads(attempt), outcome
+        except ValueError:
+            continue
+    return None, "failed"
+
+# Shared client instances, one per model name
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Model backend for new clients and extra GeminiClient options; see set_model_backend
+_model_factory = genai.GenerativeModel
+_client_options = {}
+
+def get_gemini_client(model_name):
+    with _clients_lock:
+        if model_name not in _clients:
+            _clients[model_name] = GeminiClient(model_name, **_client_options)
+        return _clients[model_name]
+
+# Replace the model backend, e.g. with a fake for tests and benchmarks. factory(model_name)
+# must return an object with generate_content(prompt, **kwargs); client_options are passed
+# to GeminiClient (requests_per_minute, tokens_per_minute, max_retries). Existing shared
+# clients are dropped so the next get_gemini_client call uses the new backend.
+def set_model_backend(factory, **client_options):
+    global _model_factory, _client_options
+    with _clients_lock:
+        _model_factory = factory
+        _client_options = client_options
+        _clients.clear()
@@ -0,0 +1,300 @@
+# Background screening jobs: a SQLite-backed queue plus worker threads, so long batches
+# keep running regardless of Streamlit reruns, refreshes or disconnects. The app runs a
+# worker pool in process by default; workers can also run as a separate process:
+#
+#     python jobs.py
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+from metrics import start_metrics_server
+from pdf_extraction import get_text_store
+from screening import PRESCREEN_CUTOFF, screen_resumes
+from storage import lazy_singleton, open_sqlite
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(".cache", "jobs.sqlite3"))
+
+# Number of jobs processed at the same time by one worker process
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Whether the Streamlit app runs job workers itself ("0" when a separate worker process is used)
+JOB_RUNNER_IN_PROCESS = os.getenv("JOB_RUNNER_IN_PROCESS", "1") != "0"
+
+# How often idle workers and the UI check the queue
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+
+# Running jobs without a heartbeat for this long are assumed dead and picked up again
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+JOB_HEARTBEAT_SECONDS = JOB_STALE_SECONDS / 4
+
+# Persistent job queue. Each job holds the JD summary and one item per resume; item results
+# are saved as they complete, so an interrupted job resumes with only the unfinished items.
+# Safe to share between threads and between processes using the same database file.
+class JobStore:
+    def __init__(self, path=JOBS_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path, [
+            "PRAGMA journal_mode=WAL",
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, jd_summary TEXT NOT NULL, prescreen_cutoff INTEGER NOT NULL, "
+            "total INTEGER NOT NULL, completed INTEGER NOT NULL DEFAULT 0, worker TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL, previous_jd_summary TEXT)",
+            "CREATE TABLE IF NOT EXISTS job_items ("
+            "job_id TEXT NOT NULL, idx INTEGER NOT NULL, name TEXT NOT NULL, sha256 TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', result TEXT, PRIMARY KEY (job_id, idx))",
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+        ], timeout=30)
+
+    # Queue a job for resumes given as dicts with 'name' and 'sha256' (text store keys).
+    # previous_jd_summary is the JD the resumes were last screened against, if it was edited since.
+    def create_job(self, jd_summary, resumes, prescreen_cutoff=PRESCREEN_CUTOFF, previous_jd_summary=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, jd_summary, prescreen_cutoff, total, created_at, updated_at, "
+                "previous_jd_summary) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(jd_summary), prescreen_cutoff, len(resumes), now, now,
+                 json.dumps(previous_jd_summary) if previous_jd_summary is not None else None)
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, idx, name, sha256) VALUES (?, ?, ?, ?)",
+                [(job_id, i, resume['name'], resume['sha256']) for i, resume in enumerate(resumes)]
+            )
+            self._conn.commit()
+        return job_id
+
+    def _job_from_row(self, row):
+        return {
+            "id": row[0],
+            "status": row[1],
+            "jd_summary": json.loads(row[2]),
+            "prescreen_cutoff": row[3],
+            "total": row[4],
+            "completed": row[5],
+            "worker": row[6],
+            "error": row[7],
+            "created_at": row[8],
+            "updated_at": row[9],
+            "previous_jd_summary": json.loads(row[10]) if row[10] else None
+        }
+
+    def get_job(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, jd_summary, prescreen_cutoff, total, completed, worker, error, created_at, updated_at, "
+                "previous_jd_summary FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._job_from_row(row) if row else None
+
+    # Items in resume order; result is the analysis dict once the item is done, or holds the
+    # error of a failed item
+    def get_items(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, name, sha256, status, result FROM job_items WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+        return [
+            {"idx": idx, "name": name, "sha256": sha256, "status": status,
+             "result": json.loads(result) if result else None}
+            for idx, name, sha256, status, result in rows
+        ]
+
+    # Atomically take the oldest queued job, or a running job whose worker stopped heartbeating
+    def claim_next_job(self, worker_id):
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) "
+                "ORDER BY created_at LIMIT 5", (now - JOB_STALE_SECONDS,)
+            ).fetchall()
+            for (job_id,) in rows:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, updated_at = ? "
+                    "WHERE id = ? AND (status = 'queued' OR (status = 'running' AND updated_at < ?))",
+                    (worker_id, now, job_id, now - JOB_STALE_SECONDS)
+                )
+                self._conn.commit()
+                if cursor.rowcount == 1:
+                    break
+            else:
+                return None
+        return self.get_job(job_id)
+
+    def record_result(self, job_id, idx, result):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE job_items SET status = 'done', result = ? WHERE job_id = ? AND idx = ? AND status != 'done'",
+                (json.dumps(result), job_id, idx)
+            )
+            self._conn.execute(
+                "UPDATE jobs SET completed = completed + ?, updated_at = ? WHERE id = ?",
+                (cursor.rowcount, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    # Mark an item failed without analysing it (e.g. its PDF has no extractable text)
+    def record_failure(self, job_id, idx, error):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE job_items SET status = 'failed', result = ? WHERE job_id = ? AND idx = ? AND status = 'pending'",
+                (json.dumps({"error": error}), job_id, idx)
+            )
+            self._conn.execute(
+                "UPDATE jobs SET completed = completed + ?, updated_at = ? WHERE id = ?",
+                (cursor.rowcount, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def heartbeat(self, job_id):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            self._conn.commit()
+
+    def finish_job(self, job_id, status, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id)
+            )
+            self._conn.commit()
+
+# Raised in a worker that could not heartbeat its job for JOB_STALE_SECONDS
+class JobAbandoned(Exception):
+    pass
+
+# Run one claimed job: screen the resumes that have no saved result yet. Resumes without
+# extracted text are marked failed and never reach the model.
+def run_job(store, job):
+    job_id = job["id"]
+
+    # Keep the job marked alive while long model calls are in flight. Failed heartbeats are
+    # retried; once none has succeeded for JOB_STALE_SECONDS, other workers may have taken the
+    # job over, so this worker stops and saves nothing more.
+    stop_heartbeat = threading.Event()
+    abandoned = threading.Event()
+    def send_heartbeats():
+        last_beat = time.monotonic()
+        while not stop_heartbeat.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                store.heartbeat(job_id)
+                last_beat = time.monotonic()
+            except sqlite3.Error:
+                logger.exception("Heartbeat for job %s failed", job_id)
+                if time.monotonic() - last_beat >= JOB_STALE_SECONDS:
+                    logger.error("No heartbeat for job %s in %d seconds; abandoning it", job_id, JOB_STALE_SECONDS)
+                    abandoned.set()
+                    return
+    heartbeat_thread = threading.Thread(target=send_heartbeats, daemon=True)
+    heartbeat_thread.start()
+
+    try:
+        pending = [item for item in store.get_items(job_id) if item["status"] == "pending"]
+        logger.info("Running job %s: %d of %d resume(s) left", job_id, len(pending), job["total"])
+
+        text_store = get_text_store()
+        extraction_errors = text_store.get_errors([item["sha256"] for item in pending])
+        for item in pending:
+            if item["sha256"] in extraction_errors:
+                store.record_failure(job_id, item["idx"], extraction_errors[item["sha256"]])
+        pending = [item for item in pending if item["sha256"] not in extraction_errors]
+        cv_texts = [text_store.get_text(item["sha256"]) for item in pending]
+
+        def save_result(index, analysis):
+            if abandoned.is_set():
+                raise JobAbandoned(job_id)
+            store.record_result(job_id, pending[index]["idx"], analysis)
+
+        screen_resumes(cv_texts, job["jd_summary"], prescreen_cutoff=job["prescreen_cutoff"], on_result=save_result,
+                       previous_jd_summary=job["previous_jd_summary"])
+        if abandoned.is_set():
+            raise JobAbandoned(job_id)
+        store.finish_job(job_id, "completed")
+        logger.info("Job %s completed", job_id)
+    except JobAbandoned:
+        logger.warning("Stopped job %s; it is left to the worker that takes it over", job_id)
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        try:
+            store.finish_job(job_id, "failed", str(e))
+        except sqlite3.Error:
+            # Left as running; another worker picks it up once the heartbeat goes stale
+            logger.exception("Failed to mark job %s as failed", job_id)
+    finally:
+        stop_heartbeat.set()
+
+# Pool of worker threads taking jobs from a JobStore
+class JobRunner:
+    def __init__(self, store, workers=JOB_WORKERS):
+        self.store = store
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work_loop, name=f"screening-job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # Tell idle workers a new job is available instead of waiting for the next poll
+    def notify(self):
+        self._wake.set()
+
+    def _work_loop(self):
+        while True:
+            try:
+                job = self.store.claim_next_job(self.worker_id)
+            except sqlite3.Error:
+                logger.exception("Failed to poll the job queue")
+                job = None
+
+            if job is not None:
+                run_job(self.store, job)
+                continue
+
+            self._wake.wait(JOB_POLL_SECONDS)
+            self._wake.clear()
+
+@lazy_singleton
+def get_job_store():
+    return JobStore(JOBS_DB_PATH)
+
+@lazy_singleton
+def get_job_runner():
+    runner = JobRunner(get_job_store())
+    runner.start()
+    return runner
+
+# Queue a screening job and wake the in-process workers if they are enabled
+def submit_screening_job(jd_summary, resumes, prescreen_cutoff=PRESCREEN_CUTOFF, previous_jd_summary=None):
+    job_id = get_job_store().create_job(jd_summary, resumes, prescreen_cutoff, previous_jd_summary)
+    if JOB_RUNNER_IN_PROCESS:
+        get_job_runner().notify()
+    return job_id
+
+# Standalone worker process
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # Worker processes serve their own metrics; give each one a separate METRICS_PORT
+    start_metrics_server()
+    runner = get_job_runner()
+    logger.info("Job worker %s started with %d thread(s) on %s", runner.worker_id, runner.workers, JOBS_DB_PATH)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# Process-wide timing and counter instrumentation for the screening pipeline. Metrics are kept
+# in memory for the app's diagnostics panel, served in the Prometheus text format when
+# METRICS_PORT is set, and appended as one JSON event per line when METRICS_LOG_PATH is set:
+#
+#     METRICS_PORT=9464 streamlit run app.py
+#     curl http://127.0.0.1:9464/metrics
+import contextvars
+import functools
+import http.server
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from storage import lazy_singleton, make_parent_dir
+
+logger = logging.getLogger(__name__)
+
+# Prometheus text endpoint (0 disables); each process serving metrics needs its own port
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# JSONL event log for a local collector (empty disables)
+METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "")
+
+# Recent observations kept per series for the latency quantiles
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1000"))
+
+METRIC_PREFIX = "hirease_"
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Pipeline stage of the current call, set by instrument_stage so that model calls, JSON
+# parsing and cache lookups made inside a stage are labelled with it
+_current_stage = contextvars.ContextVar("metrics_stage", default="none")
+
+def current_stage():
+    return _current_stage.get()
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+# Count, sum and a window of recent values for one series
+class Summary:
+    def __init__(self, window=METRICS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+
+    def quantiles(self, quantiles=QUANTILES):
+        values = sorted(self.recent)
+        if not values:
+            return {q: None for q in quantiles}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in quantiles}
+
+# Thread-safe registry of counters and summaries, each keyed by metric name and labels
+class MetricsRegistry:
+    def __init__(self, log_path=METRICS_LOG_PATH, window=METRICS_WINDOW):
+        self.window = window
+        self.log_path = log_path
+        self._counters = {}
+        self._summaries = {}
+        self._lock = threading.Lock()
+        self._log = None
+        if log_path:
+            make_parent_dir(log_path)
+            self._log = open(log_path, "a", encoding="utf-8", buffering=1)
+
+    def _write_event(self, kind, name, value, labels):
+        if self._log is not None:
+            event = {"ts": time.time(), "type": kind, "metric": name, "value": value, "labels": labels}
+            self._log.write(json.dumps(event) + "\n")
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._write_event("counter", name, amount, labels)
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key not in self._summaries:
+                self._summaries[key] = Summary(self.window)
+            self._summaries[key].observe(value)
+            self._write_event("summary", name, value, labels)
+
+    # Time a block of code in seconds
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+    # Rows for display: one per counter series, with its labels as "name=value" text
+    def counter_rows(self):
+        with self._lock:
+            items = sorted(self._counters.items())
+        return [
+            {"metric": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "value": value}
+            for (name, labels), value in items
+        ]
+
+    # Rows for display: count, mean and quantiles of each summary series
+    def summary_rows(self):
+        with self._lock:
+            items = sorted(self._summaries.items())
+            snapshot = [(key, summary.count, summary.total, summary.quantiles()) for key, summary in items]
+        rows = []
+        for (name, labels), count, total, quantiles in snapshot:
+            row = {"metric": name, "labels": ", ".join(f"{k}={v}" for k, v in labels),
+                   "count": count, "mean": total / count if count else None}
+            row.update({f"p{round(q * 100)}": value for q, value in quantiles.items()})
+            rows.append(row)
+        return rows
+
+    # All metrics in the Prometheus text exposition format; summaries carry their quantiles
+    def prometheus_text(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = [(key, summary.count, summary.total, summary.quantiles())
+                         for key, summary in sorted(self._summaries.items())]
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        for (name, labels), count, total, quantiles in summaries:
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} summary")
+                typed.add(metric)
+            for q, value in quantiles.items():
+                if value is not None:
+                    lines.append(f"{metric}{_format_labels(labels, [('quantile', str(q))])} {value}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+@lazy_singleton
+def get_metrics():
+    return MetricsRegistry(METRICS_LOG_PATH, METRICS_WINDOW)
+
+# Decorator timing a pipeline stage (stage_seconds) and counting the error dicts it returns.
+# Stages can nest; calls made inside are labelled with the innermost stage.
+def instrument_stage(stage):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _current_stage.set(stage)
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                if isinstance(result, dict) and "error" in result:
+                    get_metrics().inc("stage_errors_total", stage=stage)
+                return result
+            finally:
+                get_metrics().observe("stage_seconds", time.perf_counter() - started, stage=stage)
+                _current_stage.reset(token)
+        return wrapper
+    return decorator
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = get_metrics().prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+# Serve /metrics from a daemon thread. Safe to call on every Streamlit rerun: the server is
+# started once per process. Returns the server, or None if disabled or the port is taken.
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    global _server, _server_started
+    with _server_lock:
+        if _server_started or not port:
+            return _server
+        _server_started = True
+        try:
+            _server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on %s:%d: %s", host, port, e)
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info("Serving metrics on http://%s:%d/metrics", host, port)
+        return _server
@@ -0,0 +1,304 @@
+import hashlib
+import io
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2 as pdf
+
+from metrics import get_metrics
+from storage import lazy_singleton, open_sqlite
+
+# Per-file limits so a pathological PDF cannot stall a batch
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "30"))
+PDF_EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("PDF_EXTRACTION_TIMEOUT_SECONDS", "20"))
+
+# Time a worker gets past its file's deadline to stop on its own before the pool is killed
+PDF_EXTRACTION_KILL_GRACE_SECONDS = float(os.getenv("PDF_EXTRACTION_KILL_GRACE_SECONDS", "2"))
+
+# Number of worker processes used for parsing many PDFs at once
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 2)))
+
+# Persistent store of extracted resume text
+TEXT_STORE_PATH = os.getenv("TEXT_STORE_PATH", os.path.join(".cache", "text_store.sqlite3"))
+
+# Format of the stored text, bumped whenever extraction output changes so older texts are
+# extracted again (2: pages are joined with form feeds; 3: failures are stored as errors
+# instead of message text). Each version has its own table.
+TEXT_FORMAT_VERSION = 3
+TEXT_STORE_TABLE = f"texts_v{TEXT_FORMAT_VERSION}"
+
+# Errors of records whose text could not be extracted
+IMAGE_PDF_MESSAGE = "This appears to be an image-based PDF. Please provide a text-based PDF or manually enter the content."
+EXTRACTION_TIMEOUT_ERROR = "Error extracting text from PDF: extraction timed out"
+TEXT_UNAVAILABLE_ERROR = "Extracted text is no longer available, please re-upload the file"
+
+# Yield the text of each page, stopping after max_pages or once the deadline has passed
+def iter_pdf_pages(source, max_pages=MAX_PDF_PAGES, deadline=None):
+    reader = pdf.PdfReader(source)
+    for page_number, page in enumerate(reader.pages):
+        if page_number >= max_pages:
+            break
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        yield page.extract_text() or ""  # Handle None case
+
+# Extract a PDF file object or path, joining the pages once.
+# Returns a record with the text, the number of pages read, the extraction time and an error,
+# which is None on success; failed records have empty text.
+def extract_pdf(source, max_pages=MAX_PDF_PAGES, timeout=PDF_EXTRACTION_TIMEOUT_SECONDS):
+    started = time.monotonic()
+    page_count = 0
+    text = ""
+    error = None
+    try:
+        deadline = started + timeout if timeout else None
+        pages = list(iter_pdf_pages(source, max_pages, deadline))
+        page_count = len(pages)
+        # Form feeds keep the page breaks, which resume compaction uses to spot headers and footers
+        text = "\f".join(pages).strip()
+
+        if not text:
+            # If no text was extracted (possibly an image-based PDF)
+            error = IMAGE_PDF_MESSAGE
+    except Exception as e:
+        error = f"Error extracting text from PDF: {str(e)}"
+
+    return {
+        "text": text,
+        "page_count": page_count,
+        "extraction_seconds": time.monotonic() - started,
+        "error": error
+    }
+
+# Text of a PDF, or None if none could be extracted
+def extract_pdf_text(source, max_pages=MAX_PDF_PAGES, timeout=PDF_EXTRACTION_TIMEOUT_SECONDS):
+    record = extract_pdf(source, max_pages, timeout)
+    record_extraction_metrics([record])
+    return None if record["error"] else record["text"]
+
+# Extraction time, page count and outcome of each record. Called in the parent process,
+# since metrics recorded inside pool workers would be lost.
+def record_extraction_metrics(records):
+    metrics = get_metrics()
+    for record in records:
+        if record["error"] is None:
+            outcome = "ok"
+        elif record["error"] == EXTRACTION_TIMEOUT_ERROR:
+            outcome = "timeout"
+        elif record["error"] == IMAGE_PDF_MESSAGE:
+            outcome = "image_only"
+        else:
+            outcome = "error"
+        metrics.inc("pdf_extractions_total", outcome=outcome)
+        if record["extraction_seconds"] is not None:
+            metrics.observe("pdf_extraction_seconds", record["extraction_seconds"])
+            metrics.observe("pdf_pages", record["page_count"])
+
+# Process pool entry point; takes raw bytes because file objects cannot be pickled
+def _extract_pdf_bytes(data, max_pages, timeout):
+    return extract_pdf(io.BytesIO(data), max_pages, timeout)
+
+def _timed_out_record():
+    return {"text": "", "page_count": 0, "extraction_seconds": None, "error": EXTRACTION_TIMEOUT_ERROR}
+
+# Extract text from many PDFs (given as bytes) in a process pool.
+# Returns the texts in input order, None for files whose text could not be extracted.
+def extract_texts_parallel(pdf_blobs, max_workers=PDF_EXTRACTION_WORKERS, max_pages=MAX_PDF_PAGES,
+                           timeout=PDF_EXTRACTION_TIMEOUT_SECONDS):
+    return [
+        None if record["error"] else record["text"]
+        for record in extract_pdfs_parallel(pdf_blobs, max_workers, max_pages, timeout)
+    ]
+
+# Same as extract_texts_parallel but returns the full extraction records.
+# At most one file per worker is in flight, so each file's deadline starts when its worker
+# picks it up. A worker still running a grace period past its deadline is stuck inside a
+# single page; the pool's processes are then killed and the other in-flight files are
+# retried in a fresh pool.
+def extract_pdfs_parallel(pdf_blobs, max_workers=PDF_EXTRACTION_WORKERS, max_pages=MAX_PDF_PAGES,
+                          timeout=PDF_EXTRACTION_TIMEOUT_SECONDS):
+    if not pdf_blobs:
+        return []
+
+    workers = max(1, min(max_workers, len(pdf_blobs)))
+    if workers == 1 and not timeout:
+        records = [_extract_pdf_bytes(data, max_pages, timeout) for data in pdf_blobs]
+        record_extraction_metrics(records)
+        return records
+
+    records = [None] * len(pdf_blobs)
+    pending = deque(range(len(pdf_blobs)))
+    attempts = [0] * len(pdf_blobs)
+    while pending:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        in_flight = {}
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < workers:
+                    index = pending.popleft()
+                    attempts[index] += 1
+                    future = executor.submit(_extract_pdf_bytes, pdf_blobs[index], max_pages, timeout)
+                    deadline = time.monotonic() + timeout + PDF_EXTRACTION_KILL_GRACE_SECONDS if timeout else None
+                    in_flight[future] = (index, deadline)
+
+                deadlines = [deadline for _, deadline in in_flight.values() if deadline is not None]
+                wait_seconds = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+                done, _ = wait(in_flight, timeout=wait_seconds, return_when=FIRST_COMPLETED)
+
+                broken = False
+                for future in done:
+                    index, _ = in_flight.pop(future)
+                    try:
+                        records[index] = future.result()
+                    except BrokenProcessPool as e:
+                        # A worker died (e.g. crashed on a malformed file); which file caused it is
+                        # unknown, so every file that was in flight gets one more try
+                        broken = True
+                        if attempts[index] < 2:
+                            pending.append(index)
+                        else:
+                            records[index] = _error_record(e)
+                    except Exception as e:
+                        records[index] = _error_record(e)
+
+                now = time.monotonic()
+                overdue = [future for future, (_, deadline) in in_flight.items()
+                           if deadline is not None and deadline <= now]
+                if overdue or broken:
+                    for future in overdue:
+                        records[in_flight.pop(future)[0]] = _timed_out_record()
+                    # Files killed alongside a stuck one were not at fault and keep their tries
+                    for index, _ in in_flight.values():
+                        pending.appendleft(index)
+                        if not broken:
+                            attempts[index] -= 1
+                    in_flight.clear()
+                    _kill_pool(executor)
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    record_extraction_metrics(records)
+    return records
+
+def _error_record(error):
+    return {"text": "", "page_count": 0, "extraction_seconds": None, "error": f"Error extracting text from PDF: {str(error)}"}
+
+# Kill the pool's worker processes; shutdown() alone leaves a worker stuck in a page running
+def _kill_pool(executor):
+    processes = list((executor._processes or {}).values())
+    for process in processes:
+        process.kill()
+    for process in processes:
+        process.join(1)
+
+def pdf_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+# SQLite-backed store of extracted text keyed by the SHA-256 of the PDF bytes, so each
+# distinct PDF is parsed once. Text is stored zlib-compressed; PDFs whose text could not be
+# extracted are stored with their error. Safe to share between threads.
+# Tables of older text formats are dropped on open.
+class TextStore:
+    def __init__(self, path=TEXT_STORE_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path, [
+            f"CREATE TABLE IF NOT EXISTS {TEXT_STORE_TABLE} ("
+            "sha256 TEXT PRIMARY KEY, text BLOB NOT NULL, page_count INTEGER NOT NULL, "
+            "extraction_seconds REAL, created_at REAL NOT NULL, error TEXT)"
+        ])
+        stale_tables = [
+            name for (name,) in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            if (name == "texts" or name.startswith("texts_v")) and name != TEXT_STORE_TABLE
+        ]
+        for name in stale_tables:
+            self._conn.execute(f"DROP TABLE {name}")
+        self._conn.commit()
+
+    def get(self, digest):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT text, page_count, extraction_seconds, error FROM {TEXT_STORE_TABLE} WHERE sha256 = ?", (digest,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "text": zlib.decompress(row[0]).decode("utf-8"),
+            "page_count": row[1],
+            "extraction_seconds": row[2],
+            "error": row[3]
+        }
+
+    # Extracted text, or None if the PDF is unknown or its text could not be extracted
+    def get_text(self, digest):
+        record = self.get(digest)
+        if record is None or record["error"]:
+            return None
+        return record["text"]
+
+    # Why each of these PDFs has no text, for the ones without: {digest: error}
+    def get_errors(self, digests):
+        digests = list(dict.fromkeys(digests))
+        found = {}
+        with self._lock:
+            # Chunked to stay under SQLite's limit on query parameters
+            for start in range(0, len(digests), 500):
+                chunk = digests[start:start + 500]
+                found.update(self._conn.execute(
+                    f"SELECT sha256, error FROM {TEXT_STORE_TABLE} WHERE sha256 IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall())
+        errors = {}
+        for digest in digests:
+            if digest not in found:
+                errors[digest] = TEXT_UNAVAILABLE_ERROR
+            elif found[digest] is not None:
+                errors[digest] = found[digest]
+        return errors
+
+    def put(self, digest, record):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {TEXT_STORE_TABLE} "
+                "(sha256, text, page_count, extraction_seconds, created_at, error) VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, zlib.compress(record["text"].encode("utf-8")), record["page_count"],
+                 record["extraction_seconds"], time.time(), record["error"])
+            )
+            self._conn.commit()
+
+    def __contains__(self, digest):
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT 1 FROM {TEXT_STORE_TABLE} WHERE sha256 = ?", (digest,)
+            ).fetchone() is not None
+
+    # Make sure every PDF has a stored record, extracting only the ones not seen before and
+    # the ones that timed out, which may succeed on a later attempt. Returns the digests in
+    # input order.
+    def add_pdfs(self, pdf_blobs):
+        digests = [pdf_digest(data) for data in pdf_blobs]
+        timed_out = {digest for digest, error in self.get_errors(digests).items() if error == EXTRACTION_TIMEOUT_ERROR}
+
+        missing = {}
+        metrics = get_metrics()
+        for digest, data in zip(digests, pdf_blobs):
+            if digest not in missing and (digest in timed_out or digest not in self):
+                missing[digest] = data
+                metrics.inc("cache_requests_total", cache="text_store", result="miss")
+            else:
+                metrics.inc("cache_requests_total", cache="text_store", result="hit")
+
+        records = extract_pdfs_parallel(list(missing.values()))
+        for digest, record in zip(missing, records):
+            self.put(digest, record)
+
+        return digests
+
+@lazy_singleton
+def get_text_store():
+    return TextStore(TEXT_STORE_PATH)
@@ -0,0 +1,98 @@
+# Persistent cache of JSON results, behind the analysis and JD summary caches and the
+# candidate detail store
+import json
+import threading
+import time
+import zlib
+from metrics import get_metrics
+from storage import open_sqlite
+
+# SQLite-backed key/value cache for JSON results with LRU and TTL eviction.
+# Use path=":memory:" for a process-local cache. Safe to share between threads.
+# name labels the cache in the metrics. The TTL counts from when a value was stored, or from
+# its last use with sliding_ttl. With compress, values are stored zlib-compressed.
+# Evicting counts the entries, so it runs once per 1% of max_entries stored rather than on
+# every set; expired entries are also dropped when they are read.
+class ResultCache:
+    def __init__(self, path, max_entries=10000, ttl_seconds=None, name="cache", sliding_ttl=False, compress=False):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self._ttl_column = "last_access" if sliding_ttl else "created_at"
+        self._evict_every = max(1, max_entries // 100)
+        self._sets_since_evict = 0
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path, [
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)"
+        ])
+
+    def get(self, key):
+        value = self._lookup(key)
+        get_metrics().inc("cache_requests_total", cache=self.name, result="miss" if value is None else "hit")
+        return value
+
+    def _lookup(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, {self._ttl_column} FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, stored_or_used_at = row
+            if self.ttl_seconds and now - stored_or_used_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        if isinstance(value, bytes):
+            value = zlib.decompress(value).decode("utf-8")
+        return json.loads(value)
+
+    def set(self, key, value):
+        value = json.dumps(value)
+        if self.compress:
+            value = zlib.compress(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._sets_since_evict += 1
+            if self._sets_since_evict >= self._evict_every:
+                self._sets_since_evict = 0
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.ttl_seconds:
+            self._conn.execute(f"DELETE FROM cache WHERE {self._ttl_column} < ?", (now - self.ttl_seconds,))
+
+        # Drop least recently used entries beyond the size limit
+        count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries
+        }
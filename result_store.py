@@ -0,0 +1,253 @@
+# Shared store of screening results keyed by requisition: the job description and its summary,
+# the resumes in the applicant pool, the analyses for each version of the JD and the latest
+# shortlist. Every session and app replica pointed at the same store sees the same requisition,
+# so a pool screened by one recruiter is not analyzed again by the next.
+#
+# Resumes are kept by the SHA-256 of the PDF, so files with the same name from different
+# recruiters are separate resumes. A copy of each pool resume's extracted text is stored too,
+# so a replica whose own TextStore never saw the PDF can still restore the pool. The default
+# backend is SQLite in WAL mode, where readers never block each other or the writer. Other
+# databases plug in through register_result_store_backend:
+#
+#     RESULT_STORE_URL=sqlite:////srv/hirease/results.sqlite3 streamlit run app.py
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+
+from screening import hash_jd_summary
+from storage import lazy_singleton, make_parent_dir
+
+RESULT_STORE_URL = os.getenv("RESULT_STORE_URL", "sqlite:///" + os.path.join(".cache", "results.sqlite3"))
+
+# Interface of a result store backend. Analyses and shortlists are stored per JD version
+# (the hash of the JD summary), so edits to the JD never mix results from different versions.
+class ResultStore(ABC):
+    # Create or update a requisition with its job description and summary
+    @abstractmethod
+    def save_requisition(self, requisition_id, jd_text, jd_summary):
+        ...
+
+    # {"id", "jd_text", "jd_summary", "updated_at"}, or None for an unknown requisition
+    @abstractmethod
+    def get_requisition(self, requisition_id):
+        ...
+
+    # Add resumes ({"name", "sha256"} dicts) to the pool; resumes already in it are kept.
+    # texts ({sha256: extracted text}) are stored for get_resume_texts.
+    @abstractmethod
+    def add_resumes(self, requisition_id, resumes, texts=None):
+        ...
+
+    # Resumes in the pool, in the order they were added
+    @abstractmethod
+    def get_resumes(self, requisition_id):
+        ...
+
+    # Take resumes (by SHA-256) out of the pool, e.g. ones replaced by a new upload
+    @abstractmethod
+    def remove_resumes(self, requisition_id, digests):
+        ...
+
+    # {sha256: extracted text} for the given resumes whose text was stored
+    @abstractmethod
+    def get_resume_texts(self, digests):
+        ...
+
+    # Save analyses ({sha256: analysis}) made against jd_summary
+    @abstractmethod
+    def save_analyses(self, requisition_id, jd_summary, analyses):
+        ...
+
+    # {sha256: analysis} for the pool's resumes analyzed against jd_summary
+    @abstractmethod
+    def get_analyses(self, requisition_id, jd_summary):
+        ...
+
+    # Replace the requisition's shortlist (entries from shortlist_candidates)
+    @abstractmethod
+    def save_shortlist(self, requisition_id, jd_summary, threshold, entries):
+        ...
+
+    # {"threshold", "entries", "jd_hash", "updated_at"} for the latest shortlist, or None
+    @abstractmethod
+    def get_shortlist(self, requisition_id):
+        ...
+
+SQLITE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS requisitions ("
+    "id TEXT PRIMARY KEY, jd_text TEXT NOT NULL, jd_summary TEXT NOT NULL, created_at REAL NOT NULL, "
+    "updated_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS requisition_resumes ("
+    "requisition_id TEXT NOT NULL, name TEXT NOT NULL, sha256 TEXT NOT NULL, added_at REAL NOT NULL, "
+    "PRIMARY KEY (requisition_id, sha256))",
+    "CREATE TABLE IF NOT EXISTS resume_texts (sha256 TEXT PRIMARY KEY, text BLOB NOT NULL, created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS analyses ("
+    "requisition_id TEXT NOT NULL, sha256 TEXT NOT NULL, jd_hash TEXT NOT NULL, analysis TEXT NOT NULL, "
+    "updated_at REAL NOT NULL, PRIMARY KEY (requisition_id, jd_hash, sha256))",
+    "CREATE TABLE IF NOT EXISTS shortlists ("
+    "requisition_id TEXT PRIMARY KEY, jd_hash TEXT NOT NULL, threshold INTEGER NOT NULL, entries TEXT NOT NULL, "
+    "updated_at REAL NOT NULL)",
+]
+
+# SQLite backend. Each thread gets its own connection, so reads run concurrently; writes are
+# short transactions that wait up to 30 seconds for other writers, including other processes
+# and replicas sharing the database file.
+class SQLiteResultStore(ResultStore):
+    def __init__(self, path):
+        self._keeper = None
+        if path == ":memory:":
+            # A named shared-cache database, kept alive by one open connection
+            self._uri = f"file:result_store_{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._keeper = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        else:
+            make_parent_dir(path)
+            self._uri = "file:" + os.path.abspath(path)
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._connection()
+        with conn:
+            _rekey_resume_pools(conn)
+            for statement in SQLITE_SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._uri, uri=True, timeout=30)
+            if self._keeper is None:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save_requisition(self, requisition_id, jd_text, jd_summary):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO requisitions (id, jd_text, jd_summary, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET jd_text = excluded.jd_text, jd_summary = excluded.jd_summary, "
+                "updated_at = excluded.updated_at",
+                (requisition_id, jd_text, json.dumps(jd_summary), now, now)
+            )
+
+    def get_requisition(self, requisition_id):
+        row = self._connection().execute(
+            "SELECT id, jd_text, jd_summary, updated_at FROM requisitions WHERE id = ?", (requisition_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "jd_text": row[1], "jd_summary": json.loads(row[2]), "updated_at": row[3]}
+
+    def add_resumes(self, requisition_id, resumes, texts=None):
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO requisition_resumes (requisition_id, name, sha256, added_at) VALUES (?, ?, ?, ?)",
+                [(requisition_id, resume["name"], resume["sha256"], now) for resume in resumes]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO resume_texts (sha256, text, created_at) VALUES (?, ?, ?)",
+                [(digest, zlib.compress(text.encode("utf-8")), now) for digest, text in (texts or {}).items()]
+            )
+
+    def get_resumes(self, requisition_id):
+        rows = self._connection().execute(
+            "SELECT name, sha256 FROM requisition_resumes WHERE requisition_id = ? ORDER BY added_at, rowid",
+            (requisition_id,)
+        ).fetchall()
+        return [{"name": name, "sha256": sha256} for name, sha256 in rows]
+
+    def remove_resumes(self, requisition_id, digests):
+        with self._connection() as conn:
+            conn.executemany(
+                "DELETE FROM requisition_resumes WHERE requisition_id = ? AND sha256 = ?",
+                [(requisition_id, digest) for digest in digests]
+            )
+
+    def get_resume_texts(self, digests):
+        digests = list(dict.fromkeys(digests))
+        conn = self._connection()
+        texts = {}
+        # Chunked to stay under SQLite's limit on query parameters
+        for start in range(0, len(digests), 500):
+            chunk = digests[start:start + 500]
+            rows = conn.execute(
+                f"SELECT sha256, text FROM resume_texts WHERE sha256 IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            texts.update((digest, zlib.decompress(text).decode("utf-8")) for digest, text in rows)
+        return texts
+
+    def save_analyses(self, requisition_id, jd_summary, analyses):
+        jd_hash = hash_jd_summary(jd_summary)
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO analyses (requisition_id, sha256, jd_hash, analysis, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(requisition_id, digest, jd_hash, json.dumps(analysis), now) for digest, analysis in analyses.items()]
+            )
+
+    def get_analyses(self, requisition_id, jd_summary):
+        rows = self._connection().execute(
+            "SELECT sha256, analysis FROM analyses WHERE requisition_id = ? AND jd_hash = ?",
+            (requisition_id, hash_jd_summary(jd_summary))
+        ).fetchall()
+        return {digest: json.loads(analysis) for digest, analysis in rows}
+
+    def save_shortlist(self, requisition_id, jd_summary, threshold, entries):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO shortlists (requisition_id, jd_hash, threshold, entries, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (requisition_id, hash_jd_summary(jd_summary), threshold, json.dumps(entries), time.time())
+            )
+
+    def get_shortlist(self, requisition_id):
+        row = self._connection().execute(
+            "SELECT jd_hash, threshold, entries, updated_at FROM shortlists WHERE requisition_id = ?", (requisition_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"jd_hash": row[0], "threshold": row[1], "entries": json.loads(row[2]), "updated_at": row[3]}
+
+# Pools were once keyed by file name, which dropped a second resume with the same name;
+# rebuild such a table keyed by SHA-256, keeping its order
+def _rekey_resume_pools(conn):
+    primary_key = [row[1] for row in conn.execute("PRAGMA table_info(requisition_resumes)") if row[5]]
+    if "name" not in primary_key:
+        return
+    conn.execute("ALTER TABLE requisition_resumes RENAME TO requisition_resumes_by_name")
+    conn.execute(SQLITE_SCHEMA[1])
+    conn.execute(
+        "INSERT OR IGNORE INTO requisition_resumes (requisition_id, name, sha256, added_at) "
+        "SELECT requisition_id, name, sha256, added_at FROM requisition_resumes_by_name ORDER BY added_at, rowid"
+    )
+    conn.execute("DROP TABLE requisition_resumes_by_name")
+
+# sqlite:///relative/path, sqlite:////absolute/path or sqlite:///:memory:
+def _open_sqlite(url):
+    return SQLiteResultStore(url.partition("://")[2][1:] or ":memory:")
+
+# Backend factories by URL scheme; each takes the full store URL
+RESULT_STORE_BACKENDS = {"sqlite": _open_sqlite}
+
+# Make another database available as a result store, e.g.
+# register_result_store_backend("postgresql", lambda url: PostgresResultStore(url))
+def register_result_store_backend(scheme, factory):
+    RESULT_STORE_BACKENDS[scheme] = factory
+
+def open_result_store(url=RESULT_STORE_URL):
+    scheme = url.partition("://")[0]
+    if scheme not in RESULT_STORE_BACKENDS:
+        raise ValueError(f"No result store backend for '{scheme}' (known: {', '.join(sorted(RESULT_STORE_BACKENDS))})")
+    return RESULT_STORE_BACKENDS[scheme](url)
+
+@lazy_singleton
+def get_result_store():
+    return open_result_store(RESULT_STORE_URL)
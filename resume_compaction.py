@@ -0,0 +1,186 @@
+# Resume compaction for analysis prompts: normalizes whitespace, drops per-page headers,
+# footers and page numbers, removes duplicate sections and reference lists, and trims the
+# text to a token budget, keeping skills, experience and education first.
+import hashlib
+import os
+import re
+from collections import Counter
+
+from gemini_client import estimate_tokens
+
+# Token budget for one resume in an analysis prompt (0 disables trimming)
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+
+# "0" sends resumes to the model exactly as extracted
+RESUME_COMPACTION = os.getenv("RESUME_COMPACTION", "1") != "0"
+
+# Section headings by section kind; a heading is a short line made of one of these phrases
+SECTION_HEADINGS = {
+    "skills": ["skills", "technical skills", "core skills", "key skills", "core competencies", "competencies",
+               "technologies", "tools", "tech stack", "skills and tools"],
+    "experience": ["experience", "work experience", "professional experience", "employment history",
+                   "work history", "employment", "career history", "relevant experience"],
+    "education": ["education", "academic background", "qualifications", "academic qualifications",
+                  "education and training"],
+    "certifications": ["certifications", "certificates", "licenses", "licenses and certifications",
+                       "certifications and licenses", "courses", "training"],
+    "summary": ["summary", "profile", "professional summary", "about me", "objective", "career objective",
+                "overview"],
+    "projects": ["projects", "key projects", "personal projects", "selected projects"],
+    "achievements": ["achievements", "awards", "honors", "awards and honors", "accomplishments"],
+    "publications": ["publications", "research", "papers"],
+    "languages": ["languages"],
+    "interests": ["interests", "hobbies", "hobbies and interests", "extracurricular activities", "activities"],
+    "references": ["references", "referees"],
+}
+
+# Order in which sections are kept when the budget is tight ("header" is the text before
+# the first heading: name and contact details)
+SECTION_PRIORITY = [
+    "header", "skills", "experience", "education", "certifications", "summary", "projects",
+    "achievements", "other", "publications", "languages", "interests",
+]
+
+# Sections that never help the evaluation
+DROPPED_SECTIONS = {"references"}
+
+HEADING_PATTERN = re.compile(
+    r"^\W*(" + "|".join(
+        re.escape(phrase).replace(r"\ ", r"\s+")
+        for phrases in SECTION_HEADINGS.values() for phrase in sorted(phrases, key=len, reverse=True)
+    ) + r")\W*$",
+    re.IGNORECASE
+)
+HEADING_KINDS = {phrase: kind for kind, phrases in SECTION_HEADINGS.items() for phrase in phrases}
+
+PAGE_NUMBER_PATTERN = re.compile(r"^\W*(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?\W*$", re.IGNORECASE)
+DIGITS_PATTERN = re.compile(r"\d+")
+
+# Lines near the top or bottom of a page that are checked for repeated headers and footers
+EDGE_LINES = 2
+
+def _normalize_line(line):
+    return " ".join(line.split())
+
+# Page numbers differ only in their digits; every other line must repeat exactly
+def _line_signature(line):
+    if PAGE_NUMBER_PATTERN.match(line):
+        return DIGITS_PATTERN.sub("#", line.casefold())
+    return line.casefold()
+
+# Positions of the first and last EDGE_LINES non-blank lines of a page
+def _edge_positions(lines):
+    content = [i for i, line in enumerate(lines) if line]
+    return set(content[:EDGE_LINES] + content[-EDGE_LINES:])
+
+# Signatures of lines repeated at the top or bottom of most pages. Pages are separated by
+# form feeds (as written by pdf_extraction); text without page breaks has no headers to find.
+def _repeated_edge_lines(pages):
+    if len(pages) < 2:
+        return set()
+    counts = Counter()
+    for lines in pages:
+        counts.update({_line_signature(lines[i]) for i in _edge_positions(lines)})
+    threshold = max(2, len(pages) // 2 + 1)
+    return {key for key, count in counts.items() if count >= threshold}
+
+# Split lines into (kind, lines) sections at recognised headings
+def _split_sections(lines):
+    sections = [["header", []]]
+    for line in lines:
+        match = HEADING_PATTERN.match(line) if len(line) <= 50 else None
+        if match:
+            kind = HEADING_KINDS.get(" ".join(match.group(1).lower().split()), "other")
+            sections.append([kind, [line]])
+        else:
+            sections[-1][1].append(line)
+    return [(kind, section_lines) for kind, section_lines in sections if any(section_lines)]
+
+def _join(lines):
+    # Collapse runs of blank lines
+    text = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+# Cut text at a line boundary so it fits in about `tokens` tokens
+def _truncate(text, tokens):
+    kept = []
+    used = 0
+    for line in text.split("\n"):
+        cost = estimate_tokens(line + "\n")
+        if used + cost > tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept).strip()
+
+# Compact a resume for the analysis prompt. Returns (text, stats) where stats holds the
+# estimated tokens before and after compaction and the sections that were dropped or cut.
+def compact_resume(cv_text, token_budget=RESUME_TOKEN_BUDGET):
+    tokens_before = estimate_tokens(cv_text)
+    if not RESUME_COMPACTION:
+        return cv_text, {"tokens_before": tokens_before, "tokens_after": tokens_before, "dropped": [], "truncated": []}
+
+    pages = [[_normalize_line(line) for line in page.splitlines()] for page in cv_text.split("\f")]
+    repeated = _repeated_edge_lines(pages)
+
+    lines = []
+    for page_number, page in enumerate(pages):
+        edges = _edge_positions(page)
+        top = sorted(edges)[:EDGE_LINES]
+        for i, line in enumerate(page):
+            if i in edges:
+                if PAGE_NUMBER_PATTERN.match(line):
+                    continue
+                # Repeated lines are kept only at the very top of the resume, where they are
+                # usually the candidate's name and contact details
+                if _line_signature(line) in repeated and not (page_number == 0 and i in top):
+                    continue
+            lines.append(line)
+
+    # Drop unhelpful sections and exact duplicates of earlier ones (e.g. a skills block repeated on every page)
+    sections = []
+    dropped = []
+    seen_bodies = set()
+    for kind, section_lines in _split_sections(lines):
+        text = _join(section_lines)
+        # Sections with the same content under any heading count as duplicates
+        body = section_lines if kind == "header" else section_lines[1:]
+        body_hash = hashlib.sha256(" ".join(line for line in body if line).casefold().encode("utf-8")).hexdigest()
+        if kind in DROPPED_SECTIONS or body_hash in seen_bodies:
+            dropped.append(kind)
+            continue
+        seen_bodies.add(body_hash)
+        sections.append((kind, text))
+
+    # Keep sections by priority until the budget runs out, then restore resume order
+    truncated = []
+    if token_budget and sum(estimate_tokens(text) for _, text in sections) > token_budget:
+        remaining = token_budget
+        kept = {}
+        ranked = sorted(range(len(sections)), key=lambda i: SECTION_PRIORITY.index(sections[i][0])
+                        if sections[i][0] in SECTION_PRIORITY else SECTION_PRIORITY.index("other"))
+        for i in ranked:
+            kind, text = sections[i]
+            tokens = estimate_tokens(text)
+            if tokens <= remaining:
+                kept[i] = text
+                remaining -= tokens
+                continue
+
+            # The first section that does not fit is cut short; everything ranked after it is dropped
+            text = _truncate(text, remaining) if remaining else ""
+            if text:
+                kept[i] = text
+                truncated.append(kind)
+            else:
+                dropped.append(kind)
+            remaining = 0
+        sections = [(sections[i][0], kept[i]) for i in sorted(kept)]
+
+    compacted = "\n\n".join(text for _, text in sections if text)
+    return compacted, {
+        "tokens_before": tokens_before,
+        "tokens_after": estimate_tokens(compacted),
+        "dropped": sorted(set(dropped)),
+        "truncated": truncated
+    }
@@ -0,0 +1,394 @@
+# Interview slot scheduling: interviewer availability and offered or booked interviews are kept
+# in per-interviewer interval indexes, so slots can be assigned across a whole shortlist without
+# offering the same interviewer's time twice. Offers and bookings are shared through a
+# ScheduleStore, so sessions and processes scheduling at the same time never double-book.
+# Schedules can be exported as an iCalendar file.
+import heapq
+import os
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from storage import lazy_singleton, open_sqlite
+
+# Interview length and how many alternative slots each candidate is offered
+INTERVIEW_DURATION_MINUTES = int(os.getenv("INTERVIEW_DURATION_MINUTES", "45"))
+INTERVIEW_SLOTS_PER_CANDIDATE = int(os.getenv("INTERVIEW_SLOTS_PER_CANDIDATE", "3"))
+
+# Default availability: every interviewer, each business day in the scheduling window
+INTERVIEWERS = [name.strip() for name in os.getenv("INTERVIEWERS", "Recruiting Team").split(",") if name.strip()]
+INTERVIEW_DAY_START = os.getenv("INTERVIEW_DAY_START", "10:00")
+INTERVIEW_DAY_END = os.getenv("INTERVIEW_DAY_END", "17:00")
+INTERVIEW_SCHEDULE_DAYS = int(os.getenv("INTERVIEW_SCHEDULE_DAYS", "10"))
+
+# Hours an unbooked offer holds its slot before it goes back to the schedule
+INTERVIEW_OFFER_TTL_HOURS = float(os.getenv("INTERVIEW_OFFER_TTL_HOURS", "72"))
+
+# Offered and booked interviews shared by every session and process
+SCHEDULE_STORE_PATH = os.getenv("SCHEDULE_STORE_PATH", os.path.join(".cache", "schedule.sqlite3"))
+
+# Sorted, non-overlapping [start, end) intervals with O(log n) overlap checks
+class IntervalIndex:
+    def __init__(self):
+        self._starts = []
+        self._intervals = []
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __iter__(self):
+        return iter(self._intervals)
+
+    def overlaps(self, start, end):
+        i = bisect_left(self._starts, end)
+        # Only the last interval starting before end can reach into [start, end)
+        return i > 0 and self._intervals[i - 1][1] > start
+
+    def add(self, start, end, value=None):
+        if self.overlaps(start, end):
+            raise ValueError(f"{start:%Y-%m-%d %H:%M} - {end:%H:%M} overlaps an existing interval")
+        i = bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._intervals.insert(i, (start, end, value))
+
+    def remove(self, start, end):
+        i = bisect_left(self._starts, start)
+        if i < len(self._intervals) and self._intervals[i][:2] == (start, end):
+            del self._starts[i]
+            del self._intervals[i]
+
+def _now():
+    return datetime.now()
+
+def _parse_clock(value):
+    hours, minutes = value.split(":")
+    return time(int(hours), int(minutes))
+
+# Working hours on the next `days` business days (starting tomorrow) for each interviewer.
+# Returns {interviewer: [(start, end), ...]}.
+def default_availability(interviewers=None, days=INTERVIEW_SCHEDULE_DAYS, day_start=INTERVIEW_DAY_START,
+                         day_end=INTERVIEW_DAY_END, start_date=None):
+    start_date = start_date or datetime.now().date() + timedelta(days=1)
+    windows = []
+    current = start_date
+    while len(windows) < days:
+        # Skip weekends (5 = Saturday, 6 = Sunday)
+        if current.weekday() < 5:
+            windows.append((datetime.combine(current, _parse_clock(day_start)),
+                            datetime.combine(current, _parse_clock(day_end))))
+        current += timedelta(days=1)
+    return {name: list(windows) for name in (interviewers or INTERVIEWERS)}
+
+# Human readable slot, e.g. "Monday, October 19, 2026 at 10:00 AM"
+def format_slot(start):
+    return f"{start:%A, %B %d, %Y} at {start:%I:%M %p}".replace(" at 0", " at ")
+
+# SQLite-backed record of offered and booked interviews. Changes run in transactions that take
+# the database write lock first, so a scheduler can read the current schedule, pick free slots
+# and save them before anyone else assigns. Safe to share between threads.
+class ScheduleStore:
+    def __init__(self, path=SCHEDULE_STORE_PATH):
+        self._lock = threading.Lock()
+        self._conn = open_sqlite(path, [
+            "CREATE TABLE IF NOT EXISTS interviews ("
+            "uid TEXT PRIMARY KEY, candidate_id TEXT NOT NULL, candidate TEXT NOT NULL, interviewer TEXT NOT NULL, "
+            "start TEXT NOT NULL, end TEXT NOT NULL, status TEXT NOT NULL, offered_at TEXT NOT NULL)"
+        ], timeout=30, isolation_level=None)
+        # Schedules written before offers expired count as long expired
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(interviews)")]
+        if "offered_at" not in columns:
+            self._conn.execute("ALTER TABLE interviews ADD COLUMN offered_at TEXT NOT NULL DEFAULT '1970-01-01T00:00:00'")
+
+    # Exclusive transaction; yields the connection and commits on success
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # Every offered and booked interview as (offer, status), ordered by time
+    def read(self, conn=None):
+        if conn is None:
+            with self._lock:
+                return self.read(self._conn)
+        rows = conn.execute(
+            "SELECT uid, candidate_id, candidate, interviewer, start, end, status, offered_at "
+            "FROM interviews ORDER BY start, uid"
+        ).fetchall()
+        return [
+            ({"candidate_id": candidate_id, "candidate": candidate, "interviewer": interviewer,
+              "start": datetime.fromisoformat(start), "end": datetime.fromisoformat(end), "uid": uid,
+              "offered_at": datetime.fromisoformat(offered_at)}, status)
+            for uid, candidate_id, candidate, interviewer, start, end, status, offered_at in rows
+        ]
+
+    def add(self, conn, offers, status="offered"):
+        conn.executemany(
+            "INSERT INTO interviews (uid, candidate_id, candidate, interviewer, start, end, status, offered_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(offer["uid"], offer["candidate_id"], offer["candidate"], offer["interviewer"],
+              offer["start"].isoformat(), offer["end"].isoformat(), status, offer["offered_at"].isoformat())
+             for offer in offers]
+        )
+
+    def set_status(self, conn, uid, status):
+        conn.execute("UPDATE interviews SET status = ? WHERE uid = ?", (status, uid))
+
+    def delete(self, conn, uids):
+        conn.executemany("DELETE FROM interviews WHERE uid = ?", [(uid,) for uid in uids])
+
+    # Delete unbooked offers made before offered_before or for slots starting before now
+    def expire(self, conn, now, offered_before):
+        conn.execute(
+            "DELETE FROM interviews WHERE status = 'offered' AND (offered_at < ? OR start < ?)",
+            (offered_before.isoformat(), now.isoformat())
+        )
+
+@lazy_singleton
+def get_schedule_store():
+    return ScheduleStore(SCHEDULE_STORE_PATH)
+
+# Assigns interview slots to candidates. Every offered or booked slot is held in the
+# interviewer's IntervalIndex, so no interviewer is offered to two candidates at once.
+# Candidates go to the least loaded interviewer first and get their slots on different days.
+# Candidates are identified by an ID (the resume's SHA-256 in the app), so candidates with the
+# same name are scheduled separately. With a store, every change starts from the shared
+# schedule and is saved before the store is unlocked; call refresh() to see other sessions' changes.
+# Unbooked offers expire after offer_ttl_hours or once their slot has started; only future
+# slots are offered.
+class InterviewScheduler:
+    def __init__(self, availability=None, duration_minutes=INTERVIEW_DURATION_MINUTES, store=None,
+                 offer_ttl_hours=INTERVIEW_OFFER_TTL_HOURS):
+        self.duration = timedelta(minutes=duration_minutes)
+        self.offer_ttl = timedelta(hours=offer_ttl_hours)
+        self.availability = availability if availability is not None else default_availability()
+        self.store = store
+        self.busy = {name: IntervalIndex() for name in self.availability}
+        self.offers = {}    # candidate ID -> [offer, ...]
+        self.bookings = {}  # candidate ID -> offer
+        self._blocked = []
+
+        # Candidate start times per interviewer, in order; _next_slot skips the ones taken
+        self._slot_starts = {}
+        for name, windows in self.availability.items():
+            starts = []
+            for window_start, window_end in sorted(windows):
+                start = window_start
+                while start + self.duration <= window_end:
+                    starts.append(start)
+                    start += self.duration
+            self._slot_starts[name] = starts
+        self._load = {name: 0 for name in self.availability}
+        # Position of the first slot that may still be free, so full days are not rescanned
+        self._first_free = {name: 0 for name in self.availability}
+
+        if store is not None:
+            self.refresh()
+
+    # Replace the in-memory schedule with the stored one
+    def refresh(self):
+        if self.store is not None:
+            self._load_schedule(self.store.read())
+
+    def _load_schedule(self, rows):
+        now = _now()
+        self.busy = {name: IntervalIndex() for name in self.availability}
+        self.offers = {}
+        self.bookings = {}
+        self._load = {name: 0 for name in self.availability}
+        self._first_free = {name: 0 for name in self.availability}
+        for interviewer, start, end in self._blocked:
+            self._hold(interviewer, start, end, None)
+
+        for offer, status in rows:
+            if status != "booked" and (offer["offered_at"] < now - self.offer_ttl or offer["start"] < now):
+                continue
+            self._hold(offer["interviewer"], offer["start"], offer["end"], offer["candidate_id"])
+            if offer["interviewer"] in self._load:
+                self._load[offer["interviewer"]] += 1
+            if status == "booked":
+                self.bookings[offer["candidate_id"]] = offer
+            else:
+                self.offers.setdefault(offer["candidate_id"], []).append(offer)
+
+    def _hold(self, interviewer, start, end, value):
+        busy = self.busy.setdefault(interviewer, IntervalIndex())
+        if not busy.overlaps(start, end):
+            busy.add(start, end, value)
+
+    # Every offered and booked interview held in memory as (offer, status)
+    def _held(self):
+        held = [(offer, "offered") for offers in self.offers.values() for offer in offers]
+        return held + [(offer, "booked") for offer in self.bookings.values()]
+
+    # Yields the store connection (None without a store) after loading the shared schedule,
+    # with expired offers released
+    @contextmanager
+    def _shared_schedule(self):
+        if self.store is None:
+            self._load_schedule(self._held())
+            yield None
+            return
+        with self.store.transaction() as conn:
+            now = _now()
+            self.store.expire(conn, now, now - self.offer_ttl)
+            self._load_schedule(self.store.read(conn))
+            yield conn
+
+    # Mark time an interviewer cannot use, e.g. existing meetings
+    def block(self, interviewer, start, end):
+        self._blocked.append((interviewer, start, end))
+        self._hold(interviewer, start, end, None)
+
+    # Earliest free future slot of an interviewer on a day not in excluded_days
+    def _next_slot(self, interviewer, excluded_days, now):
+        busy = self.busy[interviewer]
+        starts = self._slot_starts[interviewer]
+
+        first = self._first_free[interviewer]
+        while first < len(starts) and (starts[first] < now or busy.overlaps(starts[first], starts[first] + self.duration)):
+            first += 1
+        self._first_free[interviewer] = first
+
+        for start in starts[first:]:
+            if start.date() in excluded_days:
+                continue
+            if not busy.overlaps(start, start + self.duration):
+                return start
+        return None
+
+    # Offer slots_per_candidate slots to each candidate without offers, in one pass over the list.
+    # candidates are (candidate ID, name) pairs. Returns {candidate ID: [offer, ...]}; offers are
+    # dicts with candidate_id, candidate (the name), interviewer, start, end, uid and offered_at.
+    def assign(self, candidates, slots_per_candidate=INTERVIEW_SLOTS_PER_CANDIDATE):
+        with self._shared_schedule() as conn:
+            # Interviewers ordered by the number of interviews they already hold
+            heap = [(self._load[name], name) for name in self.availability]
+            heapq.heapify(heap)
+            now = _now()
+
+            new_offers = []
+            for candidate_id, name in candidates:
+                if candidate_id in self.offers or candidate_id in self.bookings:
+                    continue
+
+                offers = []
+                used_days = set()
+                exhausted = []
+                while len(offers) < slots_per_candidate and heap:
+                    load, interviewer = heapq.heappop(heap)
+                    start = self._next_slot(interviewer, used_days, now)
+                    if start is None:
+                        # Nothing left on other days for this candidate; try the next interviewer
+                        exhausted.append((load, interviewer))
+                        continue
+
+                    offer = {"candidate_id": candidate_id, "candidate": name, "interviewer": interviewer,
+                             "start": start, "end": start + self.duration, "uid": uuid.uuid4().hex, "offered_at": now}
+                    self.busy[interviewer].add(offer["start"], offer["end"], candidate_id)
+                    self._load[interviewer] += 1
+                    offers.append(offer)
+                    used_days.add(start.date())
+                    heapq.heappush(heap, (self._load[interviewer], interviewer))
+
+                for entry in exhausted:
+                    heapq.heappush(heap, entry)
+                self.offers[candidate_id] = sorted(offers, key=lambda offer: offer["start"])
+                new_offers += offers
+
+            if conn is not None:
+                self.store.add(conn, new_offers)
+
+        return {candidate_id: self.offers.get(candidate_id, []) for candidate_id, _ in candidates}
+
+    # Confirm the candidate's offer with this uid and release their other offers. Returns the
+    # booking, which is the candidate's existing one if another session booked first, or None.
+    def book(self, candidate_id, uid):
+        with self._shared_schedule() as conn:
+            offers = self.offers.get(candidate_id, [])
+            if not any(offer["uid"] == uid for offer in offers):
+                return self.bookings.get(candidate_id)
+
+            del self.offers[candidate_id]
+            released = []
+            for offer in offers:
+                if offer["uid"] == uid:
+                    self.bookings[candidate_id] = offer
+                else:
+                    self._free(offer)
+                    released.append(offer["uid"])
+
+            if conn is not None:
+                self.store.set_status(conn, uid, "booked")
+                self.store.delete(conn, released)
+            return self.bookings[candidate_id]
+
+    # Release everything held for a candidate
+    def release(self, candidate_id):
+        with self._shared_schedule() as conn:
+            held = self.offers.pop(candidate_id, [])
+            if candidate_id in self.bookings:
+                held.append(self.bookings.pop(candidate_id))
+            for offer in held:
+                self._free(offer)
+            if conn is not None:
+                self.store.delete(conn, [offer["uid"] for offer in held])
+
+    # Withdraw the unbooked offers of these candidates, e.g. when they leave a shortlist, so the
+    # slots can be offered again; bookings are kept. Returns the number of offers released.
+    def release_offers(self, candidate_ids):
+        with self._shared_schedule() as conn:
+            held = [offer for candidate_id in set(candidate_ids) for offer in self.offers.pop(candidate_id, [])]
+            for offer in held:
+                self._free(offer)
+            if conn is not None:
+                self.store.delete(conn, [offer["uid"] for offer in held])
+        return len(held)
+
+    def _free(self, offer):
+        self.busy[offer["interviewer"]].remove(offer["start"], offer["end"])
+        if offer["interviewer"] in self._load:
+            self._load[offer["interviewer"]] -= 1
+            self._first_free[offer["interviewer"]] = 0
+
+    # One row per offered or booked slot, ordered by time; candidate_ids limits the rows to
+    # those candidates (e.g. one shortlist out of a shared schedule)
+    def rows(self, candidate_ids=None):
+        rows = [dict(offer, status="offered") for offers in self.offers.values() for offer in offers]
+        rows += [dict(offer, status="booked") for offer in self.bookings.values()]
+        if candidate_ids is not None:
+            candidate_ids = set(candidate_ids)
+            rows = [row for row in rows if row["candidate_id"] in candidate_ids]
+        return sorted(rows, key=lambda row: (row["start"], row["interviewer"]))
+
+def _ics_escape(text):
+    return str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def _ics_time(value):
+    return value.strftime("%Y%m%dT%H%M%S")
+
+# iCalendar export of a scheduler's offered (tentative) and booked (confirmed) interviews,
+# optionally limited to some candidates
+def export_ics(scheduler, job_title="Interview", company="", candidate_ids=None):
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//HirEase//Interview Scheduler//EN", "CALSCALE:GREGORIAN"]
+    for row in scheduler.rows(candidate_ids):
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{row['uid']}@hirease",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{_ics_time(row['start'])}",
+            f"DTEND:{_ics_time(row['end'])}",
+            "SUMMARY:" + _ics_escape(f"{job_title} interview: {row['candidate']}"),
+            "DESCRIPTION:" + _ics_escape(f"Interviewer: {row['interviewer']}" + (f" ({company})" if company else "")),
+            f"STATUS:{'CONFIRMED' if row['status'] == 'booked' else 'TENTATIVE'}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
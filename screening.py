@@ -0,0 +1,1300 @@
+# Screening pipeline: the recruiting agents and their supporting caches, usable without
+# Streamlit. app.py builds the UI on top of this module; run it directly for the CLI:
+#
+#     python screening.py --jd job_description.txt --resumes resumes/ --output results.jsonl
+import google.generativeai as genai
+import os
+import sys
+import argparse
+import logging
+from dotenv import load_dotenv
+import json
+from datetime import datetime, timedelta
+from string import Template
+import random
+import re
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from pdf_extraction import extract_pdf_text, get_text_store
+from scheduling import InterviewScheduler, format_slot, get_schedule_store
+from resume_compaction import compact_resume
+from gemini_client import estimate_tokens, get_gemini_client, json_generation_config, parse_model_json
+from metrics import current_stage, get_metrics, instrument_stage
+from result_cache import ResultCache
+from storage import lazy_singleton
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Configure Gemini AI
+genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+# Gemini model used by all agents
+GEMINI_MODEL = 'gemini-1.5-flash'
+
+# Maximum number of resumes analyzed in parallel
+MAX_CONCURRENT_ANALYSES = int(os.getenv("MAX_CONCURRENT_ANALYSES", "8"))
+
+# Number of resumes packed into one analysis prompt (1 disables batching) and the
+# estimated token budget for the resumes in a single batched prompt
+ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "1"))
+ANALYSIS_BATCH_TOKEN_BUDGET = int(os.getenv("ANALYSIS_BATCH_TOKEN_BUDGET", "24000"))
+
+# Maximum number of interview emails generated in parallel
+MAX_CONCURRENT_EMAILS = int(os.getenv("MAX_CONCURRENT_EMAILS", "8"))
+
+# How interview emails are written: "llm" (the model writes the whole email), "template"
+# (filled locally, no API call) or "hybrid" (template with one model-written paragraph)
+EMAIL_RENDER_MODES = ("llm", "template", "hybrid")
+EMAIL_RENDER_MODE = os.getenv("EMAIL_RENDER_MODE", "llm").strip().lower()
+if EMAIL_RENDER_MODE not in EMAIL_RENDER_MODES:
+    raise ValueError(f"EMAIL_RENDER_MODE must be one of {', '.join(EMAIL_RENDER_MODES)} (got '{EMAIL_RENDER_MODE}')")
+
+# Local keyword pre-screen: resumes scoring below this (0-100) skip the AI analysis
+PRESCREEN_CUTOFF = int(os.getenv("PRESCREEN_CUTOFF", "0"))
+
+# On-disk cache for CV analysis results
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", os.path.join(".cache", "analysis_cache.sqlite3"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "10000"))
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+# Part of every analysis cache key, bumped whenever the resume text sent to the model changes so
+# older analyses are not reused (2: resumes are compacted before analysis; 3: compaction only
+# drops lines repeated at page edges)
+ANALYSIS_CACHE_VERSION = 3
+
+# Cache for JD summaries; in memory unless JD_CACHE_PATH points to a file
+JD_CACHE_PATH = os.getenv("JD_CACHE_PATH", ":memory:")
+JD_CACHE_MAX_ENTRIES = int(os.getenv("JD_CACHE_MAX_ENTRIES", "500"))
+JD_CACHE_TTL_SECONDS = int(os.getenv("JD_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Hashing helpers for cache keys
+def normalize_whitespace(text):
+    return " ".join(text.split())
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def hash_jd_summary(jd_summary):
+    return hash_text(json.dumps(jd_summary, sort_keys=True, ensure_ascii=False))
+
+def analysis_cache_key(cv_text, jd_summary, model_name=GEMINI_MODEL):
+    return f"{model_name}:v{ANALYSIS_CACHE_VERSION}:{hash_text(normalize_whitespace(cv_text))}:{hash_jd_summary(jd_summary)}"
+
+# Key for analyses rescored locally for a JD edit, kept apart from the model's own analyses
+def rescored_analysis_cache_key(cv_text, jd_summary, model_name=GEMINI_MODEL):
+    return analysis_cache_key(cv_text, jd_summary, model_name) + ":rescored"
+
+def jd_cache_key(jd_text, model_name=GEMINI_MODEL):
+    return f"{model_name}:{hash_text(normalize_whitespace(jd_text).casefold())}"
+
+@lazy_singleton
+def get_analysis_cache():
+    return ResultCache(ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL_SECONDS, "analysis")
+
+@lazy_singleton
+def get_jd_cache():
+    return ResultCache(JD_CACHE_PATH, JD_CACHE_MAX_ENTRIES, JD_CACHE_TTL_SECONDS, "jd_summary")
+
+# Function to extract text from PDF (page and time limits are applied in pdf_extraction)
+def input_pdf_text(uploaded_file):
+    return extract_pdf_text(uploaded_file)
+
+# Response schemas for Gemini's JSON output mode
+def _string_list_schema():
+    return {"type": "array", "items": {"type": "string"}}
+
+JD_SUMMARY_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "JobTitle": {"type": "string"},
+        "Department": {"type": "string"},
+        "Location": {"type": "string"},
+        "EmploymentType": {"type": "string"},
+        "RequiredSkills": _string_list_schema(),
+        "RequiredExperience": {"type": "string"},
+        "RequiredQualifications": _string_list_schema(),
+        "Responsibilities": _string_list_schema(),
+        "SalaryRange": {"type": "string"},
+        "PreferredSkills": _string_list_schema()
+    },
+    "required": ["JobTitle", "RequiredSkills", "RequiredQualifications", "Responsibilities", "PreferredSkills"]
+}
+
+CV_EVALUATION_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "CandidateName": {"type": "string"},
+        "ContactInfo": {"type": "string"},
+        "Skills": _string_list_schema(),
+        "Experience": _string_list_schema(),
+        "Education": _string_list_schema(),
+        "Certifications": _string_list_schema(),
+        "SkillMatch": {"type": "string"},
+        "ExperienceMatch": {"type": "string"},
+        "QualificationMatch": {"type": "string"},
+        "OverallMatch": {"type": "string"},
+        "MatchedSkills": _string_list_schema(),
+        "MissingSkills": _string_list_schema(),
+        "Strengths": _string_list_schema(),
+        "Areas_for_Improvement": _string_list_schema(),
+        "Recommendation": {"type": "string"}
+    },
+    "required": ["CandidateName", "ContactInfo", "SkillMatch", "ExperienceMatch", "QualificationMatch",
+                 "OverallMatch", "MatchedSkills", "MissingSkills", "Strengths", "Recommendation"]
+}
+
+# Batch evaluations echo the number of the resume they evaluate, so each is matched to its
+# resume by ResumeIndex rather than by position in the array
+CV_EVALUATION_BATCH_RESPONSE_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"ResumeIndex": {"type": "integer"}, **CV_EVALUATION_RESPONSE_SCHEMA["properties"]},
+        "required": ["ResumeIndex"] + CV_EVALUATION_RESPONSE_SCHEMA["required"]
+    }
+}
+
+# Job Description Summarizer Agent
+@instrument_stage("summarize_jd")
+def summarize_job_description(jd_text):
+    # Identical job descriptions (ignoring whitespace and case) skip the model
+    cache_key = jd_cache_key(jd_text)
+    cached_summary = get_jd_cache().get(cache_key)
+    if cached_summary is not None:
+        return cached_summary
+    
+    model = get_gemini_client(GEMINI_MODEL)
+    
+    prompt = f"""
+    Act as an expert job description analyzer. Review the following job description and extract 
+    key elements in a structured format.
+    
+    Job Description: {jd_text}
+    
+    Respond with a valid JSON object containing these fields:
+    {{
+      "JobTitle": "title here",
+      "Department": "department name",
+      "Location": "location",
+      "EmploymentType": "full-time/part-time/contract",
+      "RequiredSkills": ["skill1", "skill2", "..."],
+      "RequiredExperience": "X years in...",
+      "RequiredQualifications": ["qualification1", "qualification2", "..."],
+      "Responsibilities": ["responsibility1", "responsibility2", "..."],
+      "SalaryRange": "range if mentioned",
+      "PreferredSkills": ["skill1", "skill2", "..."]
+    }}
+    
+    Important: Only respond with the JSON object and nothing else. No explanations or markdown formatting.
+    """
+    
+    try:
+        response = model.generate_content(prompt, generation_config=json_generation_config(JD_SUMMARY_RESPONSE_SCHEMA))
+        
+        if response and hasattr(response, 'text'):
+            # Debug output if needed
+            logger.debug("Raw API response: %s", response.text)
+            
+            jd_summary = parse_model_json(response.text)
+            if isinstance(jd_summary, dict):
+                get_jd_cache().set(cache_key, jd_summary)
+                return jd_summary
+            
+            # If parsing fails, keep whatever fields can be read from the text
+            salvaged = salvage_json_fields(response.text)
+            if not salvaged:
+                return {"error": "Failed to parse the job description analysis"}
+            
+            jd_summary = {
+                field: [] if field_schema["type"] == "array" else "Not specified"
+                for field, field_schema in JD_SUMMARY_RESPONSE_SCHEMA["properties"].items()
+            }
+            jd_summary.update({field: value for field, value in salvaged.items() if field in jd_summary})
+            return jd_summary
+        else:
+            return {"error": "Failed to get a valid response from the API"}
+            
+    except Exception as e:
+        return {"error": f"Failed to process the JD: {str(e)}"}
+
+# Read "field": "value" and "field": [...] pairs from text that is not valid JSON,
+# in one pass with precompiled patterns
+JSON_FIELD_PATTERN = re.compile(r'"(\w+)"\s*:\s*(?:"((?:[^"\\]|\\.)*)"|\[(.*?)\])', re.DOTALL)
+JSON_LIST_ITEM_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+def salvage_json_fields(text):
+    get_metrics().inc("json_salvage_total", stage=current_stage())
+    fields = {}
+    for match in JSON_FIELD_PATTERN.finditer(text or ""):
+        field, value, items = match.groups()
+        if field in fields:
+            continue
+        fields[field] = value if items is None else JSON_LIST_ITEM_PATTERN.findall(items)
+    return fields
+
+# Extract name and email from resume text when no model output is available
+NAME_PATTERN = re.compile(r"([A-Z][a-z]+ [A-Z][a-z]+)")
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+def guess_candidate_name(cv_text):
+    name_match = NAME_PATTERN.search(cv_text[:500])
+    return name_match.group(1) if name_match else "Unknown Candidate"
+
+def find_contact_email(cv_text):
+    email_match = EMAIL_PATTERN.search(cv_text)
+    return email_match.group(0) if email_match else "Not found"
+
+# Fields every CV evaluation must contain
+CV_EVALUATION_SCHEMA = """{
+      "CandidateName": "full name",
+      "ContactInfo": "email and/or phone",
+      "Skills": ["skill1", "skill2", "..."],
+      "Experience": ["experience1", "experience2", "..."],
+      "Education": ["education1", "education2", "..."],
+      "Certifications": ["cert1", "cert2", "..."],
+      "SkillMatch": "X%",
+      "ExperienceMatch": "X%",
+      "QualificationMatch": "X%",
+      "OverallMatch": "X%",
+      "MatchedSkills": ["skill1", "skill2", "..."],
+      "MissingSkills": ["skill1", "skill2", "..."],
+      "Strengths": ["strength1", "strength2", "..."],
+      "Areas_for_Improvement": ["area1", "area2", "..."],
+      "Recommendation": "shortlist/reject/further review"
+    }"""
+
+# Format JD summary for the CV analysis prompts
+def format_jd_requirements(jd_summary):
+    required_skills = ", ".join(jd_summary.get("RequiredSkills", []))
+    preferred_skills = ", ".join(jd_summary.get("PreferredSkills", []))
+    responsibilities = ", ".join(jd_summary.get("Responsibilities", []))
+    qualifications = ", ".join(jd_summary.get("RequiredQualifications", []))
+    
+    return f"""Job Title: {jd_summary.get("JobTitle", "Not specified")}
+    Required Skills: {required_skills}
+    Preferred Skills: {preferred_skills}
+    Required Experience: {jd_summary.get("RequiredExperience", "Not specified")}
+    Required Qualifications: {qualifications}
+    Key Responsibilities: {responsibilities}"""
+
+# Estimated resume tokens before and after compaction, reported with each analysis
+def resume_token_counts(compaction):
+    return {"original": compaction["tokens_before"], "prompt": compaction["tokens_after"]}
+
+# Recruiting Agent for CV Analysis
+@instrument_stage("analyze_cv")
+def analyze_cv(cv_text, jd_summary):
+    # Repeat screenings of the same resume against the same JD are served from the cache
+    cache_key = analysis_cache_key(cv_text, jd_summary)
+    cached_analysis = get_analysis_cache().get(cache_key)
+    if cached_analysis is not None:
+        return cached_analysis
+    
+    model = get_gemini_client(GEMINI_MODEL)
+    
+    # Only the parts of the resume that matter for the evaluation go into the prompt
+    resume_text, compaction = compact_resume(cv_text)
+    
+    prompt = f"""
+    Act as a senior recruiting agent specializing in talent acquisition. Analyze this candidate's 
+    resume against the job requirements and provide a detailed evaluation.
+    
+    {format_jd_requirements(jd_summary)}
+    
+    Candidate Resume: {resume_text}
+    
+    Respond with ONLY a valid JSON object containing:
+    {CV_EVALUATION_SCHEMA}
+    
+    Important: Only provide the JSON object. No additional text, no markdown formatting.
+    """
+    
+    try:
+        response = model.generate_content(prompt, generation_config=json_generation_config(CV_EVALUATION_RESPONSE_SCHEMA))
+        
+        if response and hasattr(response, 'text'):
+            # Debug output
+            logger.debug("Raw CV analysis response: %s", response.text)
+            
+            analysis = parse_model_json(response.text)
+            if not isinstance(analysis, dict):
+                # No made-up scores: the resume is reported as failed and can be re-analyzed
+                return {"error": "Failed to parse the CV analysis response"}
+            
+            analysis["ResumeTokens"] = resume_token_counts(compaction)
+            get_analysis_cache().set(cache_key, analysis)
+            return analysis
+        else:
+            return {"error": "Failed to get a valid response from the API for CV analysis"}
+            
+    except Exception as e:
+        return {"error": f"Failed to analyze CV: {str(e)}"}
+
+# Group resumes into batches of at most batch_size that fit within token_budget.
+# Returns lists of indices into cv_texts; an oversized resume gets a batch of its own.
+def pack_resume_batches(cv_texts, batch_size=ANALYSIS_BATCH_SIZE, token_budget=ANALYSIS_BATCH_TOKEN_BUDGET):
+    batches = []
+    current = []
+    current_tokens = 0
+    
+    for i, cv_text in enumerate(cv_texts):
+        tokens = estimate_tokens(cv_text)
+        if current and (len(current) >= batch_size or current_tokens + tokens > token_budget):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+    
+    if current:
+        batches.append(current)
+    return batches
+
+# Evaluate several resumes in a single prompt. Returns a list with the evaluation dict of each
+# resume in candidate order, matched by the ResumeIndex the model echoes; resumes whose index
+# is missing or repeated get None. Returns None if the response is not a JSON array.
+@instrument_stage("analyze_cv_batch_request")
+def request_batch_analysis(cv_texts, jd_summary):
+    model = get_gemini_client(GEMINI_MODEL)
+    
+    resumes_text = "\n\n".join(
+        f"--- Resume {i + 1} ---\n{cv_text}" for i, cv_text in enumerate(cv_texts)
+    )
+    
+    prompt = f"""
+    Act as a senior recruiting agent specializing in talent acquisition. Analyze each of the 
+    following {len(cv_texts)} candidates' resumes independently against the job requirements 
+    and provide a detailed evaluation for each.
+    
+    {format_jd_requirements(jd_summary)}
+    
+    {resumes_text}
+    
+    Respond with ONLY a valid JSON array of exactly {len(cv_texts)} objects, one per resume, 
+    each containing "ResumeIndex" (the number of the resume it evaluates, 1 to {len(cv_texts)}) 
+    and:
+    {CV_EVALUATION_SCHEMA}
+    
+    Important: Only provide the JSON array. No additional text, no markdown formatting.
+    """
+    
+    try:
+        response = model.generate_content(prompt, generation_config=json_generation_config(CV_EVALUATION_BATCH_RESPONSE_SCHEMA))
+        if not response or not hasattr(response, 'text'):
+            return None
+        
+        evaluations = parse_model_json(response.text, opener="[")
+    except Exception:
+        return None
+    
+    if not isinstance(evaluations, list):
+        return None
+    
+    matched = {}
+    repeated = set()
+    for evaluation in evaluations:
+        if not isinstance(evaluation, dict):
+            continue
+        index = evaluation.pop("ResumeIndex", None)
+        if isinstance(index, bool) or not isinstance(index, int) or not 1 <= index <= len(cv_texts):
+            continue
+        if index in matched:
+            repeated.add(index)
+        matched[index] = evaluation
+    return [matched.get(i + 1) if i + 1 not in repeated else None for i in range(len(cv_texts))]
+
+# Batch mode for analyze_cv: packs uncached resumes into shared prompts so the JD block
+# is sent once per batch. Resumes without a matching evaluation in the response (or whole
+# batches that fail to parse) fall back to per-resume calls.
+@instrument_stage("analyze_cv_batch")
+def analyze_cv_batch(cv_texts, jd_summary, batch_size=ANALYSIS_BATCH_SIZE, token_budget=ANALYSIS_BATCH_TOKEN_BUDGET):
+    results = [None] * len(cv_texts)
+    
+    pending = []
+    for i, cv_text in enumerate(cv_texts):
+        cached_analysis = get_analysis_cache().get(analysis_cache_key(cv_text, jd_summary))
+        if cached_analysis is not None:
+            results[i] = cached_analysis
+        else:
+            pending.append(i)
+    
+    # Batches are packed by the size of the compacted resumes that go into the prompt
+    compacted = {i: compact_resume(cv_texts[i]) for i in pending}
+    pending_texts = [compacted[i][0] for i in pending]
+    for batch in pack_resume_batches(pending_texts, batch_size, token_budget):
+        batch_indices = [pending[j] for j in batch]
+        evaluations = None
+        if len(batch_indices) > 1:
+            evaluations = request_batch_analysis([compacted[i][0] for i in batch_indices], jd_summary)
+        
+        if evaluations is None:
+            evaluations = [None] * len(batch_indices)
+        
+        for i, evaluation in zip(batch_indices, evaluations):
+            if evaluation is None:
+                results[i] = analyze_cv(cv_texts[i], jd_summary)
+                continue
+            evaluation["ResumeTokens"] = resume_token_counts(compacted[i][1])
+            get_analysis_cache().set(analysis_cache_key(cv_texts[i], jd_summary), evaluation)
+            results[i] = evaluation
+    
+    return results
+
+# Concurrent CV analysis engine: analyzes extracted resume texts in a bounded thread pool.
+# With batch_size > 1 each task is one packed multi-resume prompt (see analyze_cv_batch).
+# Results are returned in upload order; on_progress(completed, total) and
+# on_result(index, analysis) are called from the calling thread as results arrive, so
+# they can safely update Streamlit elements.
+def analyze_resumes_concurrently(cv_texts, jd_summary, max_workers=MAX_CONCURRENT_ANALYSES, on_progress=None,
+                                 batch_size=ANALYSIS_BATCH_SIZE, on_result=None):
+    results = [None] * len(cv_texts)
+    if not cv_texts:
+        return results
+    
+    workers = max(1, min(max_workers, len(cv_texts)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if batch_size > 1:
+            futures = {
+                executor.submit(analyze_cv_batch, [cv_texts[i] for i in batch], jd_summary, batch_size): batch
+                for batch in pack_resume_batches(cv_texts, batch_size)
+            }
+        else:
+            futures = {
+                executor.submit(lambda cv_text: [analyze_cv(cv_text, jd_summary)], cv_text): [i]
+                for i, cv_text in enumerate(cv_texts)
+            }
+        
+        completed = 0
+        try:
+            for future in as_completed(futures):
+                indices = futures[future]
+                try:
+                    analyses = future.result()
+                except Exception as e:
+                    analyses = [{"error": f"Failed to analyze CV: {str(e)}"}] * len(indices)
+                
+                for index, analysis in zip(indices, analyses):
+                    results[index] = analysis
+                    if on_result:
+                        on_result(index, analysis)
+                
+                completed += len(indices)
+                if on_progress:
+                    on_progress(completed, len(cv_texts))
+        except BaseException:
+            # A failing callback stops the run; analyses not started yet are dropped
+            for future in futures:
+                future.cancel()
+            raise
+    
+    return results
+
+# Common alternative spellings used when matching JD skills against resume text
+SKILL_ALIASES = {
+    "javascript": ["js", "ecmascript"],
+    "typescript": ["ts"],
+    "node.js": ["nodejs", "node"],
+    "react": ["react.js", "reactjs"],
+    "machine learning": ["ml"],
+    "artificial intelligence": ["ai"],
+    "natural language processing": ["nlp"],
+    "deep learning": ["dl"],
+    "postgresql": ["postgres"],
+    "kubernetes": ["k8s"],
+    "amazon web services": ["aws"],
+    "aws": ["amazon web services"],
+    "google cloud platform": ["gcp", "google cloud"],
+    "gcp": ["google cloud platform", "google cloud"],
+    "microsoft azure": ["azure"],
+    "excel": ["microsoft excel", "ms excel"],
+    "power bi": ["powerbi"],
+    "ci/cd": ["continuous integration", "continuous delivery"],
+    "c#": ["csharp"],
+    "c++": ["cpp"],
+}
+
+# Words ignored when turning qualification phrases into keywords
+QUALIFICATION_STOPWORDS = {
+    "and", "or", "in", "of", "the", "a", "an", "with", "for", "on", "to", "from",
+    "degree", "related", "field", "fields", "equivalent", "experience", "years", "year",
+    "relevant", "strong", "good", "knowledge", "ability", "preferred", "plus", "similar"
+}
+QUALIFICATION_WORD_PATTERN = re.compile(r"[a-z][a-z0-9+#]*")
+
+# Canonical key of a skill: lowercase with single spaces
+def skill_key(skill):
+    return " ".join(skill.lower().split())
+
+# Skills with blank entries and case or spacing duplicates removed, keeping the first spelling
+def unique_skills(skills):
+    unique = {}
+    for skill in skills:
+        if skill_key(skill):
+            unique.setdefault(skill_key(skill), skill)
+    return list(unique.values())
+
+# Precompiled keyword index over the skills and qualifications in a JD summary.
+# All skills, aliases and qualification keywords are matched with one combined regex.
+# required_skills and preferred_skills are deduplicated, and every score uses these lists.
+class SkillIndex:
+    def __init__(self, jd_summary):
+        self.required_skills = unique_skills(jd_summary.get("RequiredSkills", []))
+        self.preferred_skills = unique_skills(jd_summary.get("PreferredSkills", []))
+        self.qualifications = []
+        
+        # Map every searchable term to the canonical keys it stands for
+        self.term_keys = {}
+        for skill in self.required_skills + self.preferred_skills:
+            key = skill_key(skill)
+            for term in [key] + SKILL_ALIASES.get(key, []):
+                self.term_keys.setdefault(term, set()).add(key)
+        
+        for qualification in jd_summary.get("RequiredQualifications", []):
+            keywords = {
+                word for word in QUALIFICATION_WORD_PATTERN.findall(qualification.lower())
+                if len(word) > 2 and word not in QUALIFICATION_STOPWORDS
+            }
+            if keywords:
+                self.qualifications.append((qualification, keywords))
+                for word in keywords:
+                    self.term_keys.setdefault(word, set()).add(word)
+        
+        self.pattern = None
+        if self.term_keys:
+            # Longest terms first so "machine learning" wins over "machine"
+            alternatives = [
+                r"\s+".join(re.escape(part) for part in term.split())
+                for term in sorted(self.term_keys, key=len, reverse=True)
+            ]
+            # Terms are lowercase and matched against lowercased text, which is much
+            # faster than re.IGNORECASE on large pools
+            self.pattern = re.compile(r"(?<![\w+#])(" + "|".join(alternatives) + r")(?![\w+#])")
+    
+    # Canonical keys of all skills and qualification keywords present in the text
+    def match(self, cv_text):
+        if self.pattern is None:
+            return set()
+        
+        found = set()
+        for term in set(self.pattern.findall(cv_text.lower())):
+            found.update(self.term_keys.get(" ".join(term.split()), ()))
+        return found
+
+# Weights of the keyword match categories in the local scores; empty categories
+# are left out of the weighting
+KEYWORD_MATCH_WEIGHTS = {"required": 0.6, "qualifications": 0.25, "preferred": 0.15}
+
+# Cheap local score (0-100) of a resume against the JD using a SkillIndex
+def prescreen_cv(cv_text, skill_index):
+    found = skill_index.match(cv_text)
+    
+    matched_required = [skill for skill in skill_index.required_skills if skill_key(skill) in found]
+    missing_required = [skill for skill in skill_index.required_skills if skill_key(skill) not in found]
+    matched_preferred = [skill for skill in skill_index.preferred_skills if skill_key(skill) in found]
+    
+    # A qualification counts as met when at least half of its keywords appear
+    qualifications_met = [
+        qualification for qualification, keywords in skill_index.qualifications
+        if len(keywords & found) * 2 >= len(keywords)
+    ]
+    
+    parts = []
+    if skill_index.required_skills:
+        parts.append((KEYWORD_MATCH_WEIGHTS["required"], len(matched_required) / len(skill_index.required_skills)))
+    if skill_index.qualifications:
+        parts.append((KEYWORD_MATCH_WEIGHTS["qualifications"], len(qualifications_met) / len(skill_index.qualifications)))
+    if skill_index.preferred_skills:
+        parts.append((KEYWORD_MATCH_WEIGHTS["preferred"], len(matched_preferred) / len(skill_index.preferred_skills)))
+    
+    total_weight = sum(weight for weight, _ in parts)
+    score = round(100 * sum(weight * ratio for weight, ratio in parts) / total_weight) if parts else 100
+    
+    return {
+        "score": score,
+        "matched_required": matched_required,
+        "missing_required": missing_required,
+        "matched_preferred": matched_preferred,
+        "qualifications_met": qualifications_met,
+        "qualification_ratio": len(qualifications_met) / len(skill_index.qualifications) if skill_index.qualifications else None,
+        "required_ratio": len(matched_required) / len(skill_index.required_skills) if skill_index.required_skills else None
+    }
+
+# Build an analysis entry for a resume rejected by the pre-screen, in the same shape as analyze_cv output
+def prescreen_rejection(cv_text, prescreen):
+    def as_percentage(ratio):
+        return f"{round(100 * ratio)}%" if ratio is not None else "N/A"
+    
+    return {
+        "CandidateName": guess_candidate_name(cv_text),
+        "ContactInfo": find_contact_email(cv_text),
+        "Skills": prescreen["matched_required"] + prescreen["matched_preferred"],
+        "Experience": [],
+        "Education": [],
+        "Certifications": [],
+        "SkillMatch": as_percentage(prescreen["required_ratio"]),
+        "ExperienceMatch": "N/A",
+        "QualificationMatch": as_percentage(prescreen["qualification_ratio"]),
+        "OverallMatch": f"{prescreen['score']}%",
+        "MatchedSkills": prescreen["matched_required"],
+        "MissingSkills": prescreen["missing_required"],
+        "Strengths": [],
+        "Areas_for_Improvement": ["Below the keyword pre-screen cutoff, not sent for AI analysis"],
+        "Recommendation": "reject",
+        "PreScreened": True
+    }
+
+# Sparse candidate x term matrix for a whole candidate pool. Columns are the JD's skills
+# followed by qualification keywords; scores() computes SkillMatch/QualificationMatch-style
+# percentages for every candidate in one vectorized pass, using the same rules as prescreen_cv.
+class SkillMatchMatrix:
+    def __init__(self, cv_texts, jd_summary):
+        self.skill_index = SkillIndex(jd_summary)
+        
+        required_keys = [skill_key(skill) for skill in self.skill_index.required_skills]
+        preferred_keys = [skill_key(skill) for skill in self.skill_index.preferred_skills]
+        keywords = sorted(set().union(*(keywords for _, keywords in self.skill_index.qualifications)))
+        self.terms = list(dict.fromkeys(required_keys + preferred_keys + keywords))
+        column = {term: i for i, term in enumerate(self.terms)}
+        
+        rows = []
+        cols = []
+        for row, cv_text in enumerate(cv_texts):
+            for key in self.skill_index.match(cv_text):
+                rows.append(row)
+                cols.append(column[key])
+        
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(cv_texts), len(self.terms))
+        )
+        self.required_columns = np.array([column[key] for key in required_keys], dtype=np.intp)
+        self.preferred_columns = np.array([column[key] for key in preferred_keys], dtype=np.intp)
+        
+        # Qualification x keyword incidence matrix and the keyword hits each qualification needs
+        q_rows = []
+        q_cols = []
+        for q, (_, keywords) in enumerate(self.skill_index.qualifications):
+            for word in keywords:
+                q_rows.append(q)
+                q_cols.append(column[word])
+        self.qualification_terms = sparse.csr_matrix(
+            (np.ones(len(q_rows), dtype=np.float32), (q_rows, q_cols)),
+            shape=(len(self.skill_index.qualifications), len(self.terms))
+        )
+        self.qualification_thresholds = np.array(
+            [(len(keywords) + 1) // 2 for _, keywords in self.skill_index.qualifications], dtype=np.float32
+        )
+        
+        # The matrix does not change, so scores and ranking are computed once
+        self._scores = None
+        self._ranking = None
+    
+    def _column_ratio(self, columns):
+        if len(columns) == 0:
+            return None
+        # float64 like prescreen_cv, so both round x.5 percentages the same way
+        return np.asarray(self.matrix[:, columns].sum(axis=1), dtype=np.float64).ravel() / len(columns)
+    
+    # Match ratios (0-1) per candidate; categories missing from the JD are None
+    def ratios(self):
+        required = self._column_ratio(self.required_columns)
+        preferred = self._column_ratio(self.preferred_columns)
+        
+        qualifications = None
+        if self.qualification_thresholds.size:
+            hits = (self.matrix @ self.qualification_terms.T).toarray()
+            qualifications = (hits >= self.qualification_thresholds).mean(axis=1)
+        
+        overall = np.zeros(self.matrix.shape[0])
+        total_weight = 0.0
+        for name, ratio in (("required", required), ("qualifications", qualifications), ("preferred", preferred)):
+            if ratio is not None:
+                overall += KEYWORD_MATCH_WEIGHTS[name] * ratio
+                total_weight += KEYWORD_MATCH_WEIGHTS[name]
+        overall = overall / total_weight if total_weight else np.ones(self.matrix.shape[0])
+        
+        return {
+            "SkillMatch": required,
+            "PreferredSkillMatch": preferred,
+            "QualificationMatch": qualifications,
+            "OverallMatch": overall
+        }
+    
+    # Integer percentages per candidate, matching the prescreen_cv score for OverallMatch
+    def scores(self):
+        if self._scores is None:
+            self._scores = {
+                name: np.rint(100 * ratio).astype(np.int32) if ratio is not None else None
+                for name, ratio in self.ratios().items()
+            }
+        return self._scores
+    
+    # Candidate row indices ordered by overall keyword match, best first
+    def ranking(self):
+        if self._ranking is None:
+            self._ranking = np.argsort(-self.ratios()["OverallMatch"], kind="stable")
+        return self._ranking
+    
+    # Ranked table of the pool for display, limited to ranks start..end; names(rows) gives the
+    # names of the given matrix rows, so only the displayed ones are looked up
+    def to_dataframe(self, names, start=0, end=None):
+        rows = self.ranking()[start:end]
+        table = pd.DataFrame({"Candidate": names(rows)})
+        for name, values in self.scores().items():
+            if values is not None:
+                table[name] = values[rows]
+        table["MatchedTerms"] = np.asarray(self.matrix[rows].sum(axis=1)).ravel().astype(np.int32)
+        return table
+
+# JD summary fields the CV analysis depends on. A change to any of these needs a new
+# analyze_cv call; PreferredSkills changes are applied to the previous analysis locally,
+# and the remaining fields (Department, Location, ...) do not affect the analysis at all.
+JD_CORE_FIELDS = ("JobTitle", "RequiredSkills", "RequiredExperience", "RequiredQualifications", "Responsibilities")
+JD_RESCORE_FIELDS = ("PreferredSkills",)
+
+# Names of the JD summary fields whose values differ between two summaries
+def changed_jd_fields(old_summary, new_summary):
+    fields = set(old_summary) | set(new_summary)
+    return {
+        field for field in fields
+        if json.dumps(old_summary.get(field), sort_keys=True) != json.dumps(new_summary.get(field), sort_keys=True)
+    }
+
+# How existing analyses carry over to an edited JD: "none" (reuse as is),
+# "rescore" (update the preferred-skill match locally) or "full" (analyze again)
+def jd_change_kind(old_summary, new_summary):
+    changed = changed_jd_fields(old_summary, new_summary)
+    if "error" in changed or changed & set(JD_CORE_FIELDS):
+        return "full"
+    if changed & set(JD_RESCORE_FIELDS):
+        return "rescore"
+    return "none"
+
+# Preferred skills of the JD found in the resume, and their share (None if the JD lists none)
+def preferred_skill_match(cv_text, jd_summary):
+    skill_index = SkillIndex({"PreferredSkills": jd_summary.get("PreferredSkills", [])})
+    matched = prescreen_cv(cv_text, skill_index)["matched_preferred"]
+    ratio = len(matched) / len(skill_index.preferred_skills) if skill_index.preferred_skills else None
+    return matched, ratio
+
+# Apply a PreferredSkills change to an existing analysis without calling the model. The
+# overall match moves by the change in preferred-skill coverage, at the weight preferred
+# skills have in the keyword scores. The result is marked Rescored.
+def rescore_analysis(cv_text, analysis, old_summary, new_summary):
+    _, old_ratio = preferred_skill_match(cv_text, old_summary)
+    matched, new_ratio = preferred_skill_match(cv_text, new_summary)
+    
+    delta = KEYWORD_MATCH_WEIGHTS["preferred"] * ((new_ratio or 0) - (old_ratio or 0))
+    overall = parse_match_percentage(analysis.get("OverallMatch", "0%")) + round(100 * delta)
+    
+    rescored = dict(analysis)
+    rescored["OverallMatch"] = f"{min(100, max(0, overall))}%"
+    rescored["PreferredSkillMatch"] = f"{round(100 * new_ratio)}%" if new_ratio is not None else "N/A"
+    rescored["MatchedPreferredSkills"] = matched
+    rescored["Rescored"] = True
+    return rescored
+
+# The cached analysis of a resume against a JD: the model's own, or else a rescored one
+def cached_or_rescored_analysis(cache, cv_text, jd_summary):
+    analysis = cache.get(analysis_cache_key(cv_text, jd_summary))
+    if analysis is None:
+        analysis = cache.get(rescored_analysis_cache_key(cv_text, jd_summary))
+    return analysis
+
+# Carry the analysis of a resume against previous_jd_summary over to jd_summary when the
+# edit allows it. Returns None when the resume has to go through analyze_cv again.
+# An edit that does not affect the analysis reuses it as is; a rescored analysis is cached
+# under rescored_analysis_cache_key, so analyze_cv never returns it as a model result.
+def reuse_previous_analysis(cv_text, jd_summary, previous_jd_summary):
+    change_kind = jd_change_kind(previous_jd_summary, jd_summary)
+    if change_kind == "full":
+        return None
+    
+    cache = get_analysis_cache()
+    analysis = cached_or_rescored_analysis(cache, cv_text, jd_summary)
+    if analysis is not None:
+        return analysis
+    
+    previous_analysis = cached_or_rescored_analysis(cache, cv_text, previous_jd_summary)
+    if previous_analysis is None:
+        return None
+    
+    if change_kind == "rescore" or previous_analysis.get("Rescored"):
+        analysis = rescore_analysis(cv_text, previous_analysis, previous_jd_summary, jd_summary)
+        cache.set(rescored_analysis_cache_key(cv_text, jd_summary), analysis)
+    else:
+        analysis = previous_analysis
+        cache.set(analysis_cache_key(cv_text, jd_summary), analysis)
+    return analysis
+
+# Screen a pool of resumes: keyword pre-screen first, then AI analysis of the resumes that
+# pass. When previous_jd_summary is given, analyses done against it are reused where the
+# JD edit allows (see jd_change_kind) and only the rest are sent to the model. Results are
+# returned in input order; a SkillMatchMatrix already built for cv_texts can be passed in.
+# Entries of None (resumes whose text could not be extracted) get an error result and are
+# neither sent to the model nor cached.
+@instrument_stage("screen_resumes")
+def screen_resumes(cv_texts, jd_summary, prescreen_cutoff=PRESCREEN_CUTOFF, on_progress=None, skill_matrix=None,
+                   on_result=None, max_workers=MAX_CONCURRENT_ANALYSES, previous_jd_summary=None,
+                   batch_size=ANALYSIS_BATCH_SIZE):
+    results = [None] * len(cv_texts)
+
+    selected = []
+    for i, cv_text in enumerate(cv_texts):
+        if cv_text is not None:
+            selected.append(i)
+            continue
+        results[i] = {"error": "No text could be extracted from the resume"}
+        if on_result:
+            on_result(i, results[i])
+    
+    if prescreen_cutoff > 0:
+        if skill_matrix is None:
+            skill_matrix = SkillMatchMatrix([cv_text or "" for cv_text in cv_texts], jd_summary)
+        overall_scores = skill_matrix.scores()["OverallMatch"]
+        
+        rejected = [i for i in selected if overall_scores[i] < prescreen_cutoff]
+        selected = [i for i in selected if overall_scores[i] >= prescreen_cutoff]
+        for i in rejected:
+            results[i] = prescreen_rejection(cv_texts[i], prescreen_cv(cv_texts[i], skill_matrix.skill_index))
+            if on_result:
+                on_result(i, results[i])
+    
+    # Analyses that carry over from the previous JD need no model call
+    if previous_jd_summary is not None:
+        remaining = []
+        for i in selected:
+            reused = reuse_previous_analysis(cv_texts[i], jd_summary, previous_jd_summary)
+            if reused is None:
+                remaining.append(i)
+                continue
+            results[i] = reused
+            if on_result:
+                on_result(i, reused)
+        selected = remaining
+    
+    skipped = len(cv_texts) - len(selected)
+    def report_progress(completed, total):
+        if on_progress:
+            on_progress(skipped + completed, len(cv_texts))
+    
+    def report_result(index, analysis):
+        results[selected[index]] = analysis
+        if on_result:
+            on_result(selected[index], analysis)
+    
+    analyze_resumes_concurrently(
+        [cv_texts[i] for i in selected], jd_summary, max_workers=max_workers,
+        on_progress=report_progress, on_result=report_result, batch_size=batch_size
+    )
+    
+    return results
+
+# Numeric value (0-100) of a match percentage such as "85%"; unparseable values count as 0
+def parse_match_percentage(value):
+    try:
+        percentage = int(float(str(value).strip().rstrip("%")))
+    except (ValueError, OverflowError):
+        return 0
+    return min(100, max(0, percentage))
+
+# Score a candidate is shortlisted by: the model's OverallMatch, or -1 for resumes rejected by
+# the keyword pre-screen, whose OverallMatch is a keyword score on a different scale
+def shortlist_score(candidate):
+    if candidate.get("PreScreened"):
+        return -1
+    return parse_match_percentage(candidate.get("OverallMatch", "0%"))
+
+# Score index over an analyzed candidate pool. OverallMatch is parsed once into a numpy array
+# sorted from highest to lowest (ties keep pool order), so the number of candidates above a
+# threshold is a binary search and the top K candidates are the first K positions. Shortlist
+# entries are only built for the candidates that are returned. Pre-screened resumes rank
+# below every analyzed candidate and never count as at or above a threshold. digests, if
+# given, holds the SHA-256 of each candidate's resume and is copied into the entries.
+class ShortlistIndex:
+    def __init__(self, candidates_analysis, digests=None):
+        self.candidates = candidates_analysis
+        self.digests = digests
+        positions = np.array(
+            [i for i, candidate in enumerate(candidates_analysis) if "error" not in candidate], dtype=np.int32
+        )
+        scores = np.array(
+            [shortlist_score(candidates_analysis[i]) for i in positions],
+            dtype=np.int16
+        )
+        
+        order = np.argsort(-scores, kind="stable")
+        self.positions = positions[order]
+        self.scores = scores[order]
+        # Ascending copy of the negated scores for np.searchsorted
+        self._descending_keys = -self.scores.astype(np.int32)
+    
+    def __len__(self):
+        return len(self.positions)
+    
+    # Number of candidates scoring at least threshold
+    def count_at_or_above(self, threshold):
+        return int(np.searchsorted(self._descending_keys, -threshold, side="right"))
+    
+    def _entry(self, rank):
+        position = self.positions[rank]
+        candidate = self.candidates[position]
+        return {
+            "name": candidate.get("CandidateName", "Unknown"),
+            "sha256": self.digests[position] if self.digests is not None else None,
+            "contact": candidate.get("ContactInfo", "Not provided"),
+            "match_percentage": int(self.scores[rank]),
+            "strengths": candidate.get("Strengths", []),
+            "missing_skills": candidate.get("MissingSkills", []),
+            "recommendation": candidate.get("Recommendation", "")
+        }
+    
+    # Shortlist entries of the k best candidates
+    def top_k(self, k):
+        return [self._entry(rank) for rank in range(min(k, len(self)))]
+    
+    # Shortlist entries of all candidates scoring at least threshold, best first
+    def shortlist(self, threshold):
+        return self.top_k(self.count_at_or_above(threshold))
+
+# Candidate Shortlisting Agent
+@instrument_stage("shortlist")
+def shortlist_candidates(candidates_analysis, threshold=70, index=None, digests=None):
+    # Entries with errors are left out; candidates are sorted by match percentage (highest first)
+    if index is None:
+        index = ShortlistIndex(candidates_analysis, digests)
+    return index.shortlist(threshold)
+
+# Key a shortlisted candidate is scheduled under: the resume's SHA-256, or the name for
+# entries made without digests
+def candidate_key(candidate):
+    return candidate.get("sha256") or candidate["name"]
+
+# Interview email template, filled locally without a model call. $fit_paragraph is the
+# only part the "hybrid" mode asks the model to write.
+INTERVIEW_EMAIL_TEMPLATE = Template("""Dear $name,
+
+Congratulations! We are pleased to inform you that you have been shortlisted for the $job_title position at $company.
+
+$fit_paragraph
+
+Please let us know which of the following time slots would work best for you:
+$slots
+
+The interview will be conducted via Zoom, and we will send you the meeting details once you confirm your preferred time slot.
+
+If you have any questions, please don't hesitate to contact us.
+
+We look forward to speaking with you soon!
+
+Best regards,
+Recruiting Team
+$company""")
+
+DEFAULT_FIT_PARAGRAPH = Template(
+    "We were impressed with your profile, in particular your $strengths, and would like to invite you "
+    "for a video interview to discuss your experience and the role in more detail."
+)
+
+# Proposed interview slots: two random times on each of the next 3 business days
+def propose_interview_slots():
+    # Generate interview dates (next business days)
+    today = datetime.now()
+    proposed_dates = []
+    
+    for i in range(1, 8):
+        next_date = today + timedelta(days=i)
+        # Skip weekends (5 = Saturday, 6 = Sunday)
+        if next_date.weekday() < 5:
+            proposed_dates.append(next_date.strftime("%A, %B %d, %Y"))
+            if len(proposed_dates) == 3:  # Get 3 business days
+                break
+    
+    # Generate interview times
+    interview_times = ["10:00 AM", "11:30 AM", "2:00 PM", "3:30 PM"]
+    return [f"{date} at {time}" for date in proposed_dates for time in random.sample(interview_times, 2)]
+
+# Fill the interview email template; fit_paragraph defaults to one built from the strengths
+def render_interview_email(candidate_name, job_title, company, proposed_slots, strengths, fit_paragraph=None):
+    if fit_paragraph is None:
+        # Keep only the short label of strengths such as "Python: 5 years of ..."
+        labels = [strength.split(':')[0].strip() for strength in strengths[:2]]
+        fit_paragraph = DEFAULT_FIT_PARAGRAPH.substitute(strengths=" and ".join(labels))
+    
+    return INTERVIEW_EMAIL_TEMPLATE.substitute(
+        name=candidate_name,
+        job_title=job_title,
+        company=company,
+        fit_paragraph=fit_paragraph,
+        slots="\n".join(f"- {slot}" for slot in proposed_slots)
+    )
+
+# Ask the model for the one personalized paragraph of a templated email.
+# Returns None when no usable paragraph comes back.
+@instrument_stage("email_fit_paragraph")
+def personalize_fit_paragraph(candidate_info, job_title, company, strengths_text):
+    model = get_gemini_client(GEMINI_MODEL)
+    
+    prompt = f"""
+    Act as a professional recruiter. Write one short paragraph (2-3 sentences) for an interview 
+    invitation to {candidate_info['name']}, shortlisted for the {job_title} position at {company}.
+    Briefly say why they are a good fit, highlighting 1-2 of these strengths: {strengths_text}
+    End by inviting them to a video interview to discuss their experience and the role.
+    
+    Respond with only the paragraph, no greeting, sign-off or formatting.
+    """
+    
+    try:
+        response = model.generate_content(prompt)
+        if response and hasattr(response, 'text') and response.text.strip():
+            return response.text.strip()
+    except Exception as e:
+        logger.warning("Failed to personalize the email for %s: %s", candidate_info['name'], e)
+    return None
+
+# Interview Scheduler Agent. mode is one of EMAIL_RENDER_MODES: "llm" has the model write the
+# whole email, "template" fills INTERVIEW_EMAIL_TEMPLATE locally with no API call, and
+# "hybrid" fills the template with a model-written fit paragraph. proposed_slots are slot
+# descriptions assigned by an InterviewScheduler; without them random slots are proposed.
+@instrument_stage("generate_email")
+def generate_interview_email(candidate_info, jd_summary, mode=EMAIL_RENDER_MODE, proposed_slots=None):
+    if not proposed_slots:
+        proposed_slots = propose_interview_slots()
+    
+    job_title = jd_summary.get("JobTitle", "the open position")
+    company = os.getenv("COMPANY_NAME", "Our Company")
+    
+    # Handle missing strengths
+    candidate_strengths = candidate_info.get('strengths', [])
+    if not candidate_strengths or len(candidate_strengths) == 0:
+        candidate_strengths = ["qualifications", "experience"]
+    
+    strengths_text = ', '.join(candidate_strengths[:3]) if len(candidate_strengths) > 0 else "qualifications"
+    
+    def email_result(email_body):
+        return {
+            "candidate_name": candidate_info['name'],
+            "candidate_email": candidate_info['contact'],
+            "email_subject": f"Interview Invitation: {job_title} position at {company}",
+            "email_body": email_body,
+            "proposed_slots": proposed_slots[:5]
+        }
+    
+    if mode == "template":
+        return email_result(render_interview_email(
+            candidate_info['name'], job_title, company, proposed_slots[:5], candidate_strengths
+        ))
+    
+    if mode == "hybrid":
+        fit_paragraph = personalize_fit_paragraph(candidate_info, job_title, company, strengths_text)
+        return email_result(render_interview_email(
+            candidate_info['name'], job_title, company, proposed_slots[:5], candidate_strengths, fit_paragraph
+        ))
+    
+    model = get_gemini_client(GEMINI_MODEL)
+    
+    prompt = f"""
+    Act as a professional recruiter. Write a personalized interview invitation email for {candidate_info['name']} 
+    who has been shortlisted for the {job_title} position at {company}.
+    
+    Candidate's strengths: {strengths_text}
+    Match rate: {candidate_info['match_percentage']}%
+    
+    Include these proposed interview slots:
+    {', '.join(proposed_slots[:5])}
+    
+    The email should:
+    1. Be professional and warm
+    2. Congratulate them on being shortlisted
+    3. Briefly mention why they're a good fit, highlighting 1-2 strengths
+    4. Propose the interview slots and ask for their preference
+    5. Mention the interview will be conducted via video call (Zoom)
+    6. Explain next steps and whom to contact with questions
+    
+    Respond with only the email text, no additional formatting or explanation.
+    """
+    
+    try:
+        response = model.generate_content(prompt)
+        
+        if response and hasattr(response, 'text'):
+            email_text = response.text.strip()
+            
+            # Debug output
+            logger.debug("Raw email response: %s", email_text)
+            
+            return email_result(email_text)
+        else:
+            # Fallback email if API fails
+            return email_result(render_interview_email(
+                candidate_info['name'], job_title, company, proposed_slots[:3], candidate_strengths
+            ))
+    except Exception as e:
+        return {"error": f"Failed to generate email: {str(e)}"}
+
+# Generate interview emails for many shortlisted candidates in parallel. on_result(index, email_data)
+# is called as each email finishes and on_progress(completed, total) after it, both on the
+# calling thread. proposed_slots optionally holds each candidate's assigned slots.
+# Returns the email dicts in candidate order.
+def generate_interview_emails_concurrently(candidates, jd_summary, max_workers=MAX_CONCURRENT_EMAILS,
+                                           on_progress=None, on_result=None, mode=EMAIL_RENDER_MODE,
+                                           proposed_slots=None):
+    results = [None] * len(candidates)
+    if not candidates:
+        return results
+    
+    if proposed_slots is None:
+        proposed_slots = [None] * len(candidates)
+    
+    workers = max(1, min(max_workers, len(candidates)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(generate_interview_email, candidate, jd_summary, mode, slots): i
+            for i, (candidate, slots) in enumerate(zip(candidates, proposed_slots))
+        }
+        
+        completed = 0
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                email_data = future.result()
+            except Exception as e:
+                email_data = {"error": f"Failed to generate email: {str(e)}"}
+            
+            results[index] = email_data
+            if on_result:
+                on_result(index, email_data)
+            
+            completed += 1
+            if on_progress:
+                on_progress(completed, len(candidates))
+    
+    return results
+
+# Function to create a mailto link for email
+def generate_mailto_link(email_data):
+    try:
+        recipient = email_data['candidate_email']
+        subject = email_data['email_subject']
+        body = email_data['email_body']
+        
+        # URL encode the subject and body for the mailto link
+        import urllib.parse
+        subject_encoded = urllib.parse.quote(subject)
+        body_encoded = urllib.parse.quote(body)
+        
+        # Create the mailto link
+        mailto_link = f"mailto:{recipient}?subject={subject_encoded}&body={body_encoded}"
+        
+        return {
+            "status": "success",
+            "mailto_link": mailto_link,
+            "message": f"Email ready to send to {recipient}"
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error generating email link: {str(e)}"
+        }
+
+# Command line entry point: screens a directory of PDF resumes against a job description
+# and streams one JSON line per resume as results complete
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen PDF resumes against a job description.")
+    parser.add_argument("--jd", required=True,
+                        help="job description text file, or a .json file with an existing JD summary")
+    parser.add_argument("--resumes", required=True, help="directory containing PDF resumes")
+    parser.add_argument("--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--threshold", type=int, default=70, help="minimum match percentage for the shortlist")
+    parser.add_argument("--prescreen-cutoff", type=int, default=PRESCREEN_CUTOFF,
+                        help="keyword pre-screen cutoff, resumes below it skip AI analysis (0 disables)")
+    parser.add_argument("--workers", type=int, default=MAX_CONCURRENT_ANALYSES,
+                        help="maximum number of concurrent analysis and email requests")
+    parser.add_argument("--emails", action="store_true", help="also generate interview emails for the shortlist")
+    parser.add_argument("--email-mode", choices=EMAIL_RENDER_MODES, default=EMAIL_RENDER_MODE,
+                        help="how emails are written: by the model, from the template, or the template with one model-written paragraph")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    
+    with open(args.jd, encoding="utf-8") as jd_file:
+        if args.jd.lower().endswith(".json"):
+            jd_summary = json.load(jd_file)
+        else:
+            jd_summary = summarize_job_description(jd_file.read())
+    if "error" in jd_summary:
+        logger.error(jd_summary["error"])
+        return 1
+    
+    pdf_paths = sorted(
+        os.path.join(args.resumes, name) for name in os.listdir(args.resumes) if name.lower().endswith(".pdf")
+    )
+    if not pdf_paths:
+        logger.error("No PDF resumes found in %s", args.resumes)
+        return 1
+    
+    logger.info("Extracting text from %d resume(s)", len(pdf_paths))
+    pdf_blobs = []
+    for path in pdf_paths:
+        with open(path, "rb") as pdf_file:
+            pdf_blobs.append(pdf_file.read())
+    text_store = get_text_store()
+    digests = text_store.add_pdfs(pdf_blobs)
+    del pdf_blobs
+    extraction_errors = text_store.get_errors(digests)
+    for path, digest in zip(pdf_paths, digests):
+        if digest in extraction_errors:
+            logger.warning("Skipping %s: %s", os.path.basename(path), extraction_errors[digest])
+    cv_texts = [text_store.get_text(digest) for digest in digests]
+    
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        def write_line(record):
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+        
+        write_line({"type": "jd_summary", "jd_summary": jd_summary})
+        
+        def write_result(index, analysis):
+            write_line({
+                "type": "analysis",
+                "file": os.path.basename(pdf_paths[index]),
+                "sha256": digests[index],
+                "analysis": analysis
+            })
+        
+        def log_progress(completed, total):
+            logger.info("Screened %d of %d resume(s)", completed, total)
+        
+        analyses = screen_resumes(
+            cv_texts, jd_summary, prescreen_cutoff=args.prescreen_cutoff,
+            on_progress=log_progress, on_result=write_result, max_workers=args.workers
+        )
+        
+        shortlisted = shortlist_candidates(analyses, args.threshold, digests=digests)
+        write_line({"type": "shortlist", "threshold": args.threshold, "candidates": shortlisted})
+        
+        if args.emails:
+            # Slots come from the shared schedule, so no two candidates here or in the app get the same time
+            scheduler = InterviewScheduler(store=get_schedule_store())
+            offers = scheduler.assign([(candidate_key(candidate), candidate["name"]) for candidate in shortlisted])
+            generate_interview_emails_concurrently(
+                shortlisted, jd_summary, max_workers=args.workers, mode=args.email_mode,
+                proposed_slots=[[format_slot(offer["start"]) for offer in offers[candidate_key(candidate)]]
+                                for candidate in shortlisted],
+                on_result=lambda index, email_data: write_line({"type": "email", "email": email_data})
+            )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
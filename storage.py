@@ -0,0 +1,34 @@
+# SQLite connections and shared instances for the caches and stores of the app
+import functools
+import os
+import sqlite3
+import threading
+
+# Create the directory a file will be written to, if the path has one
+def make_parent_dir(path):
+    if path != ":memory:" and os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+# Open a SQLite database usable from any thread (callers serialize access with their own lock),
+# creating its directory and running the given schema statements
+def open_sqlite(path, statements=(), **connect_args):
+    make_parent_dir(path)
+    conn = sqlite3.connect(path, check_same_thread=False, **connect_args)
+    for statement in statements:
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+# Decorator for a getter of a shared instance: the instance is created by the first call
+# and reused for the life of the process
+def lazy_singleton(factory):
+    lock = threading.Lock()
+    instances = []
+
+    @functools.wraps(factory)
+    def get():
+        with lock:
+            if not instances:
+                instances.append(factory())
+            return instances[0]
+    return get
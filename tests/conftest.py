@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Keep tests away from the app's on-disk caches and make the top-level modules importable
+os.environ.setdefault("ANALYSIS_CACHE_PATH", ":memory:")
+os.environ.setdefault("JD_CACHE_PATH", ":memory:")
+os.environ.setdefault("TEXT_STORE_PATH", ":memory:")
+os.environ.setdefault("CANDIDATE_STORE_PATH", ":memory:")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
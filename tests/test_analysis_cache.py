@@ -0,0 +1,54 @@
+import result_cache
+import screening
+from screening import ResultCache, analysis_cache_key
+
+JD_SUMMARY = {"JobTitle": "Data Analyst", "RequiredSkills": ["Python"]}
+
+def test_analysis_cache_key_ignores_whitespace_but_not_the_cache_version(monkeypatch):
+    key = analysis_cache_key("Jane Doe\fPython  SQL", JD_SUMMARY)
+    assert key == analysis_cache_key("Jane Doe Python\nSQL", JD_SUMMARY)
+    assert key != analysis_cache_key("Jane Doe Python SQL", {**JD_SUMMARY, "RequiredSkills": ["SQL"]})
+
+    monkeypatch.setattr(screening, "ANALYSIS_CACHE_VERSION", screening.ANALYSIS_CACHE_VERSION + 1)
+    assert analysis_cache_key("Jane Doe Python SQL", JD_SUMMARY) != key
+
+def test_result_cache_counts_hits_and_misses():
+    cache = ResultCache(":memory:")
+    assert cache.get("a") is None
+    cache.set("a", {"OverallMatch": "80%"})
+    assert cache.get("a") == {"OverallMatch": "80%"}
+    assert cache.get("a") == {"OverallMatch": "80%"}
+
+    assert cache.stats() == {"hits": 2, "misses": 1, "hit_rate": 2 / 3, "entries": 1}
+
+def test_result_cache_evicts_least_recently_used(monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(result_cache.time, "time", lambda: next(clock))
+    cache = ResultCache(":memory:", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["entries"] == 2
+
+def test_result_cache_expires_entries_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    cache = ResultCache(":memory:", ttl_seconds=60)
+    cache.set("a", 1)
+
+    now[0] += 30
+    assert cache.get("a") == 1
+    # Reading an entry does not extend its lifetime
+    now[0] += 31
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+def test_result_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "analysis_cache.sqlite3")
+    ResultCache(path).set("a", {"OverallMatch": "80%"})
+    assert ResultCache(path).get("a") == {"OverallMatch": "80%"}
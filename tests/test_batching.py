@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import screening
+from screening import ResultCache, analyze_cv_batch, pack_resume_batches
+
+JD_SUMMARY = {"JobTitle": "Data Analyst", "RequiredSkills": ["Python"]}
+RESUMES = ["Ann Lee, Python analyst", "Bo Chen, SQL developer", "Cy Diaz, data engineer"]
+
+# A resume estimated at the given number of tokens
+def resume(tokens):
+    return "x" * (4 * tokens - 4)
+
+def test_batches_are_capped_by_count():
+    assert pack_resume_batches([resume(10)] * 7, batch_size=3, token_budget=1000) == [[0, 1, 2], [3, 4, 5], [6]]
+
+def test_batches_are_capped_by_token_budget():
+    texts = [resume(40), resume(50), resume(20), resume(90), resume(10)]
+    assert pack_resume_batches(texts, batch_size=10, token_budget=100) == [[0, 1], [2], [3, 4]]
+
+def test_oversized_resume_gets_its_own_batch():
+    texts = [resume(10), resume(500), resume(10)]
+    assert pack_resume_batches(texts, batch_size=5, token_budget=100) == [[0], [1], [2]]
+
+def test_every_resume_is_packed_once_in_order():
+    texts = [resume(n) for n in (5, 80, 30, 30, 45, 1, 99, 60)]
+    batches = pack_resume_batches(texts, batch_size=3, token_budget=100)
+    assert [i for batch in batches for i in batch] == list(range(len(texts)))
+    assert all(len(batch) <= 3 for batch in batches)
+
+def test_no_resumes_gives_no_batches():
+    assert pack_resume_batches([], batch_size=5, token_budget=100) == []
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+# Answers batch prompts with the evaluations a test gives and single-resume prompts with an
+# evaluation named after the resume's first word
+class FakeModel:
+    def __init__(self, batch_evaluations):
+        self.batch_evaluations = batch_evaluations
+        self.single_calls = []
+
+    def generate_content(self, prompt, generation_config=None):
+        if "JSON array" in prompt:
+            return FakeResponse(json.dumps(self.batch_evaluations))
+        name = prompt.split("Candidate Resume:")[1].split()[0].rstrip(",")
+        self.single_calls.append(name)
+        return FakeResponse(json.dumps({"CandidateName": name, "OverallMatch": "50%"}))
+
+@pytest.fixture
+def model(monkeypatch):
+    cache = ResultCache(":memory:")
+    monkeypatch.setattr(screening, "get_analysis_cache", lambda: cache)
+    def install(batch_evaluations):
+        fake = FakeModel(batch_evaluations)
+        monkeypatch.setattr(screening, "get_gemini_client", lambda model_name: fake)
+        return fake
+    return install
+
+def evaluation(index, name):
+    return {"ResumeIndex": index, "CandidateName": name, "OverallMatch": "90%"}
+
+def test_batch_evaluations_are_matched_by_resume_index(model):
+    fake = model([evaluation(3, "Cy"), evaluation(1, "Ann"), evaluation(2, "Bo")])
+    results = analyze_cv_batch(RESUMES, JD_SUMMARY, batch_size=3)
+
+    assert [result["CandidateName"] for result in results] == ["Ann", "Bo", "Cy"]
+    assert all("ResumeIndex" not in result for result in results)
+    assert fake.single_calls == []
+
+def test_resumes_missing_from_a_short_response_are_analyzed_alone(model):
+    fake = model([evaluation(1, "Ann"), evaluation(3, "Cy")])
+    results = analyze_cv_batch(RESUMES, JD_SUMMARY, batch_size=3)
+
+    assert [result["CandidateName"] for result in results] == ["Ann", "Bo", "Cy"]
+    assert [result["OverallMatch"] for result in results] == ["90%", "50%", "90%"]
+    assert fake.single_calls == ["Bo"]
+
+def test_repeated_or_unindexed_evaluations_are_not_trusted(model):
+    unindexed = {"CandidateName": "Cy", "OverallMatch": "90%"}
+    fake = model([evaluation(1, "Ann"), evaluation(2, "Bo"), evaluation(2, "Cy"), unindexed, evaluation(7, "Dee")])
+    results = analyze_cv_batch(RESUMES, JD_SUMMARY, batch_size=3)
+
+    assert [result["CandidateName"] for result in results] == ["Ann", "Bo", "Cy"]
+    assert fake.single_calls == ["Bo", "Cy"]
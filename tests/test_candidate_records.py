@@ -0,0 +1,80 @@
+import pytest
+
+import candidate_records
+import result_cache
+from candidate_records import CandidateDetailStore, CandidateRecord
+
+ANALYSIS = {
+    "CandidateName": "Ada Lovelace",
+    "ContactInfo": "ada@example.com",
+    "OverallMatch": "88%",
+    "MatchedSkills": ["Python", "SQL"],
+    "MissingSkills": [],
+    "Experience": ["Analyst at Initech"],
+    "Strengths": ["Python: five years of analytics"],
+}
+
+def test_record_answers_summary_and_detail_fields():
+    record = CandidateRecord(ANALYSIS)
+
+    assert record.get("CandidateName") == "Ada Lovelace"
+    assert record["MatchedSkills"] == ["Python", "SQL"]
+    assert record["Experience"] == ["Analyst at Initech"]
+    assert "Strengths" in record
+    assert "Recommendation" not in record
+    assert record.get("Recommendation", "none") == "none"
+    with pytest.raises(KeyError):
+        record["Recommendation"]
+    assert record.to_dict() == ANALYSIS
+
+def test_identical_details_are_stored_once():
+    store = CandidateDetailStore(":memory:")
+    assert store.put({"Experience": ["a"]}) == store.put({"Experience": ["a"]})
+    assert store.put({"Experience": ["a"]}) != store.put({"Experience": ["b"]})
+
+def test_least_recently_used_details_are_evicted_beyond_the_limit():
+    store = CandidateDetailStore(":memory:", max_entries=2, ttl_seconds=None)
+    first = store.put({"Experience": ["first"]})
+    second = store.put({"Experience": ["second"]})
+    assert store.get(first) == {"Experience": ["first"]}
+
+    third = store.put({"Experience": ["third"]})
+    assert store.get(second) is None
+    assert store.get(first) == {"Experience": ["first"]}
+    assert store.get(third) == {"Experience": ["third"]}
+
+def test_details_unused_for_the_ttl_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    store = CandidateDetailStore(":memory:", max_entries=100, ttl_seconds=60)
+    old = store.put({"Experience": ["old"]})
+    used = store.put({"Experience": ["used"]})
+
+    now[0] += 50
+    assert store.get(used) == {"Experience": ["used"]}
+    now[0] += 20
+    assert store.get(old) is None
+    assert store.get(used) == {"Experience": ["used"]}
+
+    # Storing again revives details for every session holding the same key
+    now[0] += 100
+    assert store.put({"Experience": ["used"]}) == used
+    assert store.get(used) == {"Experience": ["used"]}
+
+def test_eviction_runs_once_per_hundredth_of_the_limit(monkeypatch):
+    store = CandidateDetailStore(":memory:", max_entries=500, ttl_seconds=None)
+    evictions = []
+    monkeypatch.setattr(store, "_evict", evictions.append)
+    for i in range(12):
+        store.put({"Experience": [str(i)]})
+    assert len(evictions) == 2
+
+def test_record_with_evicted_details_has_no_full_analysis(monkeypatch):
+    store = CandidateDetailStore(":memory:", max_entries=1, ttl_seconds=None)
+    monkeypatch.setattr(candidate_records, "get_candidate_store", lambda: store)
+    record = CandidateRecord(ANALYSIS)
+    CandidateRecord(dict(ANALYSIS, Experience=["Engineer at Hooli"]))
+
+    assert record.to_dict() is None
+    assert record["OverallMatch"] == "88%"
+    assert record.get("Experience", []) == []
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_screening(mode):
+    env = dict(os.environ, EMAIL_RENDER_MODE=mode)
+    return subprocess.run([sys.executable, "-c", "import screening; print(screening.EMAIL_RENDER_MODE)"],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+
+@pytest.mark.parametrize("mode", ["template", " Hybrid "])
+def test_known_modes_are_accepted(mode):
+    result = import_screening(mode)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == mode.strip().lower()
+
+def test_unknown_mode_is_rejected_at_import():
+    result = import_screening("templte")
+    assert result.returncode != 0
+    assert "EMAIL_RENDER_MODE must be one of llm, template, hybrid (got 'templte')" in result.stderr
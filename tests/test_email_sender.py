@@ -0,0 +1,143 @@
+import smtplib
+import time
+
+import pytest
+
+import email_sender
+from email_sender import SMTPSender
+from gemini_client import TokenBucket
+
+# In-process stand-in for an SMTP server: accepts every message except for "flaky"
+# recipients (451 on the first try) and "bad" recipients (550), and counts connections,
+# open connections and delivered messages. fail_at makes one step of connecting fail.
+class FakeServer:
+    def __init__(self):
+        self.connections = 0
+        self.open_connections = 0
+        self.delivered = []
+        self.deferred = set()
+        self.fail_at = None
+        self.drop_next_send = False
+
+    def connect(self, host, port, timeout=None):
+        return FakeSMTP(self)
+
+class FakeSMTP:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+        server.connections += 1
+        server.open_connections += 1
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        if self.server.fail_at == "starttls":
+            raise smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server.")
+
+    def login(self, username, password):
+        if self.server.fail_at == "login":
+            raise smtplib.SMTPAuthenticationError(535, b"Authentication failed")
+
+    def send_message(self, message):
+        if self.server.drop_next_send:
+            self.server.drop_next_send = False
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        recipient = message["To"]
+        if recipient.startswith("flaky") and recipient not in self.server.deferred:
+            self.server.deferred.add(recipient)
+            raise smtplib.SMTPDataError(451, b"Try again later")
+        if recipient.startswith("bad"):
+            raise smtplib.SMTPDataError(550, b"No such user")
+        self.server.delivered.append(recipient)
+
+    def quit(self):
+        self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.server.open_connections -= 1
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeServer()
+    monkeypatch.setattr(email_sender.smtplib, "SMTP", server.connect)
+    return server
+
+@pytest.fixture
+def sender(server, monkeypatch):
+    monkeypatch.setattr(email_sender, "SMTP_BACKOFF_BASE_SECONDS", 0.01)
+    sender = SMTPSender(host="127.0.0.1", port=1025, username=None, password=None, use_tls=False,
+                        sender="jobs@example.com", sends_per_minute=6000, max_retries=2, timeout=5)
+    yield sender
+    sender.close()
+
+def email_to(address):
+    return {"email_subject": "Interview", "email_body": "Hello", "candidate_email": f"Name | {address}"}
+
+def test_batch_is_sent_over_one_connection(server, sender):
+    addresses = [f"candidate{i}@example.com" for i in range(5)]
+    records = sender.send_batch([email_to(address) for address in addresses])
+
+    assert [record["status"] for record in records] == ["sent"] * 5
+    assert [record["recipient"] for record in records] == addresses
+    assert server.delivered == addresses
+    assert server.connections == 1
+    sender.close()
+    assert server.open_connections == 0
+
+def test_sends_are_throttled(server, sender):
+    sender.limiter = TokenBucket(1, 10.0)
+
+    started = time.monotonic()
+    sender.send_batch([email_to(f"candidate{i}@example.com") for i in range(4)])
+    assert time.monotonic() - started >= 0.25
+    assert len(server.delivered) == 4
+
+def test_temporary_rejection_is_retried(server, sender):
+    record = sender.send(email_to("flaky@example.com"))
+
+    assert record["status"] == "sent"
+    assert record["attempts"] == 2
+    assert server.delivered == ["flaky@example.com"]
+    assert server.connections == 1
+
+def test_permanent_rejection_fails_without_retry(server, sender):
+    records = sender.send_batch([email_to("bad@example.com"), email_to("good@example.com")])
+
+    assert records[0]["status"] == "failed"
+    assert records[0]["attempts"] == 1
+    assert "550" in records[0]["error"]
+    # The connection stays usable for the rest of the batch
+    assert records[1]["status"] == "sent"
+    assert server.delivered == ["good@example.com"]
+    assert server.connections == 1
+
+def test_dropped_connection_is_reopened(server, sender):
+    sender.send(email_to("first@example.com"))
+    server.drop_next_send = True
+    record = sender.send(email_to("second@example.com"))
+
+    assert record["status"] == "sent" and record["attempts"] == 2
+    assert server.connections == 2
+    assert server.open_connections == 1
+
+def test_missing_address_is_not_sent(server, sender):
+    record = sender.send({"email_subject": "Interview", "email_body": "Hello", "candidate_email": "Not provided"})
+
+    assert record["status"] == "failed"
+    assert record["attempts"] == 0
+    assert server.connections == 0
+
+@pytest.mark.parametrize("step", ["starttls", "login"])
+def test_failed_handshake_closes_the_connection(server, sender, step):
+    sender.use_tls = True
+    sender.username, sender.password = "jobs@example.com", "secret"
+    server.fail_at = step
+
+    record = sender.send(email_to("candidate@example.com"))
+    assert record["status"] == "failed"
+    assert server.delivered == []
+    assert server.open_connections == 0
@@ -0,0 +1,128 @@
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+import gemini_client
+from gemini_client import GeminiClient, TokenBucket
+
+# Stands in for the time module in gemini_client: sleeping advances the clock at once
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+# Fails with the given errors in turn, then answers every call
+class FakeModel:
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "response"
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(gemini_client, "time", clock)
+    return clock
+
+# Backoff always takes the longest delay jitter allows, and records the bounds it was given
+@pytest.fixture
+def jitter(monkeypatch):
+    bounds = []
+    class FullDelay:
+        def uniform(self, low, high):
+            bounds.append((low, high))
+            return high
+    monkeypatch.setattr(gemini_client, "random", FullDelay())
+    monkeypatch.setattr(gemini_client, "GEMINI_BACKOFF_BASE_SECONDS", 1.0)
+    monkeypatch.setattr(gemini_client, "GEMINI_BACKOFF_MAX_SECONDS", 3.0)
+    return bounds
+
+def client_for(monkeypatch, model, **options):
+    monkeypatch.setattr(gemini_client, "_model_factory", lambda model_name: model)
+    return GeminiClient("fake-model", **options)
+
+def test_token_bucket_waits_for_refill(clock):
+    bucket = TokenBucket(capacity=2, rate=0.5)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [2.0]
+
+    # A request larger than the bucket waits for a full bucket
+    bucket.acquire(10)
+    assert clock.sleeps == [2.0, 4.0]
+
+def test_token_bucket_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(capacity=2, rate=1)
+    clock.now += 60
+    bucket.acquire(2)
+    bucket.acquire(1)
+    assert clock.sleeps == [1.0]
+
+def test_rate_limited_and_server_errors_are_retried_with_backoff(monkeypatch, clock, jitter):
+    model = FakeModel([
+        google_exceptions.ResourceExhausted("quota"),
+        google_exceptions.TooManyRequests("slow down"),
+        google_exceptions.ServiceUnavailable("unavailable"),
+        google_exceptions.InternalServerError("boom"),
+    ])
+    client = client_for(monkeypatch, model, requests_per_minute=600, max_retries=5)
+
+    assert client.generate_content("prompt") == "response"
+    assert model.calls == 5
+    # Exponential delays with full jitter, capped at GEMINI_BACKOFF_MAX_SECONDS
+    assert jitter == [(0, 1.0), (0, 2.0), (0, 3.0), (0, 3.0)]
+    assert clock.sleeps == [1.0, 2.0, 3.0, 3.0]
+
+def test_retries_stop_after_max_retries(monkeypatch, clock, jitter):
+    model = FakeModel([google_exceptions.ServiceUnavailable("unavailable")] * 5)
+    client = client_for(monkeypatch, model, requests_per_minute=600, max_retries=2)
+
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        client.generate_content("prompt")
+    assert model.calls == 3
+    assert clock.sleeps == [1.0, 2.0]
+
+def test_other_errors_are_not_retried(monkeypatch, clock, jitter):
+    model = FakeModel([google_exceptions.InvalidArgument("bad request")])
+    client = client_for(monkeypatch, model, max_retries=5)
+
+    with pytest.raises(google_exceptions.InvalidArgument):
+        client.generate_content("prompt")
+    assert model.calls == 1
+    assert clock.sleeps == []
+
+def test_requests_are_rate_limited(monkeypatch, clock):
+    model = FakeModel()
+    client = client_for(monkeypatch, model, requests_per_minute=2)
+
+    for _ in range(3):
+        client.generate_content("prompt")
+    # Two requests fit the bucket; the third waits for one request's worth of refill
+    assert clock.sleeps == [30.0]
+
+def test_prompt_tokens_are_rate_limited(monkeypatch, clock):
+    monkeypatch.setattr(gemini_client, "GEMINI_RESPONSE_TOKEN_ESTIMATE", 0)
+    model = FakeModel()
+    client = client_for(monkeypatch, model, requests_per_minute=600, tokens_per_minute=600)
+
+    client.generate_content("x" * 1596)  # 400 tokens
+    client.generate_content("x" * 1596)
+    # 200 tokens left; the other 200 refill at 10 per second
+    assert clock.sleeps == [20.0]
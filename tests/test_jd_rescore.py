@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+import screening
+from screening import (
+    ResultCache,
+    analysis_cache_key,
+    analyze_cv,
+    jd_change_kind,
+    rescore_analysis,
+    rescored_analysis_cache_key,
+    reuse_previous_analysis,
+)
+
+JD_V1 = {"JobTitle": "Data Analyst", "RequiredSkills": ["Python"], "PreferredSkills": ["AWS", "Docker"],
+         "Location": "Remote"}
+JD_V2 = dict(JD_V1, PreferredSkills=["AWS", "Docker", "Kubernetes", "Terraform"])
+JD_V3 = dict(JD_V2, PreferredSkills=["AWS"])
+CV = "Python developer with AWS experience"
+ANALYSIS = {"CandidateName": "Ada", "OverallMatch": "70%"}
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        return FakeResponse(json.dumps({"CandidateName": "Ada", "OverallMatch": "75%"}))
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResultCache(":memory:")
+    monkeypatch.setattr(screening, "get_analysis_cache", lambda: cache)
+    return cache
+
+def test_jd_change_kind():
+    assert jd_change_kind(JD_V1, dict(JD_V1)) == "none"
+    assert jd_change_kind(JD_V1, dict(JD_V1, Location="Berlin")) == "none"
+    assert jd_change_kind(JD_V1, JD_V2) == "rescore"
+    assert jd_change_kind(JD_V1, dict(JD_V2, RequiredSkills=["Python", "SQL"])) == "full"
+    assert jd_change_kind(JD_V1, {"error": "Failed to summarize"}) == "full"
+
+def test_rescore_moves_the_overall_match_by_preferred_coverage():
+    # Preferred coverage drops from 1 of 2 to 1 of 4: 0.15 * -0.25 is -3.75 points
+    rescored = rescore_analysis(CV, ANALYSIS, JD_V1, JD_V2)
+    assert rescored["OverallMatch"] == "66%"
+    assert rescored["PreferredSkillMatch"] == "25%"
+    assert rescored["MatchedPreferredSkills"] == ["AWS"]
+    assert rescored["Rescored"] is True
+    assert ANALYSIS == {"CandidateName": "Ada", "OverallMatch": "70%"}
+
+    assert rescore_analysis(CV, dict(ANALYSIS, OverallMatch="2%"), JD_V1, JD_V2)["OverallMatch"] == "0%"
+    assert rescore_analysis(CV, ANALYSIS, JD_V1, dict(JD_V1, PreferredSkills=[]))["PreferredSkillMatch"] == "N/A"
+
+def test_rescored_analyses_are_not_cached_as_model_results(cache, monkeypatch):
+    cache.set(analysis_cache_key(CV, JD_V1), ANALYSIS)
+
+    rescored = reuse_previous_analysis(CV, JD_V2, JD_V1)
+    assert rescored["Rescored"] is True
+    assert cache.get(analysis_cache_key(CV, JD_V2)) is None
+    assert cache.get(rescored_analysis_cache_key(CV, JD_V2)) == rescored
+    assert reuse_previous_analysis(CV, JD_V2, JD_V1) == rescored
+
+    # Asking the model for JD_V2 analyzes the resume instead of returning the rescored result
+    model = FakeModel()
+    monkeypatch.setattr(screening, "get_gemini_client", lambda model_name: model)
+    assert analyze_cv(CV, JD_V2)["OverallMatch"] == "75%"
+    assert model.calls == 1
+
+def test_rescoring_chains_across_edits(cache):
+    cache.set(analysis_cache_key(CV, JD_V1), ANALYSIS)
+    reuse_previous_analysis(CV, JD_V2, JD_V1)
+
+    # A further PreferredSkills edit starts from the rescored analysis: coverage 1 of 4 to 1 of 1
+    rescored = reuse_previous_analysis(CV, JD_V3, JD_V2)
+    assert rescored["OverallMatch"] == "77%"
+    assert cache.get(analysis_cache_key(CV, JD_V3)) is None
+
+def test_unaffected_edit_reuses_the_analysis_as_is(cache):
+    cache.set(analysis_cache_key(CV, JD_V1), ANALYSIS)
+    edited = dict(JD_V1, Location="Berlin")
+    assert reuse_previous_analysis(CV, edited, JD_V1) == ANALYSIS
+    assert cache.get(analysis_cache_key(CV, edited)) == ANALYSIS
+    assert reuse_previous_analysis(CV, dict(JD_V1, RequiredSkills=["SQL"]), JD_V1) is None
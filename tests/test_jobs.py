@@ -0,0 +1,129 @@
+import sqlite3
+import time
+
+import pytest
+
+import jobs
+from jobs import JobStore, run_job
+from pdf_extraction import IMAGE_PDF_MESSAGE, TextStore
+
+JD_SUMMARY = {"JobTitle": "Data Analyst", "RequiredSkills": ["Python"]}
+RESUMES = [{"name": f"cv{i}.pdf", "sha256": f"digest{i}"} for i in range(3)]
+
+@pytest.fixture
+def text_store(monkeypatch):
+    store = TextStore(":memory:")
+    for resume in RESUMES:
+        store.put(resume["sha256"], {"text": f"{resume['name']} Python", "page_count": 1, "extraction_seconds": 0.1,
+                                        "error": None})
+    monkeypatch.setattr(jobs, "get_text_store", lambda: store)
+    return store
+
+@pytest.fixture
+def screened(monkeypatch):
+    calls = []
+    def fake_screen_resumes(cv_texts, jd_summary, prescreen_cutoff=0, on_result=None, previous_jd_summary=None):
+        calls.append(list(cv_texts))
+        for i, cv_text in enumerate(cv_texts):
+            on_result(i, {"CandidateName": cv_text.split()[0], "OverallMatch": "80%"})
+    monkeypatch.setattr(jobs, "screen_resumes", fake_screen_resumes)
+    return calls
+
+def test_stale_job_resumes_with_only_unfinished_items(tmp_path, monkeypatch, text_store, screened):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job(JD_SUMMARY, RESUMES, prescreen_cutoff=0)
+
+    # Worker A claims the job, saves one result and dies
+    job = store.claim_next_job("worker-a")
+    assert job["id"] == job_id and job["status"] == "running"
+    store.record_result(job_id, 0, {"CandidateName": "cv0.pdf", "OverallMatch": "75%"})
+    assert store.claim_next_job("worker-b") is None
+
+    # Once the heartbeat is stale, worker B takes over (from a fresh connection, as another process would)
+    monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", 0)
+    time.sleep(0.01)
+    restarted = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job = restarted.claim_next_job("worker-b")
+    assert job["worker"] == "worker-b" and job["completed"] == 1
+
+    run_job(restarted, job)
+    assert screened == [["cv1.pdf Python", "cv2.pdf Python"]]
+
+    job = restarted.get_job(job_id)
+    assert job["status"] == "completed" and job["completed"] == 3
+    results = [item["result"] for item in restarted.get_items(job_id)]
+    assert [result["OverallMatch"] for result in results] == ["75%", "80%", "80%"]
+
+def test_recording_a_result_twice_counts_once(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job(JD_SUMMARY, RESUMES)
+    store.record_result(job_id, 1, {"OverallMatch": "50%"})
+    store.record_result(job_id, 1, {"OverallMatch": "60%"})
+    assert store.get_job(job_id)["completed"] == 1
+    assert store.get_items(job_id)[1]["result"] == {"OverallMatch": "50%"}
+
+def test_store_errors_fail_the_job_instead_of_the_worker(tmp_path, monkeypatch, text_store, screened):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job(JD_SUMMARY, RESUMES)
+    job = store.claim_next_job("worker-a")
+
+    def broken_get_items(job_id):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(store, "get_items", broken_get_items)
+
+    run_job(store, job)
+    job = store.get_job(job_id)
+    assert job["status"] == "failed" and "database is locked" in job["error"]
+    assert screened == []
+
+def test_resumes_without_text_are_marked_failed(tmp_path, text_store, screened):
+    text_store.put("digest1", {"text": "", "page_count": 1, "extraction_seconds": 0.1, "error": IMAGE_PDF_MESSAGE})
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job(JD_SUMMARY, RESUMES + [{"name": "gone.pdf", "sha256": "unknown"}])
+
+    run_job(store, store.claim_next_job("worker-a"))
+    assert screened == [["cv0.pdf Python", "cv2.pdf Python"]]
+    items = store.get_items(job_id)
+    assert [item["status"] for item in items] == ["done", "failed", "done", "failed"]
+    assert items[1]["result"] == {"error": IMAGE_PDF_MESSAGE}
+    assert "no longer available" in items[3]["result"]["error"]
+    assert store.get_job(job_id)["completed"] == 4
+
+class FlakyHeartbeatStore(JobStore):
+    def __init__(self, path, failures):
+        super().__init__(path)
+        self.failures = failures
+        self.heartbeats = 0
+
+    def heartbeat(self, job_id):
+        self.heartbeats += 1
+        if self.heartbeats <= self.failures:
+            raise sqlite3.OperationalError("database is locked")
+        super().heartbeat(job_id)
+
+def slow_screen_resumes(cv_texts, jd_summary, prescreen_cutoff=0, on_result=None, previous_jd_summary=None):
+    for i, cv_text in enumerate(cv_texts):
+        time.sleep(0.1)
+        on_result(i, {"CandidateName": cv_text.split()[0], "OverallMatch": "80%"})
+
+def test_failed_heartbeats_are_retried(tmp_path, monkeypatch, text_store):
+    monkeypatch.setattr(jobs, "screen_resumes", slow_screen_resumes)
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.01)
+    store = FlakyHeartbeatStore(str(tmp_path / "jobs.sqlite3"), failures=3)
+    job_id = store.create_job(JD_SUMMARY, RESUMES)
+
+    run_job(store, store.claim_next_job("worker-a"))
+    assert store.heartbeats > 3
+    assert store.get_job(job_id)["status"] == "completed"
+
+def test_worker_stops_when_heartbeats_keep_failing(tmp_path, monkeypatch, text_store):
+    monkeypatch.setattr(jobs, "screen_resumes", slow_screen_resumes)
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.01)
+    monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", 0.05)
+    store = FlakyHeartbeatStore(str(tmp_path / "jobs.sqlite3"), failures=10 ** 6)
+    job_id = store.create_job(JD_SUMMARY, RESUMES)
+
+    run_job(store, store.claim_next_job("worker-a"))
+    # Left running for the worker that takes it over, with nothing saved after the abandon
+    job = store.get_job(job_id)
+    assert job["status"] == "running" and job["completed"] < 3
@@ -0,0 +1,30 @@
+import pytest
+
+from gemini_client import _parse_model_json, parse_model_json
+
+@pytest.mark.parametrize("text, expected, outcome", [
+    ('{"OverallMatch": "80%"}', {"OverallMatch": "80%"}, "direct"),
+    ('```json\n{"OverallMatch": "80%"}\n```', {"OverallMatch": "80%"}, "direct"),
+    ('Here is the analysis:\n{"OverallMatch": "80%"}\nLet me know!', {"OverallMatch": "80%"}, "extracted"),
+    ('{"Skills": ["Python", "SQL",], "OverallMatch": "80%",}', {"Skills": ["Python", "SQL"], "OverallMatch": "80%"}, "repaired"),
+    ('{“OverallMatch”: “80%”}', {"OverallMatch": "80%"}, "repaired"),
+    ('{"Note": "braces } and [ in a string"}', {"Note": "braces } and [ in a string"}, "direct"),
+])
+def test_parse_model_json_recovers_objects(text, expected, outcome):
+    assert _parse_model_json(text, "{") == (expected, outcome)
+
+def test_truncated_response_is_closed():
+    value = parse_model_json('{"CandidateName": "Ada", "Strengths": ["Python", "Leader')
+    assert value == {"CandidateName": "Ada", "Strengths": ["Python", "Leader"]}
+
+def test_truncated_response_drops_a_dangling_key():
+    assert parse_model_json('{"CandidateName": "Ada", "Experience":') == {"CandidateName": "Ada"}
+
+def test_arrays_are_parsed_with_the_array_opener():
+    text = 'Results: [{"index": 0}, {"index": 1}] done'
+    assert parse_model_json(text, opener="[") == [{"index": 0}, {"index": 1}]
+    assert parse_model_json(text) == {"index": 0}
+
+@pytest.mark.parametrize("text", [None, "", "No JSON here", "{not json at all"])
+def test_unusable_output_returns_none(text):
+    assert parse_model_json(text) is None
@@ -0,0 +1,116 @@
+import multiprocessing
+import sqlite3
+import time
+import zlib
+
+import pdf_extraction
+from pdf_extraction import (
+    EXTRACTION_TIMEOUT_ERROR,
+    IMAGE_PDF_MESSAGE,
+    TEXT_UNAVAILABLE_ERROR,
+    TextStore,
+    extract_pdfs_parallel,
+    pdf_digest,
+)
+
+def make_pdf(pages):
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [" + " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))) + f"] /Count {len(pages)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 10 Tf 50 750 Td ({text}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, body in enumerate(objects):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+# Stands in for a file stuck inside one page, which the per-page deadline cannot stop
+def extract_or_hang(data, max_pages, timeout):
+    if data == b"hang":
+        time.sleep(60)
+    return {"text": data.decode(), "page_count": 1, "extraction_seconds": 0.0, "error": None}
+
+def test_parallel_extraction_keeps_input_order_and_pages():
+    blobs = [make_pdf([f"Resume {i} page one", f"Resume {i} page two"]) for i in range(3)]
+    records = extract_pdfs_parallel(blobs, max_workers=2, timeout=10)
+
+    for i, record in enumerate(records):
+        assert record["page_count"] == 2
+        assert record["text"].split("\f") == [f"Resume {i} page one", f"Resume {i} page two"]
+
+def test_stuck_file_times_out_and_its_worker_is_killed(monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "_extract_pdf_bytes", extract_or_hang)
+    monkeypatch.setattr(pdf_extraction, "PDF_EXTRACTION_KILL_GRACE_SECONDS", 0.2)
+    blobs = [b"hang", b"one", b"two", b"three", b"four"]
+
+    started = time.monotonic()
+    records = extract_pdfs_parallel(blobs, max_workers=2, timeout=0.5)
+    elapsed = time.monotonic() - started
+
+    assert records[0]["error"] == EXTRACTION_TIMEOUT_ERROR and records[0]["text"] == ""
+    assert [record["text"] for record in records[1:]] == ["one", "two", "three", "four"]
+    assert elapsed < 10
+    assert not [process for process in multiprocessing.active_children() if process.is_alive()]
+
+def test_each_file_gets_its_own_deadline(monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "_extract_pdf_bytes", extract_or_hang)
+    monkeypatch.setattr(pdf_extraction, "PDF_EXTRACTION_KILL_GRACE_SECONDS", 0.2)
+
+    # Two stuck files on one worker: the second only starts after the first is killed,
+    # so both are timed out rather than the second being cut short by a batch-wide wait
+    records = extract_pdfs_parallel([b"hang", b"ok", b"hang"], max_workers=1, timeout=0.5)
+    assert [record["error"] for record in records] == [EXTRACTION_TIMEOUT_ERROR, None, EXTRACTION_TIMEOUT_ERROR]
+    assert records[1]["text"] == "ok"
+
+def test_texts_from_an_older_extraction_format_are_extracted_again(tmp_path):
+    path = str(tmp_path / "text_store.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE texts (sha256 TEXT PRIMARY KEY, text BLOB NOT NULL, page_count INTEGER NOT NULL, "
+                 "extraction_seconds REAL, created_at REAL NOT NULL)")
+    data = make_pdf(["Resume page one", "Resume page two"])
+    conn.execute("INSERT INTO texts VALUES (?, ?, 2, 0.1, 0)",
+                 (pdf_digest(data), zlib.compress(b"Resume page oneResume page two")))
+    conn.commit()
+    conn.close()
+
+    store = TextStore(path)
+    assert pdf_digest(data) not in store
+    [digest] = store.add_pdfs([data])
+    assert store.get_text(digest) == "Resume page one\fResume page two"
+
+def test_failed_extractions_are_stored_as_errors(tmp_path):
+    store = TextStore(str(tmp_path / "text_store.sqlite3"))
+    good, image_only, broken = make_pdf(["Resume text"]), make_pdf([""]), b"%PDF-1.4 not really"
+    digests = store.add_pdfs([good, image_only, broken])
+
+    assert store.get_text(digests[0]) == "Resume text"
+    assert store.get_text(digests[1]) is None and store.get_text(digests[2]) is None
+    errors = store.get_errors(digests + ["unknown"])
+    assert errors[digests[1]] == IMAGE_PDF_MESSAGE
+    assert errors[digests[2]].startswith("Error extracting text from PDF")
+    assert errors["unknown"] == TEXT_UNAVAILABLE_ERROR
+    assert digests[0] not in errors
+
+def test_timed_out_extractions_are_retried(tmp_path, monkeypatch):
+    store = TextStore(str(tmp_path / "text_store.sqlite3"))
+    monkeypatch.setattr(pdf_extraction, "extract_pdfs_parallel", lambda blobs: [pdf_extraction._timed_out_record()])
+    [digest] = store.add_pdfs([b"slow"])
+    assert store.get_errors([digest]) == {digest: EXTRACTION_TIMEOUT_ERROR}
+
+    # The next upload of the same file extracts it again
+    monkeypatch.setattr(pdf_extraction, "extract_pdfs_parallel", lambda blobs: [
+        {"text": "Resume text", "page_count": 1, "extraction_seconds": 0.1, "error": None}])
+    store.add_pdfs([b"slow"])
+    assert store.get_text(digest) == "Resume text"
@@ -0,0 +1,37 @@
+import screening
+from screening import ShortlistIndex, SkillIndex, prescreen_cv, prescreen_rejection, screen_resumes, shortlist_candidates
+
+JD_SUMMARY = {"RequiredSkills": ["Python", "SQL", "Tableau", "Spark", "AWS"], "PreferredSkills": [],
+              "RequiredQualifications": []}
+
+def test_prescreen_scores_required_skills():
+    prescreen = prescreen_cv("Jane Doe, Python and SQL developer", SkillIndex(JD_SUMMARY))
+    assert prescreen["score"] == 40
+    assert prescreen["matched_required"] == ["Python", "SQL"]
+    assert prescreen["missing_required"] == ["Tableau", "Spark", "AWS"]
+
+def test_prescreened_resumes_are_never_shortlisted():
+    # Keyword score 60, rejected at a cutoff of 80; the shortlist threshold of 50 must not pick it up
+    cv_text = "John Smith john@example.com Python SQL Tableau"
+    rejected = prescreen_rejection(cv_text, prescreen_cv(cv_text, SkillIndex(JD_SUMMARY)))
+    assert rejected["OverallMatch"] == "60%"
+    analyzed = {"CandidateName": "Ann Lee", "OverallMatch": "55%"}
+
+    index = ShortlistIndex([rejected, analyzed])
+    assert index.count_at_or_above(50) == 1
+    assert [entry["name"] for entry in shortlist_candidates([rejected, analyzed], 50)] == ["Ann Lee"]
+    # Still listed (last) for display
+    assert list(index.positions) == [1, 0]
+
+def test_resumes_without_text_are_not_sent_to_the_model(monkeypatch):
+    sent = []
+    def fake_analyze(cv_texts, jd_summary, on_result=None, **kwargs):
+        sent.extend(cv_texts)
+        for i, cv_text in enumerate(cv_texts):
+            on_result(i, {"CandidateName": cv_text.split()[0], "OverallMatch": "70%"})
+    monkeypatch.setattr(screening, "analyze_resumes_concurrently", fake_analyze)
+
+    results = screen_resumes(["Ann Lee Python SQL", None, "Bo Chen SQL"], JD_SUMMARY, prescreen_cutoff=30)
+    assert sent == ["Ann Lee Python SQL"]
+    assert results[1] == {"error": "No text could be extracted from the resume"}
+    assert results[2]["PreScreened"]
@@ -0,0 +1,126 @@
+import sqlite3
+import threading
+
+import pytest
+
+import result_store
+from result_store import ResultStore, SQLiteResultStore, open_result_store, register_result_store_backend
+from screening import hash_jd_summary
+
+JD_V1 = {"JobTitle": "Data Analyst", "RequiredSkills": ["Python", "SQL"]}
+JD_V2 = {"JobTitle": "Data Analyst", "RequiredSkills": ["Python", "SQL", "Tableau"]}
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteResultStore(str(tmp_path / "results.sqlite3"))
+
+def test_result_store_is_abstract():
+    with pytest.raises(TypeError):
+        ResultStore()
+
+    class Partial(ResultStore):
+        def save_requisition(self, requisition_id, jd_text, jd_summary):
+            pass
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_requisition_round_trip_and_update(store):
+    assert store.get_requisition("REQ-1") is None
+    store.save_requisition("REQ-1", "Analyst wanted", JD_V1)
+    store.save_requisition("REQ-1", "Analyst wanted, Tableau a plus", JD_V2)
+
+    requisition = store.get_requisition("REQ-1")
+    assert requisition["jd_text"] == "Analyst wanted, Tableau a plus"
+    assert requisition["jd_summary"] == JD_V2
+
+def test_resumes_keep_order_and_ignore_repeats(store):
+    store.add_resumes("REQ-1", [{"name": "b.pdf", "sha256": "b"}, {"name": "a.pdf", "sha256": "a"}])
+    store.add_resumes("REQ-1", [{"name": "a.pdf", "sha256": "a"}, {"name": "c.pdf", "sha256": "c"}])
+    store.add_resumes("REQ-2", [{"name": "z.pdf", "sha256": "z"}])
+
+    assert [resume["name"] for resume in store.get_resumes("REQ-1")] == ["b.pdf", "a.pdf", "c.pdf"]
+    assert store.get_resumes("REQ-2") == [{"name": "z.pdf", "sha256": "z"}]
+
+def test_resumes_with_the_same_name_are_kept_apart(store):
+    store.add_resumes("REQ-1", [{"name": "cv.pdf", "sha256": "a"}])
+    store.add_resumes("REQ-1", [{"name": "cv.pdf", "sha256": "b"}, {"name": "copy.pdf", "sha256": "a"}])
+    assert store.get_resumes("REQ-1") == [{"name": "cv.pdf", "sha256": "a"}, {"name": "cv.pdf", "sha256": "b"}]
+
+    store.remove_resumes("REQ-1", ["a", "x"])
+    assert store.get_resumes("REQ-1") == [{"name": "cv.pdf", "sha256": "b"}]
+
+def test_resume_texts_are_shared_through_the_store(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    SQLiteResultStore(path).add_resumes("REQ-1", [{"name": "a.pdf", "sha256": "a"}, {"name": "b.pdf", "sha256": "b"}],
+                                        texts={"a": "Ada Lovelace\fPython"})
+
+    # Another replica restores the text it has never extracted; b failed and has none
+    assert SQLiteResultStore(path).get_resume_texts(["a", "b", "a"]) == {"a": "Ada Lovelace\fPython"}
+
+def test_pools_keyed_by_name_are_rekeyed(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE requisition_resumes (requisition_id TEXT NOT NULL, name TEXT NOT NULL, "
+                 "sha256 TEXT NOT NULL, added_at REAL NOT NULL, PRIMARY KEY (requisition_id, name))")
+    conn.executemany("INSERT INTO requisition_resumes VALUES ('REQ-1', ?, ?, 1.0)", [("b.pdf", "b"), ("a.pdf", "a")])
+    conn.commit()
+    conn.close()
+
+    store = SQLiteResultStore(path)
+    store.add_resumes("REQ-1", [{"name": "a.pdf", "sha256": "c"}])
+    assert [resume["sha256"] for resume in store.get_resumes("REQ-1")] == ["b", "a", "c"]
+
+def test_analyses_are_kept_per_jd_version(store):
+    store.save_analyses("REQ-1", JD_V1, {"a": {"OverallMatch": "80%"}})
+    store.save_analyses("REQ-1", JD_V2, {"a": {"OverallMatch": "60%"}, "b": {"OverallMatch": "70%"}})
+    store.save_analyses("REQ-1", JD_V1, {"a": {"OverallMatch": "85%"}})
+
+    assert store.get_analyses("REQ-1", JD_V1) == {"a": {"OverallMatch": "85%"}}
+    assert set(store.get_analyses("REQ-1", JD_V2)) == {"a", "b"}
+    assert store.get_analyses("REQ-2", JD_V1) == {}
+
+def test_shortlist_is_replaced_and_tagged_with_its_jd(store):
+    entries = [{"name": "Ada", "match_percentage": 90}]
+    store.save_shortlist("REQ-1", JD_V1, 70, [{"name": "Bob", "match_percentage": 75}])
+    store.save_shortlist("REQ-1", JD_V2, 85, entries)
+
+    shortlist = store.get_shortlist("REQ-1")
+    assert shortlist["threshold"] == 85
+    assert shortlist["entries"] == entries
+    assert shortlist["jd_hash"] == hash_jd_summary(JD_V2)
+    assert store.get_shortlist("REQ-2") is None
+
+def test_writes_from_other_threads_and_instances_are_visible(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    writer = SQLiteResultStore(path)
+    reader = SQLiteResultStore(path)
+
+    def add(i):
+        writer.save_analyses("REQ-1", JD_V1, {f"digest{i}": {"OverallMatch": f"{i}%"}})
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(reader.get_analyses("REQ-1", JD_V1)) == 8
+
+def test_memory_store_is_shared_between_threads():
+    store = SQLiteResultStore(":memory:")
+    store.save_requisition("REQ-1", "text", JD_V1)
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(store.get_requisition("REQ-1")))
+    thread.start()
+    thread.join()
+    assert seen[0]["jd_summary"] == JD_V1
+
+def test_open_result_store_by_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_store, "RESULT_STORE_BACKENDS", dict(result_store.RESULT_STORE_BACKENDS))
+    store = open_result_store("sqlite:///" + str(tmp_path / "results.sqlite3"))
+    assert isinstance(store, SQLiteResultStore)
+    assert store.path == str(tmp_path / "results.sqlite3")
+
+    with pytest.raises(ValueError):
+        open_result_store("postgresql://db/results")
+    register_result_store_backend("memory", lambda url: SQLiteResultStore(":memory:"))
+    assert open_result_store("memory://").path == ":memory:"
@@ -0,0 +1,90 @@
+import resume_compaction
+from resume_compaction import compact_resume
+
+def resume_pages():
+    header = "ACME Resume Services | Confidential"
+    return "\f".join([
+        "Jane Doe\njane@example.com\nSkills\nPython, SQL, Tableau\n" + header + "\nPage 1 of 3",
+        header + "\nExperience\nData Analyst at Initech, 2019-2024\nBuilt reporting pipelines\nPage 2 of 3",
+        header + "\nEducation\nBSc Statistics\nReferences\nAvailable on request\nJohn Smith, manager\nPage 3 of 3",
+    ])
+
+def test_page_furniture_and_references_are_removed():
+    text, stats = compact_resume(resume_pages(), token_budget=0)
+
+    assert text.startswith("Jane Doe\njane@example.com")
+    assert "ACME Resume Services" not in text
+    assert "Page 2 of 3" not in text
+    assert "Available on request" not in text
+    assert "Python, SQL, Tableau" in text and "Data Analyst at Initech" in text and "BSc Statistics" in text
+    assert stats["dropped"] == ["references"]
+    assert stats["tokens_after"] < stats["tokens_before"]
+
+def test_repeated_sections_are_kept_once():
+    skills = "Skills\nPython, SQL, Tableau, Excel, Power BI"
+    text, stats = compact_resume(
+        f"Jane Doe\njane@example.com\n{skills}\nExperience\nAnalyst at Initech\nAnalyst at Globex\f"
+        f"Education\nBSc Statistics\n{skills}\nProjects\nSales dashboard\nChurn model",
+        token_budget=0
+    )
+
+    assert text.count("Power BI") == 1
+    assert "Analyst at Globex" in text and "BSc Statistics" in text and "Churn model" in text
+    assert stats["dropped"] == ["skills"]
+
+def test_budget_keeps_priority_sections_in_resume_order():
+    cv_text = "\n".join([
+        "Jane Doe",
+        "Interests",
+        "\n".join(f"Hobby line {i} about hiking and chess" for i in range(40)),
+        "Skills",
+        "Python, SQL, Tableau",
+        "Experience",
+        "Data Analyst at Initech",
+    ])
+    text, stats = compact_resume(cv_text, token_budget=40)
+
+    assert "Python, SQL, Tableau" in text
+    assert "Data Analyst at Initech" in text
+    assert text.index("Jane Doe") < text.index("Skills") < text.index("Experience")
+    assert "interests" in stats["dropped"] + stats["truncated"]
+    assert stats["tokens_after"] <= 40
+
+def test_repeated_job_titles_on_one_page_are_kept():
+    cv_text = "\n".join([
+        "Jane Doe", "Experience",
+        "Senior Data Engineer", "Globex, 2021 - 2024",
+        "Senior Data Engineer", "Initech, 2018 - 2021",
+        "Senior Data Engineer", "Hooli, 2015 - 2018",
+        "Education", "BSc",
+    ])
+    text, _ = compact_resume(cv_text, token_budget=0)
+    assert text.count("Senior Data Engineer") == 3
+
+def test_dated_role_lines_at_page_edges_are_kept():
+    cv_text = (
+        "Jane Doe\njane@example.com\nExperience\nBuilt pipelines\nData Engineer, 2019 - 2021\f"
+        "Data Engineer, 2017 - 2019\nMaintained the warehouse\nEducation\nBSc Statistics"
+    )
+    text, _ = compact_resume(cv_text, token_budget=0)
+    assert "Data Engineer, 2019 - 2021" in text
+    assert "Data Engineer, 2017 - 2019" in text
+
+def test_repeated_lines_inside_pages_are_kept():
+    title = "Senior Data Engineer"
+    cv_text = "\f".join([
+        f"Jane Doe\nExperience\n{title}\nGlobex\nPage 1",
+        f"Jane Doe\nProjects\n{title}\nInitech\nPage 2",
+        f"Jane Doe\nEducation\n{title}\nHooli\nPage 3",
+    ])
+    text, _ = compact_resume(cv_text, token_budget=0)
+    assert text.count(title) == 3
+    assert text.count("Jane Doe") == 1
+    assert "Page 2" not in text
+
+def test_compaction_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(resume_compaction, "RESUME_COMPACTION", False)
+    cv_text = resume_pages()
+    text, stats = compact_resume(cv_text)
+    assert text == cv_text
+    assert stats["tokens_before"] == stats["tokens_after"]
@@ -0,0 +1,204 @@
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import scheduling
+from scheduling import IntervalIndex, InterviewScheduler, ScheduleStore, default_availability, export_ics
+
+MONDAY = date(2026, 10, 19)
+
+def availability(interviewers=("Ana", "Ben"), days=3):
+    return default_availability(list(interviewers), days=days, day_start="10:00", day_end="12:00", start_date=MONDAY)
+
+def at(day, hour, minute=0):
+    return datetime(2026, 10, day, hour, minute)
+
+# The Friday before the scheduling window, unless a test moves the clock
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    now = [at(16, 9)]
+    monkeypatch.setattr(scheduling, "_now", lambda: now[0])
+    return now
+
+def assert_no_double_booking(rows):
+    by_interviewer = {}
+    for row in rows:
+        by_interviewer.setdefault(row["interviewer"], []).append((row["start"], row["end"]))
+    for slots in by_interviewer.values():
+        slots.sort()
+        for (_, end), (start, _) in zip(slots, slots[1:]):
+            assert end <= start
+
+def test_interval_index_overlaps_and_remove():
+    index = IntervalIndex()
+    index.add(at(19, 10), at(19, 11))
+    index.add(at(19, 12), at(19, 13))
+
+    assert index.overlaps(at(19, 10, 30), at(19, 10, 45))
+    assert index.overlaps(at(19, 9), at(19, 10, 1))
+    assert not index.overlaps(at(19, 11), at(19, 12))
+    with pytest.raises(ValueError):
+        index.add(at(19, 12, 30), at(19, 14))
+
+    index.remove(at(19, 10), at(19, 11))
+    assert not index.overlaps(at(19, 10), at(19, 11))
+    assert len(index) == 1
+
+def test_default_availability_skips_weekends():
+    windows = default_availability(["Ana"], days=6, start_date=date(2026, 10, 23))["Ana"]
+    assert [window[0].weekday() for window in windows] == [4, 0, 1, 2, 3, 4]
+
+def test_assign_spreads_load_without_double_booking():
+    scheduler = InterviewScheduler(availability(), duration_minutes=60)
+    offers = scheduler.assign([(f"id{i}", f"Candidate {i}") for i in range(4)], slots_per_candidate=3)
+
+    assert all(len(candidate_offers) == 3 for candidate_offers in offers.values())
+    for candidate_offers in offers.values():
+        assert len({offer["start"].date() for offer in candidate_offers}) == 3
+    assert_no_double_booking(scheduler.rows())
+    load = [sum(row["interviewer"] == name for row in scheduler.rows()) for name in ("Ana", "Ben")]
+    assert load == [6, 6]
+
+def test_candidates_with_the_same_name_are_scheduled_separately():
+    scheduler = InterviewScheduler(availability(), duration_minutes=60)
+    offers = scheduler.assign([("digest-a", "John Smith"), ("digest-b", "John Smith")], slots_per_candidate=2)
+
+    assert set(offers) == {"digest-a", "digest-b"}
+    assert len(scheduler.rows()) == 4
+    assert_no_double_booking(scheduler.rows())
+
+def test_book_releases_the_other_offers():
+    scheduler = InterviewScheduler(availability(["Ana"], days=2), duration_minutes=60)
+    offers = scheduler.assign([("a", "Ada")], slots_per_candidate=2)["a"]
+
+    booking = scheduler.book("a", offers[1]["uid"])
+    assert booking == offers[1]
+    assert [row["status"] for row in scheduler.rows()] == ["booked"]
+
+    # The released slot is the first one offered to the next candidate
+    assert scheduler.assign([("b", "Bob")], slots_per_candidate=1)["b"][0]["start"] == offers[0]["start"]
+
+def test_exhausted_availability_gives_fewer_offers():
+    scheduler = InterviewScheduler(availability(["Ana"], days=1), duration_minutes=60)
+    offers = scheduler.assign([("a", "Ada"), ("b", "Bob"), ("c", "Cy")], slots_per_candidate=1)
+    assert [len(offers[key]) for key in ("a", "b", "c")] == [1, 1, 0]
+
+def test_sessions_sharing_a_store_never_double_book(tmp_path):
+    path = str(tmp_path / "schedule.sqlite3")
+    first = InterviewScheduler(availability(), duration_minutes=60, store=ScheduleStore(path))
+    second = InterviewScheduler(availability(), duration_minutes=60, store=ScheduleStore(path))
+
+    first.assign([("a", "Ada"), ("b", "Bob")], slots_per_candidate=2)
+    second.assign([("c", "Cy"), ("a", "Ada")], slots_per_candidate=2)
+
+    rows = InterviewScheduler(availability(), duration_minutes=60, store=ScheduleStore(path)).rows()
+    assert sorted({row["candidate_id"] for row in rows}) == ["a", "b", "c"]
+    assert len(rows) == 6
+    assert_no_double_booking(rows)
+
+def test_booking_is_seen_by_other_sessions(tmp_path):
+    store = ScheduleStore(str(tmp_path / "schedule.sqlite3"))
+    first = InterviewScheduler(availability(), duration_minutes=60, store=store)
+    second = InterviewScheduler(availability(), duration_minutes=60, store=store)
+    offers = first.assign([("a", "Ada")], slots_per_candidate=2)["a"]
+
+    second.refresh()
+    booking = second.book("a", offers[0]["uid"])
+    # An offer picked from a stale view returns the booking already made
+    assert first.book("a", offers[1]["uid"]) == booking
+
+    first.refresh()
+    assert first.bookings["a"]["uid"] == offers[0]["uid"]
+    assert "a" not in first.offers
+
+def test_concurrent_assignment_across_stores(tmp_path):
+    path = str(tmp_path / "schedule.sqlite3")
+    ScheduleStore(path)
+
+    def assign(worker):
+        scheduler = InterviewScheduler(availability(days=5), duration_minutes=30, store=ScheduleStore(path))
+        scheduler.assign([(f"w{worker}-{i}", f"Candidate {i}") for i in range(3)], slots_per_candidate=2)
+    threads = [threading.Thread(target=assign, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    rows = ScheduleStore(path).read()
+    assert len(rows) == 24
+    assert_no_double_booking([offer for offer, _ in rows])
+
+def test_release_frees_offers_and_bookings(tmp_path):
+    scheduler = InterviewScheduler(availability(), duration_minutes=60, store=ScheduleStore(str(tmp_path / "s.sqlite3")))
+    offers = scheduler.assign([("a", "Ada"), ("b", "Bob")], slots_per_candidate=2)
+    scheduler.book("a", offers["a"][0]["uid"])
+
+    scheduler.release("a")
+    scheduler.release("b")
+    scheduler.refresh()
+    assert scheduler.rows() == []
+
+def test_ics_export_is_limited_to_the_given_candidates():
+    scheduler = InterviewScheduler(availability(), duration_minutes=60)
+    offers = scheduler.assign([("a", "Ada"), ("b", "Bob")], slots_per_candidate=1)
+    scheduler.book("a", offers["a"][0]["uid"])
+
+    calendar = export_ics(scheduler, "Data Analyst", candidate_ids=["a"])
+    assert calendar.count("BEGIN:VEVENT") == 1
+    assert "SUMMARY:Data Analyst interview: Ada" in calendar
+    assert "STATUS:CONFIRMED" in calendar
+
+def test_released_offers_free_a_full_calendar(tmp_path):
+    store = ScheduleStore(str(tmp_path / "schedule.sqlite3"))
+    first = InterviewScheduler(availability(["Ana"], days=2), duration_minutes=60, store=store)
+    offers = first.assign([("a", "Ada"), ("b", "Bob")], slots_per_candidate=2)
+    first.book("a", offers["a"][0]["uid"])
+
+    # The two days hold four slots: Ada's booking, her released offer and Bob's two offers
+    second = InterviewScheduler(availability(["Ana"], days=2), duration_minutes=60, store=store)
+    assert [len(o) for o in second.assign([("c", "Cy"), ("d", "Di")], slots_per_candidate=2).values()] == [1, 0]
+
+    # Bob leaves the shortlist; Ada's booking is kept
+    assert first.release_offers(["a", "b", "x"]) == 2
+    assert [len(o) for o in second.assign([("d", "Di")], slots_per_candidate=2).values()] == [2]
+    second.refresh()
+    assert second.bookings["a"]["uid"] == offers["a"][0]["uid"]
+    assert_no_double_booking(second.rows())
+
+def test_unbooked_offers_expire(tmp_path, clock):
+    path = str(tmp_path / "schedule.sqlite3")
+    scheduler = InterviewScheduler(availability(["Ana"], days=3), duration_minutes=60, store=ScheduleStore(path),
+                                   offer_ttl_hours=24)
+    offers = scheduler.assign([("a", "Ada"), ("b", "Bob"), ("c", "Cy")], slots_per_candidate=3)
+    assert offers["c"] == []
+    scheduler.book("a", offers["a"][0]["uid"])
+
+    clock[0] += timedelta(hours=25)
+    scheduler.refresh()
+    assert "b" not in scheduler.offers and "a" in scheduler.bookings
+    assert len(scheduler.assign([("c", "Cy")], slots_per_candidate=3)["c"]) == 3
+    assert {offer["candidate_id"] for offer, _ in ScheduleStore(path).read()} == {"a", "c"}
+
+def test_past_slots_are_not_offered(clock):
+    clock[0] = at(20, 10, 30)
+    scheduler = InterviewScheduler(availability(["Ana"], days=3), duration_minutes=60)
+    offers = scheduler.assign([("a", "Ada")], slots_per_candidate=3)["a"]
+    assert [offer["start"] for offer in offers] == [at(20, 11), at(21, 10)]
+
+def test_schedules_without_offer_times_are_upgraded(tmp_path):
+    path = str(tmp_path / "schedule.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE interviews (uid TEXT PRIMARY KEY, candidate_id TEXT NOT NULL, candidate TEXT NOT NULL, "
+                 "interviewer TEXT NOT NULL, start TEXT NOT NULL, end TEXT NOT NULL, status TEXT NOT NULL)")
+    conn.executemany("INSERT INTO interviews VALUES (?, ?, ?, 'Ana', ?, ?, ?)", [
+        ("u1", "a", "Ada", at(19, 10).isoformat(), at(19, 11).isoformat(), "booked"),
+        ("u2", "b", "Bob", at(19, 11).isoformat(), at(19, 12).isoformat(), "offered"),
+    ])
+    conn.commit()
+    conn.close()
+
+    scheduler = InterviewScheduler(availability(["Ana"]), duration_minutes=60, store=ScheduleStore(path))
+    assert list(scheduler.bookings) == ["a"]
+    assert scheduler.offers == {}
@@ -0,0 +1,40 @@
+import pytest
+
+from screening import ShortlistIndex, parse_match_percentage, shortlist_candidates
+
+@pytest.mark.parametrize("value, expected", [
+    ("85%", 85), (" 72.9 % ", 72), (90, 90), ("N/A", 0), ("", 0), (None, 0),
+    ("inf", 0), ("nan", 0), ("-20%", 0), ("1e9%", 100), ("40000", 100),
+])
+def test_parse_match_percentage(value, expected):
+    assert parse_match_percentage(value) == expected
+
+def candidate(name, overall):
+    return {"CandidateName": name, "OverallMatch": overall, "ContactInfo": f"{name}@example.com",
+            "Strengths": [f"{name} strength"], "MissingSkills": [], "Recommendation": "shortlist"}
+
+def test_index_orders_by_score_and_keeps_pool_order_for_ties():
+    pool = [candidate("a", "70%"), candidate("b", "90%"), {"error": "failed"}, candidate("c", "70%"),
+            candidate("d", "50%")]
+    index = ShortlistIndex(pool)
+
+    assert len(index) == 4
+    assert list(index.positions) == [1, 0, 3, 4]
+    assert [index.count_at_or_above(t) for t in (95, 90, 71, 70, 50, 0)] == [0, 1, 1, 3, 4, 4]
+    assert [entry["name"] for entry in index.top_k(2)] == ["b", "a"]
+    assert [entry["name"] for entry in index.top_k(10)] == ["b", "a", "c", "d"]
+
+def test_shortlist_entries():
+    entries = shortlist_candidates([candidate("a", "69%"), candidate("b", "70%")], 70)
+    assert entries == [{"name": "b", "sha256": None, "contact": "b@example.com", "match_percentage": 70,
+                        "strengths": ["b strength"], "missing_skills": [], "recommendation": "shortlist"}]
+
+def test_shortlist_entries_carry_resume_digests():
+    pool = [candidate("a", "90%"), {"error": "failed", "CandidateName": "x"}, candidate("a", "95%")]
+    entries = shortlist_candidates(pool, 70, digests=["digest0", "digest1", "digest2"])
+    assert [(entry["name"], entry["sha256"]) for entry in entries] == [("a", "digest2"), ("a", "digest0")]
+
+def test_absurd_model_scores_do_not_break_the_index():
+    index = ShortlistIndex([candidate("a", "inf"), candidate("b", "1e12%"), candidate("c", "80%")])
+    assert list(index.scores) == [100, 80, 0]
+    assert index.count_at_or_above(80) == 2
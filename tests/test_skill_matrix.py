@@ -0,0 +1,44 @@
+import numpy as np
+
+from screening import SkillIndex, SkillMatchMatrix, prescreen_cv
+
+JD_SUMMARY = {
+    "RequiredSkills": ["Python", "python", " SQL ", "Machine  Learning", "Tableau", ""],
+    "PreferredSkills": ["AWS", "aws", "Docker"],
+    "RequiredQualifications": ["Bachelor's degree in Computer Science"],
+}
+
+CV_TEXTS = [
+    "Python developer with ML experience, AWS certified. BSc Computer Science.",
+    "SQL analyst using Tableau and Docker.",
+    "Chef with no relevant skills.",
+]
+
+def test_skill_lists_are_deduplicated_ignoring_case_and_spacing():
+    index = SkillIndex(JD_SUMMARY)
+    assert index.required_skills == ["Python", " SQL ", "Machine  Learning", "Tableau"]
+    assert index.preferred_skills == ["AWS", "Docker"]
+
+def test_matrix_scores_match_prescreen():
+    matrix = SkillMatchMatrix(CV_TEXTS, JD_SUMMARY)
+    overall = matrix.scores()["OverallMatch"]
+    expected = [prescreen_cv(cv_text, matrix.skill_index)["score"] for cv_text in CV_TEXTS]
+    assert list(overall) == expected
+    assert expected[2] == 0
+    # Python + machine learning (alias "ML") of 4 required skills
+    assert matrix.scores()["SkillMatch"][0] == 50
+    assert list(matrix.ranking()) == list(np.argsort(-np.array(expected), kind="stable"))
+
+def test_dataframe_pages_follow_the_ranking():
+    matrix = SkillMatchMatrix(CV_TEXTS, JD_SUMMARY)
+    looked_up = []
+    def names(rows):
+        looked_up.extend(rows)
+        return [f"cv{i}" for i in rows]
+
+    ranking = list(matrix.ranking())
+    page = matrix.to_dataframe(names, 1, 3)
+    assert list(page["Candidate"]) == [f"cv{i}" for i in ranking[1:3]]
+    assert list(page["OverallMatch"]) == [matrix.scores()["OverallMatch"][i] for i in ranking[1:3]]
+    assert looked_up == ranking[1:3]
+    assert list(matrix.to_dataframe(names)["Candidate"]) == [f"cv{i}" for i in ranking]
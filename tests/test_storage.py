@@ -0,0 +1,35 @@
+import threading
+
+from storage import lazy_singleton, open_sqlite
+
+def test_lazy_singleton_creates_one_instance_across_threads():
+    calls = []
+
+    @lazy_singleton
+    def get_thing():
+        calls.append(1)
+        return object()
+
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(get_thing())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(thing is seen[0] for thing in seen)
+    assert get_thing.__name__ == "get_thing"
+
+def test_open_sqlite_creates_the_directory_and_schema(tmp_path):
+    path = str(tmp_path / "nested" / "dir" / "db.sqlite3")
+    conn = open_sqlite(path, ["CREATE TABLE IF NOT EXISTS t (x INTEGER)"], timeout=5)
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+
+    reopened = open_sqlite(path, ["CREATE TABLE IF NOT EXISTS t (x INTEGER)"])
+    seen = []
+    thread = threading.Thread(target=lambda: seen.extend(reopened.execute("SELECT x FROM t").fetchall()))
+    thread.start()
+    thread.join()
+    assert seen == [(1,)]